@@ -0,0 +1,222 @@
+"""Admission control in front of process_pdf.
+
+Every upload request first takes a token from its client's bucket (RATE_LIMIT_BURST tokens, refilled
+at RATE_LIMIT_PER_MINUTE); clients are told apart by a gateway-set header (ADMISSION_CLIENT_HEADER,
+e.g. a clinic ID) or else their address. Uploads over MAX_PDF_PAGES are refused after only their
+page tree is read. Analyses then share a bounded queue: ANALYZE_CONCURRENCY run at once in each
+process, up to ANALYZE_QUEUE_SIZE more wait in arrival order (at most ANALYZE_QUEUE_TIMEOUT seconds)
+and anything beyond that is turned away at once, so one site's bulk upload cannot occupy every
+worker. A batch takes one slot per process of its pool (batch_slots), so it counts for the CPUs it
+actually uses.
+
+Refusals raise Rejected, which the app turns into 413/429/503 responses with Retry-After.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from instrumentation import ADMISSION_REJECTIONS
+from medical_extractor import PdfSource, open_pdf
+from pdf_lock import MUPDF_LOCK
+
+REJECTION_REASONS = ('rate_limited', 'too_large', 'too_many_pages', 'queue_full', 'queue_timeout', 'job_backlog_full')
+
+# Weight of the newest analysis in the running average used for Retry-After estimates
+SLOT_SECONDS_SMOOTHING = 0.2
+
+
+class Rejected(Exception):
+    """A request refused by admission control; `retry_after` is in seconds (None: retrying will not help)"""
+
+    def __init__(self, status: int, reason: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.message = message
+        self.retry_after = retry_after
+        ADMISSION_REJECTIONS.inc(reason=reason)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        if self.retry_after is None:
+            return {}
+        return {'Retry-After': str(max(1, math.ceil(self.retry_after)))}
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """Token bucket per client; the least recently seen clients are forgotten beyond `max_clients`"""
+
+    def __init__(self, per_minute: float, burst: int, max_clients: int = 10000):
+        self.per_minute = per_minute
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    def wait_seconds(self, client: str) -> float:
+        """Take a token for `client`: 0 if one was available, else the seconds until there is one"""
+        if not self.enabled:
+            return 0.0
+        rate = self.per_minute / 60
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(client, None)
+            if bucket is None:
+                bucket = TokenBucket(self.burst, now)
+            else:
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * rate)
+                bucket.updated = now
+            self._buckets[client] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / rate
+
+    @property
+    def clients(self) -> int:
+        return len(self._buckets)
+
+
+class AnalysisQueue:
+    """At most `max_active` slots in use at once; up to `max_queued` more requests wait, in arrival order.
+    An analysis takes one slot, a batch one per process it runs. Only the longest waiter may take
+    slots, so a batch waiting for several is not overtaken by later single analyses."""
+
+    def __init__(self, max_active: int, max_queued: int, timeout: float):
+        self.max_active = max(max_active, 1)
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.active = 0
+        self._waiting = deque()
+        self._slot_seconds = None
+        self._condition = threading.Condition()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiting)
+
+    def retry_after(self) -> float:
+        """Rough seconds until a new arrival would get a slot, from the average slot time so far"""
+        per_slot = self._slot_seconds if self._slot_seconds is not None else 1.0
+        return per_slot * (self.queued + 1) / self.max_active
+
+    def acquire(self, slots: int = 1) -> float:
+        """Wait for `slots` slots (at most max_active); returns the start time to pass to release().
+        Raises Rejected if the queue is full or the wait times out"""
+        slots = min(slots, self.max_active)
+        with self._condition:
+            if self.active + slots > self.max_active or self._waiting:
+                if len(self._waiting) >= self.max_queued:
+                    raise Rejected(503, 'queue_full', 'Server is busy, try again later', self.retry_after())
+                ticket = object()
+                self._waiting.append(ticket)
+                deadline = time.monotonic() + self.timeout
+                try:
+                    while self._waiting[0] is not ticket or self.active + slots > self.max_active:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise Rejected(503, 'queue_timeout', 'Timed out waiting for an analysis slot', self.retry_after())
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting.remove(ticket)
+                    # The next waiter is now at the head, and may fit in what is left
+                    self._condition.notify_all()
+            self.active += slots
+        return time.monotonic()
+
+    def release(self, started: float, slots: int = 1):
+        seconds = time.monotonic() - started
+        with self._condition:
+            self.active -= min(slots, self.max_active)
+            if self._slot_seconds is None:
+                self._slot_seconds = seconds
+            else:
+                self._slot_seconds += SLOT_SECONDS_SMOOTHING * (seconds - self._slot_seconds)
+            # Wake every waiter: the head checks whether it now fits, the others keep waiting their turn
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, slots: int = 1):
+        started = self.acquire(slots)
+        try:
+            yield
+        finally:
+            self.release(started, slots)
+
+
+class AdmissionControl:
+    """Rate limits, size caps and the bounded analysis queue of one process"""
+
+    def __init__(self, rate_per_minute: float = 60, rate_burst: int = 10, max_active: int = 1, max_queued: int = 16,
+                 queue_timeout: float = 30, max_pages: int = 500, max_pending_jobs: int = 1000):
+        self.limiter = RateLimiter(rate_per_minute, rate_burst)
+        self.queue = AnalysisQueue(max_active, max_queued, queue_timeout)
+        self.max_pages = max_pages
+        self.max_pending_jobs = max_pending_jobs
+
+    def check_rate(self, client: str):
+        """Take a token for the client, or raise Rejected (429)"""
+        wait = self.limiter.wait_seconds(client)
+        if wait > 0:
+            raise Rejected(429, 'rate_limited', 'Too many requests, slow down', wait)
+
+    def check_pages(self, pdf_source: PdfSource):
+        """Raise Rejected (413) for a PDF over max_pages; only the page tree is read. Unreadable PDFs pass (process_pdf reports them)"""
+        if not self.max_pages:
+            return
+        try:
+            doc = open_pdf(pdf_source)
+        except Exception as e:
+            return
+        with MUPDF_LOCK:
+            pages = doc.page_count
+            doc.close()
+        if pages > self.max_pages:
+            raise Rejected(413, 'too_many_pages', f'PDF has {pages} pages; the limit is {self.max_pages}')
+
+    def check_job_backlog(self, pending: int):
+        """Raise Rejected (503) when the job queue already holds max_pending_jobs unfinished jobs"""
+        if self.max_pending_jobs and pending >= self.max_pending_jobs:
+            raise Rejected(503, 'job_backlog_full', 'Job queue is full, try again later', self.queue.timeout)
+
+    def batch_slots(self, files: int, max_workers: Optional[int] = None) -> int:
+        """Slots for a batch of `files`, which is also the process count its pool should use: one per
+        process it would start (up to `max_workers`, default CPU count), at most max_active"""
+        return max(1, min(files, max_workers or os.cpu_count() or 1, self.queue.max_active))
+
+    def analysis_slot(self, slots: int = 1):
+        """Context manager holding `slots` analysis slots (raises Rejected, 503, when they cannot be had)"""
+        return self.queue.slot(slots)
+
+    def stats(self) -> Dict:
+        return {
+            'analyses_active': self.queue.active,
+            'analyses_queued': self.queue.queued,
+            'max_active': self.queue.max_active,
+            'max_queued': self.queue.max_queued,
+            'rate_limit_per_minute': self.limiter.per_minute,
+            'rate_limit_burst': self.limiter.burst,
+            'clients_tracked': self.limiter.clients,
+            'max_pages': self.max_pages,
+            'max_pending_jobs': self.max_pending_jobs,
+            'rejected': {reason: int(ADMISSION_REJECTIONS.value(reason=reason)) for reason in REJECTION_REASONS},
+        }
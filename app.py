@@ -1,14 +1,276 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, g, request, jsonify, render_template_string, stream_with_context
 from flask_cors import CORS
-import tempfile
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_accept_header
+from admission import AdmissionControl, Rejected
+import hashlib
+import hmac
+import math
+import multiprocessing
 import os
+import time
+import zipfile
+from datetime import date
 from medical_extractor import SimpleMedicalExtractor
+from job_queue import JobQueue, JobStore, DEFAULT_JOB_DIR, TERMINAL_EVENTS
+from patient_store import PatientStore, DEFAULT_PATIENT_DB
+from result_cache import ResultCache, version_fingerprint
+from result_format import BATCH_MEDIA_TYPE, RESULT_MEDIA_TYPE, encode_result, encode_results
+from profiler import PROFILE_DEFAULT_INTERVAL, PROFILE_MAX_SECONDS, ProfilerBusy, profile
+from instrumentation import ADMISSION_REJECTIONS, REGISTRY, REQUEST_SECONDS, begin_request_timing, end_request_timing, server_timing_header, timed_stage
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
 
-# Initialize the extractor
-extractor = SimpleMedicalExtractor()
+# Initialize the extractor (reference ranges are re-read when CLINICAL_RANGES_PATH changes)
+extractor = SimpleMedicalExtractor(ranges_check_interval=float(os.environ.get('RANGES_CHECK_INTERVAL', 5)))
+
+# Largest request body (a single upload or a whole batch); larger ones get 413 before they are parsed
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 100 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+MAX_BATCH_FILES = int(os.environ.get('MAX_BATCH_FILES', 500))
+# Zip members are decompressed at most this far per batch, so a small archive cannot expand without bound
+MAX_BATCH_UNZIPPED_BYTES = int(os.environ.get('MAX_BATCH_UNZIPPED_BYTES', 4 * MAX_UPLOAD_BYTES))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 0)) or None
+
+# Hash of the extraction code: cached results and stored raw extractions from other code never match
+EXTRACTION_VERSION = version_fingerprint(extractor)
+
+# Result cache keyed by upload hash + extractor version (RESULT_CACHE_DIR enables the shared disk tier)
+result_cache = ResultCache(
+    EXTRACTION_VERSION,
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 128)),
+    ttl_seconds=float(os.environ.get('RESULT_CACHE_TTL', 3600)),
+    disk_dir=os.environ.get('RESULT_CACHE_DIR') or None,
+    disk_max_entries=int(os.environ.get('RESULT_CACHE_DISK_ENTRIES', 10000))
+)
+
+# Longitudinal store of results for uploads tagged with a patient ID
+patient_store = PatientStore(os.environ.get('PATIENT_DB', DEFAULT_PATIENT_DB))
+
+# Set by gunicorn.conf.py when this module is imported once in the master and shared by forked workers
+PRELOAD_APP = os.environ.get('PRELOAD_APP', '').lower() in ('1', 'true', 'yes')
+
+# Background job queue for long-running analyses (persisted so jobs survive restarts).
+# Under PRELOAD_APP its threads are started in each worker (gunicorn.conf.py post_fork), not the master.
+# Never in a process pool worker, which imports this module again when it is the main script (python app.py).
+job_queue = JobQueue(
+    extractor,
+    JobStore(os.environ.get('JOB_STORE_DIR', DEFAULT_JOB_DIR)),
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    cache=result_cache,
+    patient_store=patient_store,
+    start=not PRELOAD_APP and multiprocessing.parent_process() is None,
+    extraction_version=EXTRACTION_VERSION
+)
+
+# Admission control for the upload endpoints (per process): per-client rate limits, a page cap, and a
+# bounded queue in front of process_pdf so one site's bulk upload cannot starve the others
+admission = AdmissionControl(
+    rate_per_minute=float(os.environ.get('RATE_LIMIT_PER_MINUTE', 60)),
+    rate_burst=int(os.environ.get('RATE_LIMIT_BURST', 10)),
+    max_active=int(os.environ.get('ANALYZE_CONCURRENCY', 0)) or os.cpu_count() or 1,
+    max_queued=int(os.environ.get('ANALYZE_QUEUE_SIZE', 16)),
+    queue_timeout=float(os.environ.get('ANALYZE_QUEUE_TIMEOUT', 30)),
+    max_pages=int(os.environ.get('MAX_PDF_PAGES', 500)),
+    max_pending_jobs=int(os.environ.get('MAX_PENDING_JOBS', 1000))
+)
+# Header naming the client for rate limiting, set by the gateway (e.g. a clinic ID); else the remote address
+ADMISSION_CLIENT_HEADER = os.environ.get('ADMISSION_CLIENT_HEADER')
+ADMITTED_ENDPOINTS = {'analyze_pdf', 'analyze_batch', 'analyze_reports', 'submit_job'}
+
+# Set by gunicorn.conf.py for sync workers, which are killed when a request outlives it and serve
+# one request at a time, so nothing may hold them open
+SYNC_WORKER_TIMEOUT = float(os.environ.get('SYNC_WORKER_TIMEOUT', 0)) or None
+
+# Job progress streams: how often the job store is polled, the idle keepalive interval, and how
+# long one stream stays open before the client reconnects (resuming from Last-Event-ID). On sync
+# workers a stream only sends the events pending when it opens; the client reconnects after
+# SSE_RETRY_MS, which amounts to polling without tying up the worker.
+SSE_POLL_SECONDS = 0.25
+SSE_HEARTBEAT_SECONDS = 15
+SSE_STREAM_SECONDS = 0.0 if SYNC_WORKER_TIMEOUT else float(os.environ.get('SSE_STREAM_SECONDS', 300))
+SSE_RETRY_MS = 1000
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+# Per-request Server-Timing headers with process_pdf stage durations (off by default)
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+
+# Shared secret for GET /api/debug/profile (sent as X-Profiler-Token); the endpoint does not exist without it
+PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN') or None
+
+# Shared secret for the endpoints that change server state for everyone (sent as X-Admin-Token);
+# they do not exist without it
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or None
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    begin_request_timing()
+
+@app.after_request
+def record_request_timing(response):
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    timings = end_request_timing()
+    REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unknown', status=response.status_code)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = server_timing_header(timings, elapsed)
+    return response
+
+def client_id(header_value, remote_addr):
+    """Rate-limit key of a request"""
+    return header_value or remote_addr or 'unknown'
+
+def rejection_response(e):
+    """413/429/503 response for a request refused by admission control"""
+    return jsonify({'error': e.message}), e.status, e.headers
+
+@app.before_request
+def admit_request():
+    """Rate-limit the upload endpoints before their body is read, then parse it under MAX_CONTENT_LENGTH"""
+    if request.endpoint not in ADMITTED_ENDPOINTS:
+        return None
+    try:
+        admission.check_rate(client_id(request.headers.get(ADMISSION_CLIENT_HEADER) if ADMISSION_CLIENT_HEADER else None,
+                                       request.remote_addr))
+    except Rejected as e:
+        return rejection_response(e)
+    # Parsing here (not inside the routes' error handling) turns an oversized body into a 413
+    request.files
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    ADMISSION_REJECTIONS.inc(reason='too_large')
+    return jsonify({'error': f'Upload exceeds {MAX_UPLOAD_BYTES} bytes'}), 413
+
+def store_visit(visit, sha256, results, raw=None):
+    """Save results (and the raw extraction, for re-deriving) under the patient visit, if the upload named one; returns the visit ID"""
+    if visit is None:
+        return None
+    patient_id, visit_date = visit
+    with timed_stage('store_visit'):
+        visit_id = patient_store.add_visit(patient_id, visit_date, results, sha256)
+        if raw is not None:
+            patient_store.add_raw_extractions([(sha256, EXTRACTION_VERSION, raw)])
+        return visit_id
+
+def stored_raw_extraction(sha256):
+    """Raw extraction of an upload already stored with a visit (by this extraction code), else None"""
+    with timed_stage('raw_lookup'):
+        return patient_store.raw_extraction(sha256, EXTRACTION_VERSION)
+
+def cached_analysis(sha256, ranges, visit):
+    """/api/analyze response for an upload whose result is cached under `ranges`, else None"""
+    cached_results = result_cache.get(result_cache.key_from_digest(sha256, ranges.version))
+    if cached_results is None:
+        return None
+    return {
+        'success': True,
+        'cached': True,
+        'visit_id': store_visit(visit, sha256, cached_results),
+        'data': cached_results
+    }
+
+def completed_analysis(sha256, results, visit, raw=None):
+    """/api/analyze response for fresh results, caching and storing them unless processing failed"""
+    visit_id = None
+    if 'error' not in results:
+        result_cache.put(result_cache.key_from_digest(sha256, results['range_version']), results)
+        visit_id = store_visit(visit, sha256, results, raw)
+    return {
+        'success': True,
+        'cached': False,
+        'visit_id': visit_id,
+        'data': results
+    }
+
+def accepts_binary(accept, media_type):
+    """True if an Accept header prefers `media_type` to JSON; JSON wins ties, */* and a missing header"""
+    return parse_accept_header(accept or '', MIMEAccept).best_match(['application/json', media_type]) == media_type
+
+def binary_analysis(payload):
+    """Binary /api/analyze body, with the rest of the JSON envelope as headers"""
+    headers = {'X-Cached': 'true' if payload['cached'] else 'false'}
+    if payload['visit_id'] is not None:
+        headers['X-Visit-Id'] = str(payload['visit_id'])
+    return encode_result(payload['data']), headers
+
+def analysis_response(payload):
+    """/api/analyze payload as JSON, or as a binary result record when the client asks for one"""
+    if accepts_binary(request.headers.get('Accept'), RESULT_MEDIA_TYPE):
+        body, headers = binary_analysis(payload)
+        response = Response(body, mimetype=RESULT_MEDIA_TYPE, headers=headers)
+    else:
+        response = jsonify(payload)
+    response.vary.add('Accept')
+    return response
+
+def ranges_payload(ranges):
+    """JSON view of a clinical ranges snapshot"""
+    return {
+        'range_version': ranges.version,
+        'clinical_ranges': ranges.reference_ranges,
+        'critical_floors': ranges.critical_floors,
+        'hearing_loss_db': {'normal_max': ranges.hearing_loss.normal_max, 'mild_max': ranges.hearing_loss.mild_max,
+                            'moderate_max': ranges.hearing_loss.moderate_max},
+        'asymmetry_db': {'normal_max': ranges.asymmetry.normal_max, 'mild_max': ranges.asymmetry.mild_max,
+                         'moderate_max': ranges.asymmetry.moderate_max},
+        'cognision_max_htl_db': ranges.cognision_max_htl
+    }
+
+def sse_message(event):
+    """Server-Sent Events frame for a job store event"""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {app.json.dumps(event['data'])}\n\n"
+
+def last_event_id(value):
+    """Event ID to resume after, from a Last-Event-ID header or ?after= value"""
+    return int(value) if value and value.isdigit() else 0
+
+def parse_visit(patient_id, visit_date):
+    """(patient_id, ISO visit date) from raw form values, None without a patient ID; raises ValueError on a bad date"""
+    patient_id = (patient_id or '').strip()
+    if not patient_id:
+        return None
+    visit_date = (visit_date or '').strip()
+    visit_date = date.fromisoformat(visit_date).isoformat() if visit_date else date.today().isoformat()
+    return patient_id, visit_date
+
+def visit_from_form():
+    """Optional 'patient_id' and 'visit_date' (YYYY-MM-DD, default today) form fields"""
+    return parse_visit(request.form.get('patient_id'), request.form.get('visit_date'))
+
+def pdf_upload_error():
+    """Why the request's 'pdf' file cannot be analyzed (shared by the single-PDF upload routes); None when it is fine"""
+    if 'pdf' not in request.files:
+        return 'No PDF file uploaded'
+    filename = request.files['pdf'].filename
+    if filename == '':
+        return 'No file selected'
+    if not filename.lower().endswith('.pdf'):
+        return 'File must be a PDF'
+    return None
+
+def sends_token(header, token):
+    """Whether the request sends `token` in `header`; never when the token is not configured"""
+    sent = request.headers.get(header, '')
+    return token is not None and hmac.compare_digest(sent.encode(), token.encode())
+
+def report_visit(visit, segment):
+    """The form's visit for one report of a combined export, dated by the report's own test date when it has one.
+    None for a report naming another patient, which must not be stored under the form's patient_id"""
+    if visit is None or patient_mismatch(visit, segment):
+        return None
+    if segment.test_date is None:
+        return visit
+    return visit[0], segment.test_date
+
+def patient_mismatch(visit, segment):
+    """Why a report of a combined export is not stored under the form's patient_id; None when it can be"""
+    if visit is None or segment.patient_id is None or segment.patient_id == visit[0]:
+        return None
+    return f'Report is for patient {segment.patient_id}, not {visit[0]}; not stored'
 
 @app.route('/')
 def index():
@@ -20,41 +282,42 @@ def index():
 def analyze_pdf():
     """Analyze uploaded PDF using the medical extractor"""
     try:
-        # Check if PDF file was uploaded
-        if 'pdf' not in request.files:
-            return jsonify({'error': 'No PDF file uploaded'}), 400
+        error = pdf_upload_error()
+        if error:
+            return jsonify({'error': error}), 400
         
         pdf_file = request.files['pdf']
         
-        if pdf_file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if not pdf_file.filename.lower().endswith('.pdf'):
-            return jsonify({'error': 'File must be a PDF'}), 400
+        try:
+            visit = visit_from_form()
+        except ValueError:
+            return jsonify({'error': 'visit_date must be YYYY-MM-DD'}), 400
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            pdf_file.save(temp_file.name)
-            temp_path = temp_file.name
+        with timed_stage('upload'):
+            pdf_bytes = pdf_file.read()
+        sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+        ranges = extractor.ranges.current()
+        cached = cached_analysis(sha256, ranges, visit)
+        if cached is not None:
+            return analysis_response(cached)
         
         try:
-            # Process PDF using your extractor
-            results = extractor.process_pdf(temp_path)
-            
-            # Clean up temporary file
-            os.unlink(temp_path)
+            # A report stored before (e.g. under older ranges) only needs re-deriving, not re-parsing
+            raw = stored_raw_extraction(sha256)
+            if raw is None:
+                # Refuse oversized reports before parsing, then wait (boundedly) for an analysis slot
+                admission.check_pages(pdf_bytes)
+                with admission.analysis_slot():
+                    # Process the upload buffer directly, without a temp-file round trip
+                    raw = extractor.extract_raw(pdf_bytes)
+            results = raw if 'error' in raw else extractor.derive(raw, ranges)
             
-            # Return results as JSON
-            return jsonify({
-                'success': True,
-                'data': results
-            })
+            # Return results as JSON (or the binary record, if asked for)
+            return analysis_response(completed_analysis(sha256, results, visit, raw))
             
+        except Rejected as e:
+            return rejection_response(e)
         except Exception as processing_error:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            
             return jsonify({
                 'error': f'Error processing PDF: {str(processing_error)}'
             }), 500
@@ -64,20 +327,361 @@ def analyze_pdf():
             'error': f'Server error: {str(e)}'
         }), 500
 
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze many PDFs (multipart 'pdfs' files and/or .zip archives) on a process pool"""
+    uploads = request.files.getlist('pdfs')
+    if not uploads:
+        return jsonify({'error': 'No PDF files uploaded'}), 400
+    
+    try:
+        sources_by_name = {}
+        errors = {}
+        
+        def unique_name(name):
+            # Results and errors share one namespace, so no entry can overwrite another
+            key = name
+            counter = 2
+            while key in sources_by_name or key in errors:
+                key = f'{name} ({counter})'
+                counter += 1
+            return key
+        
+        def add_pdf(name, pdf_bytes):
+            try:
+                admission.check_pages(pdf_bytes)
+            except Rejected as e:
+                errors[unique_name(name)] = {'error': e.message}
+            else:
+                sources_by_name[unique_name(name)] = pdf_bytes
+        
+        unzipped_bytes = 0
+        for upload in uploads:
+            filename = os.path.basename(upload.filename or '')
+            if filename.lower().endswith('.zip'):
+                try:
+                    with zipfile.ZipFile(upload.stream) as archive:
+                        for member in archive.infolist():
+                            if member.is_dir() or not member.filename.lower().endswith('.pdf'):
+                                continue
+                            # Members are named after their archive, so same-named files from two zips stay apart
+                            name = f'{filename}/{member.filename}'
+                            if member.file_size > MAX_UPLOAD_BYTES:
+                                errors[unique_name(name)] = {'error': f'File exceeds {MAX_UPLOAD_BYTES} bytes'}
+                                continue
+                            if unzipped_bytes + member.file_size > MAX_BATCH_UNZIPPED_BYTES:
+                                return jsonify({'error': f'Batch expands to more than {MAX_BATCH_UNZIPPED_BYTES} bytes'}), 413
+                            # The declared size can lie; never read past the limit
+                            with archive.open(member) as member_file:
+                                pdf_bytes = member_file.read(MAX_UPLOAD_BYTES + 1)
+                            unzipped_bytes += len(pdf_bytes)
+                            if len(pdf_bytes) > MAX_UPLOAD_BYTES:
+                                errors[unique_name(name)] = {'error': f'File exceeds {MAX_UPLOAD_BYTES} bytes'}
+                                continue
+                            add_pdf(name, pdf_bytes)
+                            if len(sources_by_name) > MAX_BATCH_FILES:
+                                break
+                except zipfile.BadZipFile:
+                    errors[unique_name(filename)] = {'error': 'File is not a valid zip archive'}
+            elif filename.lower().endswith('.pdf'):
+                add_pdf(filename, upload.read())
+            else:
+                errors[unique_name(filename)] = {'error': 'File must be a PDF or a zip of PDFs'}
+            
+            if len(sources_by_name) > MAX_BATCH_FILES:
+                return jsonify({'error': f'Batch exceeds {MAX_BATCH_FILES} files'}), 413
+        
+        if not sources_by_name:
+            return jsonify({'error': 'No PDF files found in upload', 'results': errors}), 400
+        
+        # A batch runs on its own process pool and takes one analysis slot per pool process
+        slots = admission.batch_slots(len(sources_by_name), BATCH_WORKERS)
+        with admission.analysis_slot(slots):
+            results = extractor.process_many(sources_by_name, max_workers=slots)
+        results.update(errors)
+        failed = sum(1 for result in results.values() if 'error' in result)
+        
+        if accepts_binary(request.headers.get('Accept'), BATCH_MEDIA_TYPE):
+            response = Response(encode_results(results), mimetype=BATCH_MEDIA_TYPE,
+                                headers={'X-Count': str(len(results)), 'X-Failed': str(failed)})
+        else:
+            response = jsonify({
+                'success': True,
+                'count': len(results),
+                'failed': failed,
+                'results': results
+            })
+        response.vary.add('Accept')
+        return response
+    
+    except Rejected as e:
+        return rejection_response(e)
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/analyze/reports', methods=['POST'])
+def analyze_reports():
+    """Analyze a combined export (several visits in one PDF): one result per report, duplicates skipped"""
+    try:
+        error = pdf_upload_error()
+        if error:
+            return jsonify({'error': error}), 400
+        
+        pdf_file = request.files['pdf']
+        
+        try:
+            visit = visit_from_form()
+        except ValueError:
+            return jsonify({'error': 'visit_date must be YYYY-MM-DD'}), 400
+        
+        with timed_stage('upload'):
+            pdf_bytes = pdf_file.read()
+        ranges = extractor.ranges.current()
+        
+        admission.check_pages(pdf_bytes)
+        # Splitting takes one analysis slot; the reports left to extract then run on their own process
+        # pool and take one slot per pool process, like a batch
+        with admission.analysis_slot():
+            segments = extractor.split_reports(pdf_bytes)
+        if not segments:
+            return jsonify({'error': 'Could not extract text from PDF'}), 400
+        
+        # An export holding a single report (no dropped pages) is keyed by the file's hash, as
+        # /api/analyze keys it, so either route finds the other's cached result and stored visit.
+        # Reports of a larger export are keyed by a hash of their pages' content, which only
+        # matches the same report in another export, not an upload of that report alone.
+        if len(segments) == 1 and not segments[0].skipped_pages:
+            segments[0].sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+        payloads = {}
+        for segment in segments:
+            if segment.duplicate_of is None:
+                payloads[segment.index] = cached_analysis(segment.sha256, ranges, report_visit(visit, segment))
+                if payloads[segment.index] is None:
+                    segment.raw = stored_raw_extraction(segment.sha256)
+        pending = [segment for segment in segments
+                   if segment.duplicate_of is None and payloads[segment.index] is None and segment.raw is None]
+        if pending:
+            slots = admission.batch_slots(len(pending), BATCH_WORKERS)
+            with admission.analysis_slot(slots):
+                extractor.extract_reports(pending, max_workers=slots)
+        
+        reports = []
+        duplicates = []
+        for segment in segments:
+            if segment.duplicate_of is not None:
+                duplicates.append(segment.to_dict())
+                continue
+            payload = payloads[segment.index]
+            if payload is None:
+                results = segment.raw if 'error' in segment.raw else extractor.derive(segment.raw, ranges)
+                payload = completed_analysis(segment.sha256, results, report_visit(visit, segment), segment.raw)
+            reports.append(dict(segment.to_dict(), cached=payload['cached'], visit_id=payload['visit_id'],
+                                visit_error=patient_mismatch(visit, segment), data=payload['data']))
+        
+        return jsonify({
+            'success': True,
+            'count': len(reports),
+            'failed': sum(1 for report in reports if 'error' in report['data']),
+            'reports': reports,
+            'duplicates': duplicates
+        })
+    
+    except Rejected as e:
+        return rejection_response(e)
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue an uploaded PDF for background analysis and return its job ID"""
+    try:
+        error = pdf_upload_error()
+        if error:
+            return jsonify({'error': error}), 400
+        
+        pdf_file = request.files['pdf']
+        
+        try:
+            visit = visit_from_form()
+        except ValueError:
+            return jsonify({'error': 'visit_date must be YYYY-MM-DD'}), 400
+        
+        pdf_bytes = pdf_file.read()
+        admission.check_pages(pdf_bytes)
+        admission.check_job_backlog(job_queue.pending())
+        job_id = job_queue.submit(pdf_file.filename, pdf_bytes, visit)
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/jobs/{job_id}'
+        }), 202
+        
+    except Rejected as e:
+        return rejection_response(e)
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get status, timing and (when finished) the result of a job; a finished result can be sent as a binary record"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if 'result' in job and accepts_binary(request.headers.get('Accept'), RESULT_MEDIA_TYPE):
+        response = Response(encode_result(job['result']), mimetype=RESULT_MEDIA_TYPE,
+                            headers={'X-Job-Status': job['status'], 'X-Run-Seconds': str(job['run_seconds'])})
+    else:
+        response = jsonify(job)
+    response.vary.add('Accept')
+    return response
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Stream a job's progress (queued, started, each process_pdf stage, done/failed) as Server-Sent Events"""
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    after_id = last_event_id(request.headers.get('Last-Event-ID') or request.args.get('after'))
+    
+    def generate(after_id):
+        yield f'retry: {SSE_RETRY_MS}\n\n'
+        deadline = time.monotonic() + SSE_STREAM_SECONDS
+        last_sent = time.monotonic()
+        while True:
+            for event in job_queue.events(job_id, after_id):
+                after_id = event['id']
+                last_sent = time.monotonic()
+                yield sse_message(event)
+                if event['event'] in TERMINAL_EVENTS:
+                    return
+            if time.monotonic() >= deadline:
+                return
+            if time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                last_sent = time.monotonic()
+                yield ': keepalive\n\n'
+            time.sleep(SSE_POLL_SECONDS)
+    
+    return Response(stream_with_context(generate(after_id)), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@app.route('/api/patients/<patient_id>/trend', methods=['GET'])
+def get_patient_trend(patient_id):
+    """Values of one metric across a patient's visits, oldest first (optional since/until dates)"""
+    metric = request.args.get('metric')
+    if not metric:
+        return jsonify({'error': 'metric query parameter is required'}), 400
+    if metric not in extractor.clinical_ranges:
+        return jsonify({'error': f'Unknown metric: {metric}'}), 400
+    
+    return jsonify({
+        'patient_id': patient_id,
+        'metric': metric,
+        'points': patient_store.trend(patient_id, metric, request.args.get('since'), request.args.get('until'))
+    })
+
+@app.route('/api/patients/<patient_id>/visits', methods=['GET'])
+def get_patient_visits(patient_id):
+    """Every stored visit of a patient with its values, interpretations and asymmetry analysis"""
+    visits = patient_store.visits(patient_id)
+    if not visits:
+        return jsonify({'error': 'Patient not found'}), 404
+    return jsonify({'patient_id': patient_id, 'visits': visits})
+
+@app.route('/api/reinterpret', methods=['POST'])
+def reinterpret_visits():
+    """Re-derive stored visits (all, or one patient's with ?patient_id=) from their raw extractions under the current ranges"""
+    if not sends_token('X-Admin-Token', ADMIN_TOKEN):
+        return jsonify({'error': 'Not found'}), 404
+    
+    ranges = extractor.ranges.current()
+    start = time.perf_counter()
+    try:
+        # Re-deriving is CPU work like an analysis, so it waits its turn for an analysis slot
+        with admission.analysis_slot():
+            stats = patient_store.rederive(lambda raw: extractor.derive(raw, ranges), request.args.get('patient_id'),
+                                           extraction_version=EXTRACTION_VERSION)
+    except Rejected as e:
+        return rejection_response(e)
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
+    
+    return jsonify({
+        'success': True,
+        'range_version': ranges.version,
+        **stats,
+        'seconds': round(time.perf_counter() - start, 3)
+    })
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'message': 'Medical PDF Analysis API is running'
+        'message': 'Medical PDF Analysis API is running',
+        'cache': result_cache.stats(),
+        'range_version': extractor.ranges.current().version,
+        'range_reload_error': extractor.ranges.last_error,
+        'ocr': {'engine': extractor.ocr.command, 'cache': extractor.ocr.cache.stats()},
+        'admission': admission.stats(),
+        'jobs_pending': job_queue.pending()
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this worker (stage latencies, page counts, sizes, errors)"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/debug/profile', methods=['GET'])
+def debug_profile():
+    """Sample this worker's threads for ?seconds= (default 10) and return collapsed stacks for a flame graph"""
+    if not sends_token('X-Profiler-Token', PROFILER_TOKEN):
+        return jsonify({'error': 'Not found'}), 404
+    
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval', PROFILE_DEFAULT_INTERVAL))
+    except ValueError:
+        return jsonify({'error': 'seconds and interval must be numbers'}), 400
+    if not (math.isfinite(seconds) and math.isfinite(interval)):
+        return jsonify({'error': 'seconds and interval must be finite'}), 400
+    
+    seconds = min(max(seconds, 0.0), PROFILE_MAX_SECONDS)
+    if SYNC_WORKER_TIMEOUT:
+        # A sync worker profiling for longer than its timeout would be killed mid-profile
+        seconds = min(seconds, SYNC_WORKER_TIMEOUT * 2 / 3)
+    interval = min(interval, seconds)
+    try:
+        stacks, samples = profile(seconds, interval)
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    return Response(stacks, mimetype='text/plain', headers={'X-Profile-Samples': str(samples), 'X-Profile-Pid': str(os.getpid()),
+                                                            'X-Profile-Seconds': f'{seconds:g}'})
+
 @app.route('/api/clinical-ranges', methods=['GET'])
 def get_clinical_ranges():
-    """Get clinical reference ranges"""
-    return jsonify({
-        'clinical_ranges': extractor.clinical_ranges
-    })
+    """Get clinical reference ranges and hearing thresholds, with their version"""
+    ranges = extractor.ranges.current()
+    return jsonify(ranges_payload(ranges))
+
+@app.route('/api/clinical-ranges/reload', methods=['POST'])
+def reload_clinical_ranges():
+    """Re-read the ranges config now (other workers pick up file changes within RANGES_CHECK_INTERVAL)"""
+    if not sends_token('X-Admin-Token', ADMIN_TOKEN):
+        return jsonify({'error': 'Not found'}), 404
+    
+    try:
+        ranges = extractor.ranges.reload()
+    except (OSError, ValueError) as e:
+        return jsonify({'error': f'Could not load clinical ranges: {str(e)}'}), 400
+    return jsonify(dict(ranges_payload(ranges), success=True))
 
 if __name__ == '__main__':
     # For development
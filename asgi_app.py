@@ -0,0 +1,443 @@
+"""ASGI serving mode for slow or large uploads.
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 10000
+
+POST /api/analyze and POST /api/jobs read the multipart body chunk by chunk as it arrives, enforce
+MAX_UPLOAD_BYTES, and hash the PDF while it streams in, so a slow client only costs an idle
+coroutine instead of a blocked worker. process_pdf runs on a process pool (PDF_WORKERS), behind the
+same rate limits, page cap and bounded analysis queue as the Flask app (admission.py).
+GET /api/jobs/<job_id>/events streams job progress without holding a thread per client, and
+every other route is served by the Flask app from app.py on a thread.
+
+Stage metrics of analyses run on the pool are recorded in the pool processes, so /api/metrics in
+this mode only shows request latencies and the stages run in the serving process.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+import medical_extractor
+from admission import Rejected
+from app import (
+    ADMISSION_CLIENT_HEADER, MAX_UPLOAD_BYTES, SSE_HEADERS, SSE_HEARTBEAT_SECONDS, SSE_POLL_SECONDS, SSE_RETRY_MS,
+    SSE_STREAM_SECONDS, accepts_binary, admission, app as flask_app, binary_analysis, cached_analysis, client_id,
+    completed_analysis, extractor, job_queue, last_event_id, parse_visit, sse_message, stored_raw_extraction
+)
+from job_queue import TERMINAL_EVENTS
+from pdf_lock import POOL_CONTEXT
+from result_format import RESULT_MEDIA_TYPE
+from instrumentation import ADMISSION_REJECTIONS, REQUEST_SECONDS, record_stage
+
+MAX_FORM_FIELD_BYTES = 64 * 1024
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 0)) or None
+JOB_EVENTS_PATH = re.compile(r'/api/jobs/([^/]+)/events')
+
+_pdf_pool = None
+# Requests waiting for an analysis slot block one of these threads (never the event loop); the
+# queue refuses waiters beyond its bound, so this never runs out
+_slot_waiters = ThreadPoolExecutor(max_workers=admission.queue.max_queued + admission.queue.max_active,
+                                   thread_name_prefix='admission')
+
+
+class UploadError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class Upload:
+    """A streamed multipart form: the 'pdf' file (bytes and SHA-256) plus the small text fields"""
+
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.pdf = bytearray()
+        self.sha256 = hashlib.sha256()
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=POOL_CONTEXT,
+                                        initializer=medical_extractor._init_worker)
+    return _pdf_pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool (a worker died), so the next _pool() call starts a fresh one"""
+    global _pdf_pool
+    if _pdf_pool is pool:
+        _pdf_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_on_pool(func, *args):
+    """func(*args) on the process pool. A pool found broken on submit (by an earlier analysis) is
+    replaced and the call resubmitted once; BrokenProcessPool from the call itself is raised after
+    discarding the pool, since resubmitting a PDF that crashed a worker would only crash the next."""
+    for attempt in range(2):
+        pool = _pool()
+        try:
+            future = pool.submit(func, *args)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            if attempt:
+                raise
+            continue
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+
+
+def _header(scope: Dict, name: bytes) -> Optional[str]:
+    for key, value in scope['headers']:
+        if key.lower() == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def _json_response(send, status: int, payload: Dict, extra_headers: List[Tuple[bytes, bytes]] = ()):
+    body = flask_app.json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()), *extra_headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _analysis_response(scope: Dict, send, payload: Dict):
+    """/api/analyze payload as JSON, or as a binary result record when the Accept header asks for one"""
+    if not accepts_binary(_header(scope, b'accept'), RESULT_MEDIA_TYPE):
+        return await _json_response(send, 200, payload, [(b'vary', b'Accept')])
+    body, headers = binary_analysis(payload)
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', RESULT_MEDIA_TYPE.encode()), (b'content-length', str(len(body)).encode()),
+                    (b'vary', b'Accept'), *((name.lower().encode(), value.encode()) for name, value in headers.items())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def read_upload(scope: Dict, receive) -> Upload:
+    """Parse a multipart body as it arrives, keeping only the 'pdf' file and text fields"""
+    content_length = _header(scope, b'content-length')
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise UploadError(413, f'Upload exceeds {MAX_UPLOAD_BYTES} bytes')
+
+    mimetype, options = parse_options_header(_header(scope, b'content-type') or '')
+    if mimetype != 'multipart/form-data' or 'boundary' not in options:
+        raise UploadError(400, 'No PDF file uploaded')
+
+    decoder = MultipartDecoder(options['boundary'].encode())
+    upload = Upload()
+    received = 0
+    part = None  # ('field', name, buffer) or ('pdf',) or ('skip',)
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        chunk = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        received += len(chunk)
+        if received > MAX_UPLOAD_BYTES:
+            raise UploadError(413, f'Upload exceeds {MAX_UPLOAD_BYTES} bytes')
+
+        try:
+            decoder.receive_data(chunk)
+            if not more_body:
+                decoder.receive_data(None)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    if event.name == 'pdf' and upload.filename is None:
+                        upload.filename = event.filename or ''
+                        part = ('pdf',)
+                    else:
+                        part = ('skip',)
+                elif isinstance(event, Field):
+                    part = ('field', event.name, bytearray())
+                elif isinstance(event, Data):
+                    if part[0] == 'pdf':
+                        upload.pdf += event.data
+                        upload.sha256.update(event.data)
+                    elif part[0] == 'field':
+                        part[2].extend(event.data)
+                        if len(part[2]) > MAX_FORM_FIELD_BYTES:
+                            raise UploadError(413, f'Form field {part[1]} is too large')
+                        if not event.more_data:
+                            upload.fields[part[1]] = part[2].decode('utf-8', 'replace')
+                event = decoder.next_event()
+        except ValueError:
+            raise UploadError(400, 'Malformed multipart body')
+
+    return upload
+
+
+def _upload_error(upload: Upload) -> Optional[str]:
+    """Why the upload cannot be analyzed, with the same messages as app.pdf_upload_error; None when it is fine"""
+    if upload.filename is None:
+        return 'No PDF file uploaded'
+    if upload.filename == '':
+        return 'No file selected'
+    if not upload.filename.lower().endswith('.pdf'):
+        return 'File must be a PDF'
+    return None
+
+
+def _client(scope: Dict) -> str:
+    return client_id(_header(scope, ADMISSION_CLIENT_HEADER.lower().encode()) if ADMISSION_CLIENT_HEADER else None,
+                     (scope.get('client') or (None,))[0])
+
+
+async def analyze_pdf(scope: Dict, receive, send):
+    admission.check_rate(_client(scope))
+    start = time.perf_counter()
+    upload = await read_upload(scope, receive)
+    record_stage('upload', time.perf_counter() - start)
+
+    error = _upload_error(upload)
+    if error:
+        return await _json_response(send, 400, {'error': error})
+    try:
+        visit = parse_visit(upload.fields.get('patient_id'), upload.fields.get('visit_date'))
+    except ValueError:
+        return await _json_response(send, 400, {'error': 'visit_date must be YYYY-MM-DD'})
+
+    loop = asyncio.get_running_loop()
+    sha256 = upload.sha256.hexdigest()
+    ranges = extractor.ranges.current()
+    cached = await loop.run_in_executor(None, cached_analysis, sha256, ranges, visit)
+    if cached is not None:
+        return await _analysis_response(scope, send, cached)
+
+    # A report stored before only needs re-deriving; otherwise it is parsed on the pool
+    raw = await loop.run_in_executor(None, stored_raw_extraction, sha256)
+    if raw is None:
+        await loop.run_in_executor(None, admission.check_pages, bytes(upload.pdf))
+        started = await loop.run_in_executor(_slot_waiters, admission.queue.acquire)
+        try:
+            raw = await _run_on_pool(medical_extractor._extract_raw_worker, bytes(upload.pdf))
+        except BrokenProcessPool:
+            return await _json_response(send, 503, {'error': 'PDF worker process failed, try again later'},
+                                        [(b'retry-after', b'1')])
+        except Exception as e:
+            return await _json_response(send, 500, {'error': f'Error processing PDF: {str(e)}'})
+        finally:
+            admission.queue.release(started)
+    results = raw if 'error' in raw else await loop.run_in_executor(None, extractor.derive, raw, ranges)
+    await _analysis_response(scope, send, await loop.run_in_executor(None, completed_analysis, sha256, results, visit, raw))
+
+
+async def submit_job(scope: Dict, receive, send):
+    admission.check_rate(_client(scope))
+    upload = await read_upload(scope, receive)
+
+    error = _upload_error(upload)
+    if error:
+        return await _json_response(send, 400, {'error': error})
+    try:
+        visit = parse_visit(upload.fields.get('patient_id'), upload.fields.get('visit_date'))
+    except ValueError:
+        return await _json_response(send, 400, {'error': 'visit_date must be YYYY-MM-DD'})
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, admission.check_pages, bytes(upload.pdf))
+    admission.check_job_backlog(await loop.run_in_executor(None, job_queue.pending))
+    job_id = await loop.run_in_executor(None, job_queue.submit, upload.filename, bytes(upload.pdf), visit)
+    await _json_response(send, 202, {
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}'
+    })
+
+
+async def stream_job_events(scope: Dict, receive, send):
+    job_id = JOB_EVENTS_PATH.fullmatch(scope['path']).group(1)
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, job_queue.get, job_id) is None:
+        return await _json_response(send, 404, {'error': 'Job not found'})
+    after = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('after', [None])[0]
+    after_id = last_event_id(_header(scope, b'last-event-id') or after)
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    headers = [(b'content-type', b'text/event-stream; charset=utf-8')]
+    headers += [(name.lower().encode(), value.encode()) for name, value in SSE_HEADERS.items()]
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': f'retry: {SSE_RETRY_MS}\n\n'.encode(), 'more_body': True})
+    try:
+        deadline = time.monotonic() + SSE_STREAM_SECONDS
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            events = await loop.run_in_executor(None, job_queue.events, job_id, after_id)
+            for event in events:
+                after_id = event['id']
+                await send({'type': 'http.response.body', 'body': sse_message(event).encode(), 'more_body': True})
+                if event['event'] in TERMINAL_EVENTS:
+                    return await send({'type': 'http.response.body', 'body': b''})
+            if events:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                last_sent = time.monotonic()
+                await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+            try:
+                await asyncio.wait_for(disconnected.wait(), SSE_POLL_SECONDS)
+                return
+            except asyncio.TimeoutError:
+                pass
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+
+
+STREAMED_ROUTES = {('POST', '/api/analyze'): analyze_pdf, ('POST', '/api/jobs'): submit_job}
+
+
+async def _read_body(receive) -> bytes:
+    body = bytearray()
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if len(body) > MAX_UPLOAD_BYTES:
+            raise UploadError(413, f'Upload exceeds {MAX_UPLOAD_BYTES} bytes')
+    return bytes(body)
+
+
+def _wsgi_environ(scope: Dict, body: bytes) -> Dict:
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for key, value in scope['headers']:
+        name = key.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            header = f'HTTP_{name}'
+            environ[header] = f'{environ[header]},{value}' if header in environ else value
+    return environ
+
+
+def _call_flask(environ: Dict) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    chunks = flask_app(environ, start_response)
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return response['status'], response['headers'], body
+
+
+async def call_flask(scope: Dict, receive, send):
+    """Serve a request with the Flask app on a worker thread"""
+    body = await _read_body(receive)
+    status, headers, response_body = await asyncio.get_running_loop().run_in_executor(
+        None, _call_flask, _wsgi_environ(scope, body)
+    )
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': response_body})
+
+
+async def _lifespan(receive, send):
+    global _pdf_pool
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _pdf_pool is not None:
+                _pdf_pool.shutdown(wait=False, cancel_futures=True)
+                _pdf_pool = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope: Dict, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    handler = STREAMED_ROUTES.get((scope['method'], scope['path']))
+    if handler is None and scope['method'] == 'GET' and JOB_EVENTS_PATH.fullmatch(scope['path']):
+        handler = stream_job_events
+    if handler is None:
+        return await call_flask(scope, receive, send)
+
+    start = time.perf_counter()
+    response = {'status': 499}
+
+    async def send_tracked(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_tracked)
+    except UploadError as e:
+        if e.status == 413:
+            ADMISSION_REJECTIONS.inc(reason='too_large')
+        await _json_response(send_tracked, e.status, {'error': e.message}, [(b'connection', b'close')])
+    except Rejected as e:
+        headers = [(name.lower().encode(), value.encode()) for name, value in e.headers.items()]
+        await _json_response(send_tracked, e.status, {'error': e.message}, [*headers, (b'connection', b'close')])
+    except ClientDisconnected:
+        pass
+    except Exception as e:
+        await _json_response(send_tracked, 500, {'error': f'Server error: {str(e)}'})
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=f'asgi_{handler.__name__}', status=response['status'])
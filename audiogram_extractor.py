@@ -0,0 +1,287 @@
+"""Deterministic audiogram extraction from PDF pages.
+
+The plot is located from its axis labels in the text layer (frequency labels in one row, dB HTL
+labels in one column), which gives both the plot region and a calibration from page coordinates
+to (frequency, dB). Ear markers are then read from vector drawings inside that region (red/O =
+right ear, blue/X = left ear); if none are drawn as vectors, the region is rasterized and
+red/blue marker blobs are located with OpenCV.
+"""
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import fitz
+
+AUDIOGRAM_KEYWORDS = ('audiogram', 'hearing test')
+
+# Labels that may appear on the frequency axis; only `frequencies` are reported
+AXIS_FREQUENCIES = (125, 250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000)
+DB_LABELS = tuple(range(-10, 130, 10))
+
+ROW_TOLERANCE = 3.0
+COLUMN_TOLERANCE = 4.0
+MIN_AXIS_LABELS = 3
+DB_STEP = 5
+
+_FREQUENCY_LABEL = re.compile(r'^(\d+(?:[.,]\d+)?)\s*(k|khz|hz)?$', re.IGNORECASE)
+_DB_LABEL = re.compile(r'^-?\d{1,3}$')
+
+
+def _parse_frequency(label: str) -> Optional[int]:
+    match = _FREQUENCY_LABEL.match(label.strip())
+    if not match:
+        return None
+    number, unit = match.groups()
+    number = number.replace(',', '' if unit is None or unit.lower() == 'hz' else '.')
+    try:
+        value = float(number)
+    except ValueError:
+        return None
+    if unit and unit.lower() in ('k', 'khz'):
+        value *= 1000
+    value = int(round(value))
+    return value if value in AXIS_FREQUENCIES else None
+
+
+def _linear_fit(xs: Sequence[float], ys: Sequence[float]) -> Tuple[float, float]:
+    """Least-squares y = slope * x + intercept"""
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    return slope, mean_y - slope * mean_x
+
+
+def _group(items: List[Tuple[float, object]], tolerance: float) -> List[List[Tuple[float, object]]]:
+    """Cluster (coordinate, payload) pairs whose coordinates lie within `tolerance` of the group start"""
+    groups = []
+    for item in sorted(items, key=lambda item: item[0]):
+        if groups and item[0] - groups[-1][0][0] <= tolerance:
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+    return groups
+
+
+def _segments_intersect(a: Tuple[fitz.Point, fitz.Point], b: Tuple[fitz.Point, fitz.Point]) -> bool:
+    def orientation(p, q, r):
+        return (q.x - p.x) * (r.y - p.y) - (q.y - p.y) * (r.x - p.x)
+
+    d1 = orientation(b[0], b[1], a[0])
+    d2 = orientation(b[0], b[1], a[1])
+    d3 = orientation(a[0], a[1], b[0])
+    d4 = orientation(a[0], a[1], b[1])
+    return d1 * d2 < 0 and d3 * d4 < 0
+
+
+def _ear_from_color(color) -> Optional[str]:
+    if not color or len(color) < 3:
+        return None
+    r, g, b = color[:3]
+    if r > 0.5 and g < 0.4 and b < 0.4:
+        return 'right_ear'
+    if b > 0.5 and r < 0.4 and g < 0.6:
+        return 'left_ear'
+    return None
+
+
+class AudiogramPlot:
+    """Calibrated plot region: maps page coordinates to (frequency Hz, dB HTL)"""
+
+    def __init__(self, rect: fitz.Rect, x_slope: float, x_intercept: float, y_slope: float, y_intercept: float):
+        self.rect = rect
+        self.x_slope = x_slope
+        self.x_intercept = x_intercept
+        self.y_slope = y_slope
+        self.y_intercept = y_intercept
+        # Page distance of one octave, used to size markers and snap frequencies
+        self.octave_width = abs(x_slope)
+
+    def frequency_at(self, x: float) -> float:
+        return 2 ** ((x - self.x_intercept) / self.x_slope)
+
+    def db_at(self, y: float) -> float:
+        return (y - self.y_intercept) / self.y_slope
+
+
+class AudiogramExtractor:
+    def __init__(self, frequencies: Sequence[int] = (250, 500, 1000, 2000, 4000, 8000)):
+        self.frequencies = tuple(frequencies)
+
+    def extract(self, doc: fitz.Document, page_numbers: Optional[Sequence[int]] = None, search_from: Optional[int] = None) -> Dict:
+        """Audiogram thresholds from the first page that yields markers, e.g. {'left_ear': {250: 35, ...}}.
+
+        Only `page_numbers` are examined (default: every page mentioning an audiogram); if they yield
+        nothing and `search_from` is given, pages from there on that mention an audiogram are tried too.
+        """
+        if page_numbers is None:
+            page_numbers = self.keyword_pages(doc)
+
+        audiogram = self._extract_pages(doc, page_numbers)
+        if not audiogram and search_from is not None and search_from < doc.page_count:
+            audiogram = self._extract_pages(doc, self.keyword_pages(doc, search_from))
+        return audiogram
+
+    def keyword_pages(self, doc: fitz.Document, start: int = 0) -> List[int]:
+        return [number for number in range(start, doc.page_count)
+                if any(keyword in doc[number].get_text().lower() for keyword in AUDIOGRAM_KEYWORDS)]
+
+    def _extract_pages(self, doc: fitz.Document, page_numbers: Sequence[int]) -> Dict:
+        for page_number in page_numbers:
+            page = doc[page_number]
+            plot = self.find_plot(page)
+            if plot is None:
+                continue
+            markers = self.vector_markers(page, plot) or self.raster_markers(page, plot)
+            audiogram = self.thresholds(markers, plot)
+            if audiogram:
+                return audiogram
+        return {}
+
+    def find_plot(self, page: fitz.Page) -> Optional[AudiogramPlot]:
+        words = page.get_text('words')
+
+        frequency_labels = []
+        db_labels = []
+        for x0, y0, x1, y1, text, *_ in words:
+            frequency = _parse_frequency(text)
+            if frequency is not None:
+                frequency_labels.append(((y0 + y1) / 2, ((x0 + x1) / 2, frequency)))
+            if _DB_LABEL.match(text) and int(text) in DB_LABELS:
+                db_labels.append((x1, ((y0 + y1) / 2, int(text))))
+
+        # Frequency axis: the row with the most distinct frequency labels
+        rows = [row for row in _group(frequency_labels, ROW_TOLERANCE)
+                if len({frequency for _, (_, frequency) in row}) >= MIN_AXIS_LABELS]
+        if not rows:
+            return None
+        row = max(rows, key=lambda row: len({frequency for _, (_, frequency) in row}))
+        row_points = {frequency: x for _, (x, frequency) in row}
+        if len(row_points) < MIN_AXIS_LABELS:
+            return None
+        x_slope, x_intercept = _linear_fit([math.log2(f) for f in row_points], list(row_points.values()))
+        if x_slope <= 0:
+            return None
+
+        # dB axis: a column of distinct, monotonic dB labels, nearest the left end of the frequency axis
+        min_x = min(row_points.values())
+        best_column = None
+        for column in _group(db_labels, COLUMN_TOLERANCE):
+            points = {}
+            for _, (y, db) in column:
+                points.setdefault(db, y)
+            if len(points) < MIN_AXIS_LABELS + 1:
+                continue
+            ordered = [points[db] for db in sorted(points)]
+            monotonic = all(a < b for a, b in zip(ordered, ordered[1:])) or all(a > b for a, b in zip(ordered, ordered[1:]))
+            if not monotonic:
+                continue
+            distance = abs(min_x - column[0][0])
+            if best_column is None or distance < best_column[0]:
+                best_column = (distance, column[0][0], points)
+        if best_column is None:
+            return None
+        _, axis_x, db_points = best_column
+        y_slope, y_intercept = _linear_fit(list(db_points), list(db_points.values()))
+        if y_slope == 0:
+            return None
+
+        half_octave = x_slope / 2
+        half_step = abs(y_slope) * DB_STEP
+        rect = fitz.Rect(
+            max(axis_x, min_x - half_octave), min(db_points.values()) - half_step,
+            max(row_points.values()) + half_octave, max(db_points.values()) + half_step
+        )
+        return AudiogramPlot(rect, x_slope, x_intercept, y_slope, y_intercept)
+
+    def vector_markers(self, page: fitz.Page, plot: AudiogramPlot) -> List[Tuple[str, float, float]]:
+        """(ear, x, y) for O/X markers drawn as vector paths inside the plot"""
+        max_size = plot.octave_width * 0.45
+        markers = []
+        line_paths = []
+
+        for path in page.get_drawings():
+            bounds = path['rect']
+            if not plot.rect.intersects(bounds):
+                continue
+            if max(bounds.width, bounds.height) > max_size or max(bounds.width, bounds.height) < 1:
+                continue
+            center = (bounds.x0 + bounds.x1) / 2, (bounds.y0 + bounds.y1) / 2
+            if not plot.rect.contains(fitz.Point(*center)):
+                continue
+
+            kinds = {item[0] for item in path['items']}
+            color_ear = _ear_from_color(path.get('color')) or _ear_from_color(path.get('fill'))
+            if 'c' in kinds:
+                markers.append((color_ear or 'right_ear', *center))
+            elif kinds == {'l'}:
+                segments = [(item[1], item[2]) for item in path['items']]
+                line_paths.append((center, segments, color_ear))
+
+        # X markers may be one path with two strokes or two single-stroke paths
+        clusters = []
+        for center, segments, color_ear in line_paths:
+            for cluster in clusters:
+                if abs(cluster[0][0] - center[0]) <= max_size / 2 and abs(cluster[0][1] - center[1]) <= max_size / 2:
+                    cluster[1].extend(segments)
+                    cluster[2].append(color_ear)
+                    break
+            else:
+                clusters.append((center, list(segments), [color_ear]))
+
+        for center, segments, color_ears in clusters:
+            crossing = any(_segments_intersect(a, b) for i, a in enumerate(segments) for b in segments[i + 1:])
+            if crossing:
+                color_ear = next((ear for ear in color_ears if ear), None)
+                markers.append((color_ear or 'left_ear', *center))
+
+        return markers
+
+    def raster_markers(self, page: fitz.Page, plot: AudiogramPlot, zoom: float = 3.0) -> List[Tuple[str, float, float]]:
+        """(ear, x, y) for red/blue marker blobs in the rendered plot region (covers embedded images)"""
+        if not page.get_images(full=False):
+            return []
+
+        import cv2
+        import numpy as np
+
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=plot.rect, alpha=False)
+        image = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+        hsv = cv2.cvtColor(image[:, :, :3], cv2.COLOR_RGB2HSV)
+
+        saturated = cv2.inRange(hsv, (0, 120, 80), (180, 255, 255))
+        hue = hsv[:, :, 0]
+        red = cv2.bitwise_and(saturated, ((hue <= 10) | (hue >= 170)).astype(np.uint8) * 255)
+        blue = cv2.bitwise_and(saturated, ((hue >= 100) & (hue <= 130)).astype(np.uint8) * 255)
+
+        max_size = plot.octave_width * 0.45 * zoom
+        markers = []
+        for ear, mask in (('right_ear', red), ('left_ear', blue)):
+            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            for contour in contours:
+                x, y, width, height = cv2.boundingRect(contour)
+                if max(width, height) > max_size or max(width, height) < 2 * zoom:
+                    continue
+                markers.append((ear, plot.rect.x0 + (x + width / 2) / zoom, plot.rect.y0 + (y + height / 2) / zoom))
+        return markers
+
+    def thresholds(self, markers: List[Tuple[str, float, float]], plot: AudiogramPlot) -> Dict:
+        readings = {}
+        for ear, x, y in markers:
+            frequency = plot.frequency_at(x)
+            nearest = min(self.frequencies, key=lambda f: abs(math.log2(f) - math.log2(frequency)))
+            # Ignore markers between reported frequencies (e.g. 750/1500 Hz)
+            if abs(math.log2(nearest) - math.log2(frequency)) > 0.25:
+                continue
+            readings.setdefault(ear, {}).setdefault(nearest, []).append(plot.db_at(y))
+
+        audiogram = {}
+        for ear in ('left_ear', 'right_ear'):
+            if ear in readings:
+                audiogram[ear] = {
+                    frequency: int(DB_STEP * round(sum(values) / len(values) / DB_STEP))
+                    for frequency, values in sorted(readings[ear].items())
+                }
+        return audiogram
@@ -0,0 +1,68 @@
+"""End-to-end load test of the Flask app through its test client."""
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.harness import summarize
+from benchmarks.synthetic_report import report_pdf
+
+
+def _load_app():
+    # Keep job/cache state out of the real data directories
+    scratch = tempfile.mkdtemp(prefix='bench_app_')
+    os.environ.setdefault('JOB_STORE_DIR', os.path.join(scratch, 'jobs'))
+    # Every simulated request comes from one client; measure the app, not its rate limit
+    os.environ.setdefault('RATE_LIMIT_PER_MINUTE', '0')
+    import app
+    return app
+
+
+def _post_pdf(client, url: str, pdf_bytes: bytes, field: str = 'pdf'):
+    return client.post(url, data={field: (io.BytesIO(pdf_bytes), 'report.pdf')}, content_type='multipart/form-data')
+
+
+def _analyze(app_module, pdf_bytes: bytes) -> float:
+    client = app_module.app.test_client()
+    start = time.perf_counter()
+    response = _post_pdf(client, '/api/analyze', pdf_bytes)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return time.perf_counter() - start
+
+
+def _job_roundtrip(app_module, pdf_bytes: bytes) -> float:
+    client = app_module.app.test_client()
+    start = time.perf_counter()
+    response = _post_pdf(client, '/api/jobs', pdf_bytes)
+    assert response.status_code == 202, response.get_data(as_text=True)
+    status_url = response.get_json()['status_url']
+    while True:
+        job = client.get(status_url).get_json()
+        if job['status'] in ('done', 'failed'):
+            return time.perf_counter() - start
+        time.sleep(0.005)
+
+
+def _load(func, app_module, pdfs: List[bytes], concurrency: int) -> Dict:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda pdf_bytes: func(app_module, pdf_bytes), pdfs))
+    wall = time.perf_counter() - start
+    return summarize(latencies, requests=len(pdfs), concurrency=concurrency, throughput_per_s=len(pdfs) / wall)
+
+
+def run(requests: int = 100, concurrency: int = 1, noise_pages: int = 5) -> Dict:
+    app_module = _load_app()
+    # Distinct PDFs so the result cache does not short-circuit the pipeline
+    pdfs = [report_pdf(noise_pages=noise_pages, seed=seed) for seed in range(requests)]
+    repeat_pdf = pdfs[:1] * requests
+
+    results = {
+        'analyze': _load(_analyze, app_module, pdfs, concurrency),
+        'analyze_cached': _load(_analyze, app_module, repeat_pdf, concurrency),
+    }
+    job_pdfs = [report_pdf(noise_pages=noise_pages, seed=requests + seed) for seed in range(requests)]
+    results['job_roundtrip'] = _load(_job_roundtrip, app_module, job_pdfs, concurrency)
+    return results
@@ -0,0 +1,147 @@
+"""Correctness under concurrency: one shared extractor (or a threaded server) against sequential results.
+
+    python -m benchmarks.bench_concurrency [--threads 8] [--rounds 5]
+    python -m benchmarks.bench_concurrency --served [--workers 2 --threads 8]
+
+In-process, every report is first analyzed sequentially; the same reports are then analyzed again
+from many threads sharing one SimpleMedicalExtractor, in shuffled order, and each result must equal
+its sequential one. --served does the same over HTTP against gunicorn with gthread workers, using
+distinct reports (each sent once) so the server's result cache and stored extractions cannot answer
+without parsing.
+Exits non-zero on any mismatch or failed request.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.harness import summarize
+from benchmarks.synthetic_report import report_pdf
+
+
+def _reports(count: int) -> List[bytes]:
+    # Text-only, vector and raster audiograms, so every parsing path runs concurrently
+    kinds = (None, 'vector', 'raster')
+    return [report_pdf(noise_pages=seed % 4, audiogram=kinds[seed % 3], seed=seed) for seed in range(count)]
+
+
+def _hammer(analyze, pdfs: List[bytes], expected: List[Dict], threads: int, rounds: int, seed: int = 0) -> Dict:
+    """Analyze every report `rounds` times from `threads` threads; returns timing stats and the mismatch count"""
+    order = [index for index in range(len(pdfs)) for _ in range(rounds)]
+    random.Random(seed).shuffle(order)
+
+    def check(index: int):
+        start = time.perf_counter()
+        result = analyze(pdfs[index])
+        return time.perf_counter() - start, result == expected[index]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(check, order))
+    wall = time.perf_counter() - start
+    mismatches = sum(1 for _, matched in outcomes if not matched)
+    return summarize([seconds for seconds, _ in outcomes], requests=len(order), concurrency=threads,
+                     throughput_per_s=len(order) / wall, mismatches=mismatches)
+
+
+def run(threads: int = 8, rounds: int = 3, reports: int = 12) -> Dict:
+    from medical_extractor import SimpleMedicalExtractor
+
+    extractor = SimpleMedicalExtractor()
+    pdfs = _reports(reports)
+    expected = [extractor.process_pdf(pdf_bytes) for pdf_bytes in pdfs]
+    return {
+        'process_pdf_sequential': _hammer(extractor.process_pdf, pdfs, expected, 1, rounds),
+        'process_pdf_threaded': _hammer(extractor.process_pdf, pdfs, expected, threads, rounds),
+    }
+
+
+def _multipart(pdf_bytes: bytes):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="pdf"; filename="report.pdf"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n').encode() + pdf_bytes + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def _post_analyze(url: str, pdf_bytes: bytes) -> Dict:
+    body, content_type = _multipart(pdf_bytes)
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    with urllib.request.urlopen(request, timeout=120) as response:
+        payload = json.load(response)
+    if not payload.get('success'):
+        raise RuntimeError(payload.get('error'))
+    return payload['data']
+
+
+def run_served(workers: int = 2, threads: int = 8, rounds: int = 3, reports: int = 12, port: int = 8765) -> Dict:
+    """Start gunicorn (gthread workers) on `port` with scratch stores and hammer /api/analyze"""
+    from medical_extractor import SimpleMedicalExtractor
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    scratch = tempfile.mkdtemp(prefix='bench_concurrency_')
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads), RATE_LIMIT_PER_MINUTE='0',
+               ANALYZE_QUEUE_SIZE=str(threads * rounds * reports), JOB_STORE_DIR=os.path.join(scratch, 'jobs'),
+               PATIENT_DB=os.path.join(scratch, 'patients.db'))
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+                               '--log-level', 'warning', 'app:app'], cwd=root, env=env)
+    base = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                urllib.request.urlopen(f'{base}/api/health', timeout=5).read()
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.2)
+
+        extractor = SimpleMedicalExtractor()
+        pdfs = _reports(reports * rounds)
+        # Compare through JSON, as the server returns it (audiogram frequencies become string keys)
+        expected = [json.loads(json.dumps(extractor.process_pdf(pdf_bytes))) for pdf_bytes in pdfs]
+
+        def analyze(pdf_bytes: bytes) -> Dict:
+            try:
+                return _post_analyze(f'{base}/api/analyze', pdf_bytes)
+            except Exception as e:
+                return {'error': str(e)}
+
+        return {'served_analyze': _hammer(analyze, pdfs, expected, workers * threads, 1)}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=3, help='Times each report is analyzed')
+    parser.add_argument('--reports', type=int, default=12)
+    parser.add_argument('--served', action='store_true', help='Load-test gunicorn gthread workers over HTTP instead')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (--served)')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.served:
+        results = run_served(args.workers, args.threads, args.rounds, args.reports, args.port)
+    else:
+        results = run(args.threads, args.rounds, args.reports)
+    for name, stats in results.items():
+        print(f'{name:<26} {stats["requests"]:5d} requests  {stats["throughput_per_s"]:8.1f}/s  '
+              f'median {stats["median"] * 1000:8.2f} ms  p95 {stats["p95"] * 1000:8.2f} ms  mismatches {stats["mismatches"]}')
+    if any(stats['mismatches'] for stats in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
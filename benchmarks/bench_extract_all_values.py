@@ -0,0 +1,117 @@
+"""Compare the table-driven extract_all_values against the original two-pass scanner.
+
+    python -m benchmarks.bench_extract_all_values [--reports N] [--noise N] [--repeat N]
+"""
+import argparse
+import re
+import timeit
+from typing import Dict
+
+from benchmarks.synthetic_report import report_text
+from medical_extractor import SimpleMedicalExtractor
+
+
+def legacy_extract_all_values(text: str) -> Dict:
+    values = {}
+    avg_amplitudes = {}
+    lines = [line.strip() for line in text.split('\n')]
+
+    for i, line in enumerate(lines):
+        for metric in ('Button Press Accuracy', 'False Alarms', 'Median Reaction Time'):
+            if metric in line:
+                numbers = re.findall(r'\d+\.?\d*', line)
+                if numbers:
+                    values[metric] = float(numbers[-1])
+                elif i+1 < len(lines):
+                    next_line = lines[i+1].strip()
+                    if ':' not in next_line and not any(word in next_line.lower() for word in ['normal', 'delayed', 'high', 'low', 'borderline']):
+                        numbers = re.findall(r'\d+\.?\d*', next_line)
+                        if numbers:
+                            values[metric] = float(numbers[0])
+
+    for i in range(len(lines) - 5):
+        if lines[i] == 'P50' and i+1 < len(lines) and lines[i+1] == 'Standard':
+            if i+2 < len(lines):
+                try:
+                    values['P50 Amplitude'] = float(lines[i+2])
+                except ValueError:
+                    pass
+            if i+4 < len(lines):
+                try:
+                    avg_amplitudes['P50 Amplitude'] = float(lines[i+4])
+                except ValueError:
+                    pass
+
+        if lines[i] == 'P3b' and i+1 < len(lines) and lines[i+1] == 'Target':
+            if i+2 < len(lines) and i+3 < len(lines):
+                try:
+                    values['P3b Amplitude'] = float(lines[i+2])
+                    values['P3b Latency'] = float(lines[i+3])
+                except ValueError:
+                    pass
+            if i+4 < len(lines):
+                try:
+                    avg_amplitudes['P3b Amplitude'] = float(lines[i+4])
+                except ValueError:
+                    pass
+
+        erp_patterns = {
+            'N100': ['N100', 'Standard'],
+            'P200': ['P200', 'Standard'],
+            'N200': ['N200', 'Standard'],
+            'P3a': ['P3a', 'Standard'],
+            'Slow Wave': ['Slow Wave', 'Standard']
+        }
+
+        for erp_name, pattern in erp_patterns.items():
+            if lines[i] == pattern[0] and i+1 < len(lines) and lines[i+1] == pattern[1]:
+                if i+2 < len(lines):
+                    try:
+                        values[f'{erp_name} Amplitude'] = float(lines[i+2])
+                    except ValueError:
+                        pass
+                if i+4 < len(lines):
+                    try:
+                        avg_amplitudes[f'{erp_name} Amplitude'] = float(lines[i+4])
+                    except ValueError:
+                        pass
+
+        if lines[i] == 'Peak Alpha' and i+1 < len(lines):
+            try:
+                values['Peak Alpha Frequency'] = float(lines[i+1])
+            except ValueError:
+                pass
+
+    for amplitude_metric in ['P50 Amplitude', 'N100 Amplitude', 'P200 Amplitude',
+                             'N200 Amplitude', 'P3b Amplitude', 'Slow Wave Amplitude', 'P3a Amplitude']:
+        if amplitude_metric not in values and amplitude_metric in avg_amplitudes:
+            values[amplitude_metric] = avg_amplitudes[amplitude_metric]
+
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=200)
+    parser.add_argument('--noise', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    extractor = SimpleMedicalExtractor()
+    text = report_text(args.reports, args.noise)
+
+    expected = legacy_extract_all_values(text)
+    actual = extractor.extract_all_values(text)
+    assert list(actual.items()) == list(expected.items()), 'table-driven output differs from legacy output'
+
+    legacy = min(timeit.repeat(lambda: legacy_extract_all_values(text), number=1, repeat=args.repeat))
+    table = min(timeit.repeat(lambda: extractor.extract_all_values(text), number=1, repeat=args.repeat))
+
+    print(f'lines: {text.count(chr(10)):,}')
+    print(f'legacy two-pass:    {legacy * 1000:8.1f} ms')
+    print(f'table-driven:       {table * 1000:8.1f} ms')
+    print(f'speedup:            {legacy / table:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
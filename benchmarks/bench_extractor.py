@@ -0,0 +1,100 @@
+"""Micro-benchmarks for each SimpleMedicalExtractor stage on a synthetic report."""
+import json
+import random
+from typing import Dict
+
+from benchmarks.harness import measure
+from benchmarks.synthetic_report import report_pdf, report_text, scanned_pdf
+from medical_extractor import SimpleMedicalExtractor, discussion_section, index_sections, open_pdf
+from ocr import page_fingerprint, preprocess, render_page
+from result_format import AnalysisResult, decode_result, encode_result
+
+
+def _decode_gray(png: bytes):
+    import cv2
+    import numpy as np
+
+    return cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def run(repeat: int = 5, noise_pages: int = 20) -> Dict:
+    extractor = SimpleMedicalExtractor()
+    pdf_bytes = report_pdf(noise_pages=noise_pages)
+    text = extractor.extract_pdf_text(pdf_bytes)
+    large_text = report_text(reports=50, noise_per_report=500)
+    vector_audiogram_pdf = report_pdf(audiogram='vector')
+    raster_audiogram_pdf = report_pdf(audiogram='raster')
+    audiogram_text = extractor.extract_pdf_text(vector_audiogram_pdf)
+    # A combined chart export: five visits in one PDF
+    combined_pdf = report_pdf(reports=5, noise_pages=2, audiogram='vector')
+    # OCR preprocessing of a faxed summary page (the Tesseract call itself is not measured)
+    scanned_doc = open_pdf(scanned_pdf(report_pdf()))
+    scanned_page = scanned_doc[0]
+    scanned_image = _decode_gray(render_page(scanned_page))
+
+    values = extractor.extract_all_values(text)
+    # process_pdf pins one ranges snapshot for all stages; classify against it the same way
+    ranges = extractor.ranges.current()
+    interpretations = {metric: extractor.calculate_clinical_interpretation(metric, value, ranges) for metric, value in values.items()}
+    audiogram_data = {
+        'left_ear': {250: 55, 500: 45, 1000: 35, 2000: 25, 4000: 15, 8000: 30},
+        'right_ear': {250: 40, 500: 30, 1000: 25, 2000: 30, 4000: 45, 8000: 60},
+    }
+    compatibility = extractor.check_cognision_compatibility(audiogram_data)
+    asymmetry = extractor.analyze_audiogram_asymmetry(audiogram_data)
+    discussion_text = discussion_section(text, index_sections(text))
+    # Re-rendering an archive: many reports, but few distinct clinical profiles among them
+    rng = random.Random(0)
+    labels = ('Normal', 'Borderline', 'High Risk')
+    profiles = [{metric: rng.choice(labels) for metric in interpretations} for _ in range(20)]
+    archive_profiles = [rng.choice(profiles) for _ in range(1000)]
+
+    # Serializing a full result for a batch or archive consumer: JSON (as jsonify sends it) vs the binary record
+    result = extractor.process_pdf(vector_audiogram_pdf)
+    compact_result = AnalysisResult.from_dict(result)
+    result_record = encode_result(result)
+    result_json = json.dumps(result, separators=(',', ':'))
+
+    # Re-interpreting a stored report under new ranges: only the derived stage runs
+    raw_extraction = json.loads(json.dumps(extractor.extract_raw(vector_audiogram_pdf)))
+
+    def regenerate_archive():
+        for profile in archive_profiles:
+            extractor.generate_study_findings(values, profile, ranges=ranges)
+            extractor.generate_study_discussion(values, profile, ranges=ranges)
+
+    cases = {
+        'extract_pdf_text': lambda: extractor.extract_pdf_text(pdf_bytes),
+        'read_report_pages': lambda: extractor.read_report_pages(pdf_bytes),
+        'extract_all_values': lambda: extractor.extract_all_values(text),
+        'extract_all_values_large': lambda: extractor.extract_all_values(large_text),
+        'index_sections': lambda: index_sections(text),
+        'calculate_clinical_interpretation': lambda: [extractor.calculate_clinical_interpretation(m, v, ranges) for m, v in values.items()],
+        'extract_audiogram_data_vector': lambda: extractor.extract_audiogram_data(audiogram_text, vector_audiogram_pdf),
+        'extract_audiogram_data_raster': lambda: extractor.extract_audiogram_data(audiogram_text, raster_audiogram_pdf),
+        'interpret_hearing_loss': lambda: [extractor.interpret_hearing_loss(htl, ranges) for htl in range(0, 100, 5)],
+        'check_cognision_compatibility': lambda: extractor.check_cognision_compatibility(audiogram_data),
+        'analyze_audiogram_asymmetry': lambda: extractor.analyze_audiogram_asymmetry(audiogram_data),
+        'generate_study_findings': lambda: extractor.generate_study_findings(values, interpretations, audiogram_data, compatibility, asymmetry),
+        'generate_study_discussion': lambda: extractor.generate_study_discussion(values, interpretations, audiogram_data, asymmetry),
+        'generate_study_text_archive': regenerate_archive,
+        'ocr_render_page': lambda: render_page(scanned_page),
+        'ocr_preprocess': lambda: preprocess(scanned_image),
+        'ocr_page_fingerprint': lambda: page_fingerprint(scanned_doc, scanned_page),
+        'result_json_dumps': lambda: json.dumps(result, separators=(',', ':')),
+        'result_json_loads': lambda: json.loads(result_json),
+        'result_binary_encode': lambda: encode_result(result),
+        'result_binary_encode_compact': lambda: encode_result(compact_result),
+        'result_binary_decode': lambda: decode_result(result_record),
+        'extract_discussion_interpretations': lambda: extractor.extract_discussion_interpretations(discussion_text),
+        'extract_raw': lambda: extractor.extract_raw(vector_audiogram_pdf),
+        'derive': lambda: extractor.derive(raw_extraction, ranges),
+        'process_pdf': lambda: extractor.process_pdf(pdf_bytes),
+        'process_pdf_full_document': lambda: extractor.process_pdf(pdf_bytes, stop_early=False),
+        'split_reports': lambda: extractor.split_reports(combined_pdf),
+        'split_and_extract_reports': lambda: extractor.extract_reports(extractor.split_reports(combined_pdf), max_workers=1),
+    }
+    results = {name: measure(func, repeat=repeat) for name, func in cases.items()}
+    results['result_json_dumps']['bytes'] = len(result_json.encode())
+    results['result_binary_encode']['bytes'] = len(result_record)
+    return results
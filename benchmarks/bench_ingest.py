@@ -0,0 +1,72 @@
+"""Compare temp-file and in-memory PDF ingestion under concurrent load.
+
+    python -m benchmarks.bench_ingest [--concurrency N] [--requests N] [--noise-pages N]
+
+Each mode mirrors what /api/analyze does with an upload: 'tempfile' writes the buffer to a
+NamedTemporaryFile and reopens it by path, 'memory' hands the buffer straight to process_pdf.
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic_report import report_pdf
+from medical_extractor import SimpleMedicalExtractor
+
+_extractor = None
+
+
+def _init():
+    global _extractor
+    _extractor = SimpleMedicalExtractor()
+
+
+def _via_tempfile(pdf_bytes: bytes) -> float:
+    start = time.perf_counter()
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+        temp_file.write(pdf_bytes)
+        temp_path = temp_file.name
+    try:
+        _extractor.process_pdf(temp_path)
+    finally:
+        os.unlink(temp_path)
+    return time.perf_counter() - start
+
+
+def _via_memory(pdf_bytes: bytes) -> float:
+    start = time.perf_counter()
+    _extractor.process_pdf(pdf_bytes)
+    return time.perf_counter() - start
+
+
+def run(mode, pdf_bytes: bytes, concurrency: int, requests: int):
+    with ProcessPoolExecutor(max_workers=concurrency, initializer=_init) as pool:
+        list(pool.map(mode, [pdf_bytes] * concurrency))  # warm up every worker
+        start = time.perf_counter()
+        latencies = sorted(pool.map(mode, [pdf_bytes] * requests))
+        wall = time.perf_counter() - start
+    return {
+        'throughput_per_s': requests / wall,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--noise-pages', type=int, default=2)
+    args = parser.parse_args()
+
+    pdf_bytes = report_pdf(noise_pages=args.noise_pages)
+    print(f'{len(pdf_bytes):,} byte PDF, {args.requests} requests, concurrency {args.concurrency}')
+    for name, mode in (('tempfile', _via_tempfile), ('memory', _via_memory)):
+        stats = run(mode, pdf_bytes, args.concurrency, args.requests)
+        print(f'{name:>9}: {stats["throughput_per_s"]:7.1f} req/s   '
+              f'p50 {stats["p50_ms"]:6.2f} ms   p95 {stats["p95_ms"]:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Section index vs the former DOTALL discussion regex, on a normal report and pathological inputs.
+
+    python -m benchmarks.bench_sections [--size N] [--repeat N]
+
+Every case first checks that discussion_section returns exactly what the old regex returned; the
+timings are reported, not gated (tests/test_sections.py covers the behavior).
+"""
+import argparse
+import re
+import sys
+from typing import Dict
+
+from benchmarks.harness import measure
+from benchmarks.synthetic_report import report_text
+from medical_extractor import discussion_section, index_sections
+
+LEGACY_DISCUSSION_PATTERN = r'Study Discussion:?\s*(.*?)(?=Study Protocol|Test Name|Physician|$)'
+
+
+def legacy_discussion(text: str) -> str:
+    match = re.search(LEGACY_DISCUSSION_PATTERN, text, re.DOTALL | re.IGNORECASE)
+    return match.group(1).strip() if match else ""
+
+
+def pathological_texts(size: int) -> Dict[str, str]:
+    filler = 'x' * size
+    return {
+        'report': report_text(reports=20, noise_per_report=500),
+        'unterminated_discussion': 'Study Discussion: ' + filler,
+        'near_miss_terminators': 'Study Discussion:\n' + 'Study Protoco Test Nam Physicia ' * (size // 32),
+        'repeated_headers': 'Study Discussion ' * (size // 17),
+        'headers_without_discussion': 'Study Protocol Test Name Physician Audiogram ' * (size // 45),
+        'whitespace_run': 'Study Discussion:' + ' \n\t' * (size // 3),
+        'overlapping_headers': 'Study Discussion: Hearing Test Name ' + filler,
+        'no_headers': filler,
+    }
+
+
+def run(repeat: int = 5, size: int = 1_000_000) -> Dict:
+    results = {}
+    for name, text in pathological_texts(size).items():
+        expected = legacy_discussion(text)
+        actual = discussion_section(text, index_sections(text))
+        assert actual == expected, f'{name}: section index output differs from the legacy regex'
+        results[f'{name}_legacy'] = measure(lambda: legacy_discussion(text), repeat=repeat)
+        results[f'{name}_indexed'] = measure(lambda: discussion_section(text, index_sections(text)), repeat=repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1_000_000, help='Approximate characters per pathological input')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.size)
+    for name, stats in results.items():
+        print(f'{name:<40} median {stats["median"] * 1000:9.3f} ms', file=sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Cold-start cost: import time of the app per module, and the resident size of a fresh process.
+
+    python -m benchmarks.bench_startup [--module app] [--repeat N] [--top N]
+
+Each run imports the module in a new interpreter with `-X importtime`, so nothing is cached in
+sys.modules; the OS file cache is warm after the first run.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from benchmarks.harness import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+RSS_PROBE = "import resource, sys; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)"
+
+
+def import_profile(module: str = 'app') -> Tuple[float, Dict[str, float], int]:
+    """(total import seconds, self seconds per top-level package, peak RSS in KB) of one fresh import"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', f'import {module}; {RSS_PROBE}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    lines = completed.stderr.splitlines()
+    packages = defaultdict(float)
+    total = 0.0
+    for line in lines:
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        packages[name.split('.')[0]] += int(self_us) / 1e6
+        if len(indent) == 1:
+            total += int(cumulative_us) / 1e6
+    return total, dict(packages), int(lines[-1])
+
+
+def run(repeat: int = 5, module: str = 'app') -> Dict:
+    totals: List[float] = []
+    rss: List[int] = []
+    for _ in range(repeat):
+        total, _, peak_rss = import_profile(module)
+        totals.append(total)
+        rss.append(peak_rss)
+    return {f'import_{module}': summarize(totals, peak_rss_kb=max(rss))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Packages to list, by import time')
+    args = parser.parse_args()
+
+    runs = [import_profile(args.module) for _ in range(args.repeat)]
+    fastest_total, packages, peak_rss = min(runs, key=lambda r: r[0])
+    print(f'import {args.module}: {fastest_total * 1000:.1f} ms (fastest of {args.repeat}), peak RSS {peak_rss / 1024:.1f} MB')
+    for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'  {name:<28} {seconds * 1000:8.1f} ms  {seconds / fastest_total:6.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import timeit
+from typing import Callable, Dict, List, Optional
+
+
+def measure(func: Callable, repeat: int = 5, number: Optional[int] = None) -> Dict:
+    """Per-call timing stats (seconds); `number` calls per sample, auto-ranged to ~0.2s when omitted"""
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    samples = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return summarize(samples, number=number)
+
+
+def summarize(samples: List[float], **extra) -> Dict:
+    ordered = sorted(samples)
+    stats = {
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'mean': statistics.fmean(ordered),
+        'p95': ordered[max(0, int(round(len(ordered) * 0.95)) - 1)],
+        'samples': len(ordered),
+    }
+    stats.update(extra)
+    return stats
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    try:
+        import fitz
+        pymupdf_version = fitz.VersionBind
+    except Exception:
+        pymupdf_version = None
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pymupdf': pymupdf_version,
+    }
+
+
+def write_results(path: str, results: Dict):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+
+def compare(baseline_path: str, results: Dict, threshold: float = 0.10) -> List[str]:
+    """Lines describing benchmarks whose median moved by more than `threshold` against a saved run"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+
+    lines = []
+    for suite, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            before = baseline.get(suite, {}).get(name)
+            if not before or 'median' not in before or 'median' not in stats:
+                continue
+            change = stats['median'] / before['median'] - 1
+            if abs(change) >= threshold:
+                label = 'REGRESSION' if change > 0 else 'improvement'
+                lines.append(f'{label:>11}  {suite}.{name}: {before["median"] * 1000:.3f} ms -> '
+                             f'{stats["median"] * 1000:.3f} ms ({change:+.0%})')
+    return lines
@@ -0,0 +1,58 @@
+"""Run the benchmark suite and write the results to JSON.
+
+    python -m benchmarks.run [--output bench_results.json] [--compare previous.json] [--quick]
+"""
+import argparse
+import sys
+import warnings
+
+from benchmarks import bench_app, bench_concurrency, bench_extractor, bench_sections, bench_startup
+from benchmarks.harness import compare, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='Previous results JSON to diff medians against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative change reported by --compare')
+    parser.add_argument('--quick', action='store_true', help='Fewer repeats and requests (smoke run)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads for the app load test')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore', DeprecationWarning)
+    repeat = 3 if args.quick else 7
+    requests = 20 if args.quick else 200
+
+    results = {}
+    print('extractor micro-benchmarks...', file=sys.stderr)
+    results['extractor'] = bench_extractor.run(repeat=repeat)
+    print('section index on pathological inputs...', file=sys.stderr)
+    results['sections'] = bench_sections.run(repeat=repeat, size=100_000 if args.quick else 1_000_000)
+    print('cold-start import time...', file=sys.stderr)
+    results['startup'] = bench_startup.run(repeat=repeat)
+    print('app end-to-end load test...', file=sys.stderr)
+    results['app'] = bench_app.run(requests=requests, concurrency=args.concurrency)
+    print('shared extractor under concurrency...', file=sys.stderr)
+    results['concurrency'] = bench_concurrency.run(threads=2 * args.concurrency, rounds=2 if args.quick else 5)
+
+    for suite, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            print(f'{suite + "." + name:<46} median {stats["median"] * 1000:9.3f} ms   p95 {stats["p95"] * 1000:9.3f} ms')
+
+    write_results(args.output, results)
+    print(f'wrote {args.output}', file=sys.stderr)
+
+    mismatched = [name for name, stats in results['concurrency'].items() if stats['mismatches']]
+    if mismatched:
+        print(f'concurrent results differ from sequential ones: {", ".join(mismatched)}', file=sys.stderr)
+        sys.exit(1)
+
+    if args.compare:
+        changes = compare(args.compare, results, args.threshold)
+        print('\n'.join(changes) if changes else f'no changes beyond {args.threshold:.0%}')
+        if any(line.lstrip().startswith('REGRESSION') for line in changes):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""Synthetic COGNISION reports for benchmarks.
+
+    python -m benchmarks.synthetic_report OUT_DIR [--count N] [--noise-pages N] [--leading-noise-pages N]
+"""
+import argparse
+import os
+import random
+from typing import List
+
+ERP_TABLE = (
+    ('P50', 'Standard', (2.6, 3.2), (40, 70)),
+    ('N100', 'Standard', (-7.8, -5.5), (90, 120)),
+    ('P200', 'Standard', (4.2, 5.8), (160, 220)),
+    ('N200', 'Standard', (-1.4, -0.1), (200, 260)),
+    ('P3a', 'Standard', (3.2, 6.2), (260, 320)),
+    ('Slow Wave', 'Standard', (-2.9, -2.3), (450, 600)),
+    ('P3b', 'Target', (4.0, 6.5), (380, 430)),
+)
+
+DISCUSSION_TERMS = (
+    ('Button Press Accuracy', ('Low', 'Normal', 'Borderline')),
+    ('Median Reaction Time', ('Delayed', 'Normal', 'Fast')),
+    ('P3b Amplitude', ('Low', 'Normal', 'Borderline')),
+    ('P3b Latency', ('Delayed', 'Normal')),
+    ('Peak Alpha Frequency', ('Low', 'Normal')),
+)
+
+AUDIOGRAM_FREQUENCIES = (250, 500, 1000, 2000, 4000, 8000)
+
+NOISE_WORDS = ('patient', 'tolerated', 'recording', 'impedance', 'electrode', 'session', 'normal',
+               'artifact', 'rejected', 'epochs', 'reviewed', 'signal', 'quality', 'good')
+
+
+def report_lines(rng: random.Random, noise: int = 0, audiogram: bool = False) -> List[str]:
+    """One COGNISION summary laid out the way extract_all_values expects, with `noise` filler lines mixed in"""
+    lines = [
+        'COGNISION Report',
+        f'Patient ID: {rng.randint(10000, 99999)}',
+        f'Test Date: 20{rng.randint(18, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        'Behavioral Results',
+        f'Button Press Accuracy: {rng.uniform(75, 99):.1f}',
+        'False Alarms',
+        f'{rng.randint(0, 8)}',
+        f'Median Reaction Time {rng.randint(400, 560)}',
+    ]
+    lines += noise_lines(rng, noise // 2)
+    lines.append('ERP Results')
+    for component, condition, amplitude_range, latency_range in ERP_TABLE:
+        amplitude = rng.uniform(*amplitude_range)
+        lines += [component, condition, f'{amplitude:.2f}', f'{rng.randint(*latency_range)}',
+                  f'{amplitude + rng.uniform(-0.3, 0.3):.2f}']
+    lines += ['Peak Alpha', f'{rng.uniform(7.5, 10.5):.2f}']
+    lines += noise_lines(rng, noise - noise // 2)
+    lines.append('Study Discussion:')
+    lines += [f'{term}: {rng.choice(choices)}' for term, choices in DISCUSSION_TERMS]
+    lines += ['Clinical correlation is suggested.', 'Study Protocol: Auditory oddball', 'Physician: Dr. Example']
+    if audiogram:
+        lines.append('Hearing Test: Audiogram attached')
+    return lines
+
+
+def noise_lines(rng: random.Random, count: int) -> List[str]:
+    return [' '.join(rng.choice(NOISE_WORDS) for _ in range(rng.randint(3, 12))) + f' {rng.randint(0, 999)}'
+            for _ in range(count)]
+
+
+def report_text(reports: int = 1, noise_per_report: int = 200, seed: int = 0) -> str:
+    """Synthetic report text: `reports` summaries, each followed by `noise_per_report` noise lines"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(reports):
+        lines += report_lines(rng)
+        lines += noise_lines(rng, noise_per_report)
+    return '\n'.join(lines) + '\n'
+
+
+def audiogram_thresholds(rng: random.Random):
+    """Plausible left/right thresholds on the 5 dB audiometric grid"""
+    base_left = rng.randint(2, 8) * 5
+    base_right = rng.randint(1, 7) * 5
+    slope = rng.choice((0, 5, 10))
+    left = {f: min(110, base_left + i * slope + rng.choice((-5, 0, 5))) for i, f in enumerate(AUDIOGRAM_FREQUENCIES)}
+    right = {f: min(110, max(-10, base_right + i * slope + rng.choice((-10, -5, 0, 5)))) for i, f in enumerate(AUDIOGRAM_FREQUENCIES)}
+    return left, right
+
+
+def draw_audiogram(doc, left: dict, right: dict, raster: bool = False):
+    """An audiogram page: labelled axes and grid as vectors; O (red, right) / X (blue, left) markers
+    drawn as vector paths, or painted into an embedded PNG when `raster` is set"""
+    import fitz
+
+    page = doc.new_page()
+    page.insert_text((50, 60), 'Audiogram', fontsize=14)
+    plot = fitz.Rect(110, 130, 494, 520)
+    octave = plot.width / len(AUDIOGRAM_FREQUENCIES)
+
+    def x_of(frequency):
+        return plot.x0 + octave * (AUDIOGRAM_FREQUENCIES.index(frequency) + 0.5)
+
+    def y_of(db):
+        return plot.y0 + (db + 10) / 130 * plot.height
+
+    for frequency in AUDIOGRAM_FREQUENCIES:
+        label = str(frequency)
+        page.insert_text((x_of(frequency) - len(label) * 2.5, plot.y0 - 8), label, fontsize=9)
+        page.draw_line((x_of(frequency), plot.y0), (x_of(frequency), plot.y1), color=(0.75, 0.75, 0.75), width=0.5)
+    for db in range(-10, 130, 10):
+        label = str(db)
+        page.insert_text((plot.x0 - 8 - len(label) * 5, y_of(db) + 3), label, fontsize=9)
+        page.draw_line((plot.x0, y_of(db)), (plot.x1, y_of(db)), color=(0.75, 0.75, 0.75), width=0.5)
+    page.draw_rect(plot, color=(0, 0, 0), width=0.8)
+    page.insert_text((plot.x0, plot.y1 + 20), 'Frequency (Hz) / Hearing Level (dB HTL)', fontsize=9)
+
+    if raster:
+        import cv2
+        import numpy as np
+
+        scale = 3
+        image = np.full((int(plot.height * scale), int(plot.width * scale), 3), 255, dtype=np.uint8)
+
+        def pixel(frequency, db):
+            return int((x_of(frequency) - plot.x0) * scale), int((y_of(db) - plot.y0) * scale)
+
+        for frequency, db in right.items():
+            cv2.circle(image, pixel(frequency, db), 5 * scale, (0, 0, 255), 2)
+        for frequency, db in left.items():
+            x, y = pixel(frequency, db)
+            size = 5 * scale
+            cv2.line(image, (x - size, y - size), (x + size, y + size), (255, 0, 0), 2)
+            cv2.line(image, (x - size, y + size), (x + size, y - size), (255, 0, 0), 2)
+        page.insert_image(plot, stream=cv2.imencode('.png', image)[1].tobytes(), overlay=False)
+        return page
+
+    for thresholds, color in ((right, (0.85, 0, 0)), (left, (0, 0, 0.85))):
+        points = [fitz.Point(x_of(f), y_of(db)) for f, db in sorted(thresholds.items())]
+        for a, b in zip(points, points[1:]):
+            page.draw_line(a, b, color=color, width=0.8)
+    for frequency, db in right.items():
+        page.draw_circle((x_of(frequency), y_of(db)), 5, color=(0.85, 0, 0), width=1.2)
+    for frequency, db in left.items():
+        x, y = x_of(frequency), y_of(db)
+        page.draw_line((x - 5, y - 5), (x + 5, y + 5), color=(0, 0, 0.85), width=1.2)
+        page.draw_line((x - 5, y + 5), (x + 5, y - 5), color=(0, 0, 0.85), width=1.2)
+    return page
+
+
+def report_pdf(reports: int = 1, noise_pages: int = 0, leading_noise_pages: int = 0,
+               noise_lines_per_page: int = 60, summary_noise_lines: int = 0, audiogram: str = None,
+               seed: int = 0) -> bytes:
+    """Synthetic COGNISION PDF.
+
+    Each of `reports` visits is `leading_noise_pages` filler pages, the summary page(s) (with
+    `summary_noise_lines` filler lines mixed in), an audiogram page when `audiogram` is 'vector'
+    or 'raster', then `noise_pages` filler pages.
+    """
+    import fitz
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(reports):
+        for _ in range(leading_noise_pages):
+            _write_lines(doc, noise_lines(rng, noise_lines_per_page))
+        _write_lines(doc, report_lines(rng, summary_noise_lines, audiogram=bool(audiogram)))
+        if audiogram:
+            draw_audiogram(doc, *audiogram_thresholds(rng), raster=audiogram == 'raster')
+        for _ in range(noise_pages):
+            _write_lines(doc, noise_lines(rng, noise_lines_per_page))
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+def scanned_pdf(pdf_bytes: bytes, dpi: int = 150, skew_degrees: float = 2.0, speckle: float = 0.002, seed: int = 0) -> bytes:
+    """Image-only copy of a PDF, as a fax would produce: each page rasterized, skewed and speckled"""
+    import cv2
+    import fitz
+    import numpy as np
+
+    rng = np.random.RandomState(seed)
+    source = fitz.open(stream=pdf_bytes, filetype='pdf')
+    doc = fitz.open()
+    for page in source:
+        pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        image = np.frombuffer(pixmap.samples, np.uint8).reshape(pixmap.height, pixmap.width)
+        rotation = cv2.getRotationMatrix2D((pixmap.width / 2, pixmap.height / 2), skew_degrees, 1.0)
+        image = cv2.warpAffine(image, rotation, (pixmap.width, pixmap.height), borderValue=255)
+        image[rng.rand(*image.shape) < speckle] = 0
+        _, png = cv2.imencode('.png', image)
+        scanned_page = doc.new_page(width=page.rect.width, height=page.rect.height)
+        scanned_page.insert_image(scanned_page.rect, stream=png.tobytes())
+    source.close()
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+def _write_lines(doc, lines: List[str], font_size: float = 9, margin: float = 50):
+    page = doc.new_page()
+    y = margin
+    for line in lines:
+        if y > page.rect.height - margin:
+            page = doc.new_page()
+            y = margin
+        page.insert_text((margin, y), line, fontsize=font_size)
+        y += font_size * 1.3
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a corpus of synthetic COGNISION PDFs')
+    parser.add_argument('out_dir')
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--noise-pages', type=int, default=2)
+    parser.add_argument('--leading-noise-pages', type=int, default=0)
+    parser.add_argument('--audiogram', choices=('vector', 'raster'), help='Add an audiogram page')
+    parser.add_argument('--scanned', action='store_true', help='Write image-only (faxed) copies with no text layer')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for i in range(args.count):
+        pdf_bytes = report_pdf(noise_pages=args.noise_pages, leading_noise_pages=args.leading_noise_pages,
+                               audiogram=args.audiogram, seed=args.seed + i)
+        if args.scanned:
+            pdf_bytes = scanned_pdf(pdf_bytes, seed=args.seed + i)
+        with open(os.path.join(args.out_dir, f'report_{i:05d}.pdf'), 'wb') as f:
+            f.write(pdf_bytes)
+
+
+if __name__ == '__main__':
+    main()
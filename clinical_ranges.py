@@ -0,0 +1,178 @@
+"""Versioned clinical reference ranges.
+
+The ranges live in a JSON config (clinical_ranges.json, or CLINICAL_RANGES_PATH) and are compiled
+at load time into __slots__ threshold records that classification reads directly. ReloadableRanges
+swaps in a new snapshot when the file changes; every snapshot carries a version ID made of the
+config's declared version and a hash of its contents.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_RANGES_PATH = os.environ.get('CLINICAL_RANGES_PATH') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'clinical_ranges.json'
+)
+
+CRITICAL_LABEL = 'CRITICAL - RETEST REQUIRED'
+
+
+def _number(spec: Dict, key: str, name: str):
+    value = spec[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f'{name}: {key} must be a number')
+    return value
+
+
+class MetricRange:
+    __slots__ = ('metric', 'normal', 'mild_ad', 'lower_is_worse', 'critical_below')
+
+    def __init__(self, metric: str, normal: float, mild_ad: float, lower_is_worse: bool, critical_below: Optional[float] = None):
+        self.metric = metric
+        self.normal = normal
+        self.mild_ad = mild_ad
+        self.lower_is_worse = lower_is_worse
+        self.critical_below = critical_below
+
+    def classify(self, value: float) -> str:
+        if self.critical_below is not None and value < self.critical_below:
+            return CRITICAL_LABEL
+
+        if self.lower_is_worse:
+            if value <= self.mild_ad:
+                return 'High Risk'
+            if value < self.normal:
+                return 'Borderline'
+            return 'Normal'
+
+        if value >= self.mild_ad:
+            return 'High Risk'
+        if value > self.normal:
+            return 'Borderline'
+        return 'Normal'
+
+
+class SeverityBands:
+    """Inclusive upper bounds (dB) of the Normal, Mild and Moderate bands; anything above is Moderate to Severe"""
+    __slots__ = ('normal_max', 'mild_max', 'moderate_max')
+
+    def __init__(self, normal_max: float, mild_max: float, moderate_max: float):
+        if not normal_max < mild_max < moderate_max:
+            raise ValueError('band limits must increase: normal_max < mild_max < moderate_max')
+        self.normal_max = normal_max
+        self.mild_max = mild_max
+        self.moderate_max = moderate_max
+
+    def classify(self, db: float) -> str:
+        if db <= self.normal_max:
+            return 'Normal'
+        if db <= self.mild_max:
+            return 'Mild'
+        if db <= self.moderate_max:
+            return 'Moderate'
+        return 'Moderate to Severe'
+
+
+class ClinicalRanges:
+    """One immutable, compiled snapshot of the config"""
+    __slots__ = ('version', 'metrics', 'hearing_loss', 'asymmetry', 'cognision_max_htl', 'reference_ranges', 'critical_floors')
+
+    def __init__(self, version: str, metrics: Dict[str, MetricRange], hearing_loss: SeverityBands,
+                 asymmetry: SeverityBands, cognision_max_htl: float):
+        self.version = version
+        self.metrics = metrics
+        self.hearing_loss = hearing_loss
+        self.asymmetry = asymmetry
+        self.cognision_max_htl = cognision_max_htl
+        # Plain-dict view kept for the API and cohort scoring
+        self.reference_ranges = {
+            metric: {'normal': r.normal, 'mild_ad': r.mild_ad, 'direction': 'lower' if r.lower_is_worse else 'higher'}
+            for metric, r in metrics.items()
+        }
+        self.critical_floors = {metric: r.critical_below for metric, r in metrics.items() if r.critical_below is not None}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'ClinicalRanges':
+        """Validate and compile a parsed config; raises ValueError if it is malformed"""
+        try:
+            declared_version = str(config['version'])
+            metrics = {}
+            for metric, spec in config['metrics'].items():
+                if spec['direction'] not in ('lower', 'higher'):
+                    raise ValueError(f"{metric}: direction must be 'lower' or 'higher'")
+                metrics[metric] = MetricRange(
+                    metric, _number(spec, 'normal', metric), _number(spec, 'mild_ad', metric), spec['direction'] == 'lower',
+                    _number(spec, 'critical_below', metric) if spec.get('critical_below') is not None else None
+                )
+            bands = {}
+            for key in ('hearing_loss_db', 'asymmetry_db'):
+                bands[key] = SeverityBands(*(_number(config[key], limit, key) for limit in ('normal_max', 'mild_max', 'moderate_max')))
+            cognision_max_htl = _number(config, 'cognision_max_htl_db', 'config')
+        except (KeyError, TypeError) as e:
+            raise ValueError(f'Invalid clinical ranges config: {e!r}')
+
+        content_hash = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:8]
+        return cls(f'{declared_version}+{content_hash}', metrics, bands['hearing_loss_db'], bands['asymmetry_db'], cognision_max_htl)
+
+    def classify(self, metric: str, value: float) -> str:
+        metric_range = self.metrics.get(metric)
+        if metric_range is None:
+            return 'Unknown'
+        return metric_range.classify(value)
+
+
+def load_ranges(path: str = DEFAULT_RANGES_PATH) -> ClinicalRanges:
+    with open(path, 'r') as f:
+        return ClinicalRanges.from_config(json.load(f))
+
+
+class ReloadableRanges:
+    """The current ClinicalRanges for a config file, replaced atomically when the file changes.
+
+    Each process checks the file's mtime at most every `check_interval` seconds, so editing the file
+    reaches every gunicorn worker without a restart. A config that fails to load is reported in
+    `last_error` and the previous snapshot stays in use.
+    """
+
+    def __init__(self, path: str = DEFAULT_RANGES_PATH, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime_ns
+        self._checked_at = time.monotonic()
+        self._ranges = load_ranges(path)
+
+    def current(self) -> ClinicalRanges:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._check()
+        return self._ranges
+
+    def reload(self) -> ClinicalRanges:
+        """Load the file now; raises (keeping the old snapshot) if it is missing or invalid"""
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            ranges = load_ranges(self.path)
+            self._ranges = ranges
+            self._mtime = mtime
+            self._checked_at = time.monotonic()
+            self.last_error = None
+            return ranges
+
+    def _check(self):
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime != self._mtime:
+                    self._mtime = mtime
+                    self._ranges = load_ranges(self.path)
+                    self.last_error = None
+            except (OSError, ValueError) as e:
+                self.last_error = f'{type(e).__name__}: {e}'
+        finally:
+            self._lock.release()
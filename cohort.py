@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional
+
+# Interpretation labels indexed by severity code
+INTERPRETATION_LABELS = np.array(['Normal', 'Borderline', 'High Risk', 'CRITICAL - RETEST REQUIRED'], dtype=object)
+
+
+class CohortScorer:
+    """Vectorized equivalent of SimpleMedicalExtractor.calculate_clinical_interpretation over a whole cohort"""
+
+    def __init__(self, clinical_ranges: Dict, critical_floors: Optional[Dict] = None):
+        """`critical_floors`: {metric: value} below which a value is flagged critical before any range comparison"""
+        critical_floors = critical_floors or {}
+        self.metrics = list(clinical_ranges)
+        self._positions = {metric: i for i, metric in enumerate(self.metrics)}
+        self.normal = np.array([clinical_ranges[m]['normal'] for m in self.metrics], dtype=float)
+        self.mild_ad = np.array([clinical_ranges[m]['mild_ad'] for m in self.metrics], dtype=float)
+        self.lower_is_worse = np.array([clinical_ranges[m]['direction'] == 'lower' for m in self.metrics])
+        self.critical_floor = np.array([critical_floors.get(m, np.nan) for m in self.metrics], dtype=float)
+
+    def score_codes(self, values: pd.DataFrame) -> pd.DataFrame:
+        """Severity codes (0=Normal .. 3=Critical, -1=missing) for every known metric column"""
+        metrics = [column for column in values.columns if column in self._positions]
+        positions = [self._positions[metric] for metric in metrics]
+        matrix = values[metrics].to_numpy(dtype=float, na_value=np.nan)
+
+        lower = self.lower_is_worse[positions]
+        normal = self.normal[positions]
+        mild_ad = self.mild_ad[positions]
+
+        with np.errstate(invalid='ignore'):
+            critical = matrix < self.critical_floor[positions]
+            high_risk = np.where(lower, matrix <= mild_ad, matrix >= mild_ad)
+            borderline = np.where(lower, matrix < normal, matrix > normal)
+
+        codes = np.select([critical, high_risk, borderline], [3, 2, 1], default=0)
+        codes[np.isnan(matrix)] = -1
+        return pd.DataFrame(codes, index=values.index, columns=metrics)
+
+    def score(self, values: pd.DataFrame) -> pd.DataFrame:
+        """Interpretation labels for every known metric column; missing values stay None, other columns are dropped"""
+        codes = self.score_codes(values)
+        code_matrix = codes.to_numpy()
+        labels = INTERPRETATION_LABELS[np.clip(code_matrix, 0, None)]
+        labels[code_matrix < 0] = None
+        return pd.DataFrame(labels, index=codes.index, columns=codes.columns, dtype=object)
+
+
+def values_frame(results: Iterable[Dict], index: Optional[Iterable] = None) -> pd.DataFrame:
+    """Stack the extracted_values of many process_pdf results into a patients x metrics DataFrame"""
+    records = [result.get('extracted_values', {}) for result in results]
+    return pd.DataFrame.from_records(records, index=list(index) if index is not None else None)
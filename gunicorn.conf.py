@@ -0,0 +1,48 @@
+"""Startup-optimized gunicorn settings.
+
+    gunicorn -c gunicorn.conf.py app:app    (or just `gunicorn app:app` from this directory)
+
+app.py (PyMuPDF, the extractor and its compiled regex and metric tables, the stores) is imported
+once in the master and forked into every worker, so workers start serving immediately and share
+those pages copy-on-write instead of each paying the import and holding its own copy. Anything
+that starts threads (the job queue) is started per worker in post_fork.
+
+GUNICORN_THREADS > 1 switches to gthread workers, which serve that many requests each; a thread
+waiting on its upload or a slow client then no longer holds the whole worker. PyMuPDF calls are
+serialized by pdf_lock.MUPDF_LOCK, so CPU-bound parsing still scales with workers, not threads.
+Sync workers end job event streams as soon as the pending events are sent (the browser reconnects),
+since a held stream would block the worker and get it killed at GUNICORN_TIMEOUT.
+"""
+import gc
+import os
+
+# Read by app.py at import: build the job queue without starting its threads in the master
+os.environ['PRELOAD_APP'] = '1'
+
+# gunicorn reads this file from the working directory by default, so `gunicorn app:app` uses it too;
+# bind ($PORT) and workers ($WEB_CONCURRENCY) keep gunicorn's defaults
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+preload_app = True
+
+# Read by app.py at import: a sync worker is killed when one request runs past `timeout` (a gthread
+# worker keeps reporting in while its threads serve), and it serves nothing else meanwhile, so
+# requests that could stay open (job event streams, profiles) are kept short there
+if worker_class == 'sync':
+    os.environ['SYNC_WORKER_TIMEOUT'] = str(timeout)
+
+
+def when_ready(server):
+    # The app is loaded and no worker has forked yet. Freezing moves every object allocated so far
+    # out of the collector's generations, so GC passes in the workers never write to (and thereby
+    # copy) the shared pages.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import job_queue
+
+    job_queue.start()
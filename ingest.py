@@ -0,0 +1,262 @@
+"""Bulk-ingest an archive of COGNISION PDFs into CSV or Parquet tables.
+
+    python ingest.py /path/to/archive --output ./ingested --workers 8 --format csv
+
+Files are processed in parallel and written in chunks. Every written report's SHA-256 is appended
+to <output>/completed_hashes.txt, so rerunning the same command resumes where it stopped; reports
+that failed are listed in the errors table but not checkpointed, so a rerun retries them.
+
+With --patient-db and --patient-manifest (a CSV with path, patient_id and visit_date columns; paths
+relative to the archive root), results are also saved to the longitudinal patient store, one
+transaction per chunk, together with each report's raw extraction so the visits can later be
+re-derived under new reference ranges without the archive (PatientStore.rederive, /api/reinterpret).
+"""
+import argparse
+import csv
+import hashlib
+import os
+import shutil
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from medical_extractor import SimpleMedicalExtractor
+from patient_store import PatientStore
+from pdf_lock import POOL_CONTEXT
+from result_cache import version_fingerprint
+
+CHECKPOINT_FILE = 'completed_hashes.txt'
+TABLES = ('extracted_values', 'clinical_interpretations', 'audiogram', 'errors')
+
+_worker_extractor = None
+_worker_completed = frozenset()
+
+
+def _init_worker(completed: Set[str]):
+    global _worker_extractor, _worker_completed
+    _worker_extractor = SimpleMedicalExtractor()
+    _worker_completed = frozenset(completed)
+
+
+def _ingest_file(pdf_path: str) -> Tuple[str, str, Optional[Dict], Optional[Dict]]:
+    """Returns (path, sha256, result, raw extraction); result is None when the file was already ingested"""
+    try:
+        with open(pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+    except OSError as e:
+        return pdf_path, '', {'error': f'Could not read file: {str(e)}'}, None
+
+    sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+    if sha256 in _worker_completed:
+        return pdf_path, sha256, None, None
+
+    try:
+        raw = _worker_extractor.extract_raw(pdf_bytes)
+        if 'error' in raw:
+            return pdf_path, sha256, raw, None
+        return pdf_path, sha256, _worker_extractor.derive(raw), raw
+    except Exception as e:
+        return pdf_path, sha256, {'error': f'Error processing PDF: {str(e)}'}, None
+
+
+def find_pdfs(root: str) -> Iterator[str]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith('.pdf'):
+                yield os.path.join(dirpath, filename)
+
+
+def load_checkpoint(output_dir: str) -> Set[str]:
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def load_manifest(path: str, root: str) -> Dict[str, Tuple[str, str]]:
+    """{absolute PDF path: (patient_id, visit_date)} from a path,patient_id,visit_date CSV"""
+    visits = {}
+    with open(path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            pdf_path = os.path.abspath(os.path.join(root, row['path']))
+            visits[pdf_path] = (row['patient_id'].strip(), row['visit_date'].strip())
+    return visits
+
+
+def result_rows(metrics: List[str], pdf_path: str, sha256: str, result: Dict) -> Dict[str, List[Dict]]:
+    base = {'sha256': sha256, 'source_path': pdf_path}
+    if 'error' in result:
+        return {'errors': [dict(base, error=result['error'])]}
+
+    values = result.get('extracted_values', {})
+    interpretations = result.get('clinical_interpretations', {})
+    audiogram_interpretations = result.get('audiogram_interpretations', {})
+
+    audiogram_rows = []
+    for ear, thresholds in result.get('audiogram_data', {}).items():
+        for frequency, htl_db in thresholds.items():
+            audiogram_rows.append(dict(
+                base, ear=ear, frequency_hz=frequency, htl_db=htl_db,
+                interpretation=audiogram_interpretations.get(ear, {}).get(frequency)
+            ))
+
+    return {
+        'extracted_values': [dict(base, **{metric: values.get(metric) for metric in metrics})],
+        'clinical_interpretations': [dict(base, **{metric: interpretations.get(metric) for metric in metrics})],
+        'audiogram': audiogram_rows,
+    }
+
+
+class ChunkWriter:
+    """Buffers rows per table and appends them to CSV files or numbered Parquet parts"""
+
+    def __init__(self, output_dir: str, output_format: str, metrics: List[str], patient_store: Optional[PatientStore] = None,
+                 extraction_version: str = ''):
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.patient_store = patient_store
+        self.extraction_version = extraction_version
+        self.columns = {
+            'extracted_values': ['sha256', 'source_path'] + metrics,
+            'clinical_interpretations': ['sha256', 'source_path'] + metrics,
+            'audiogram': ['sha256', 'source_path', 'ear', 'frequency_hz', 'htl_db', 'interpretation'],
+            'errors': ['sha256', 'source_path', 'error'],
+        }
+        self.rows = {table: [] for table in TABLES}
+        self.pending_visits = []
+        self.pending_raw = []
+        self.pending_hashes = []
+        self.checkpoint = open(os.path.join(output_dir, CHECKPOINT_FILE), 'a')
+
+    def add(self, sha256: str, rows: Dict[str, List[Dict]], visit: Optional[Tuple[str, str]] = None, result: Optional[Dict] = None,
+            raw: Optional[Dict] = None):
+        for table, table_rows in rows.items():
+            self.rows[table].extend(table_rows)
+        if visit is not None and self.patient_store is not None:
+            patient_id, visit_date = visit
+            self.pending_visits.append((patient_id, visit_date, sha256, result))
+            if raw is not None:
+                self.pending_raw.append((sha256, self.extraction_version, raw))
+        # A failed report is not checkpointed, so the next run retries it
+        if sha256 and 'error' not in (result or {}):
+            self.pending_hashes.append(sha256)
+
+    def flush(self):
+        for table in TABLES:
+            if self.rows[table]:
+                self._write_table(table, self.rows[table])
+                self.rows[table] = []
+
+        if self.pending_visits:
+            self.patient_store.add_visits(self.pending_visits)
+            self.patient_store.add_raw_extractions(self.pending_raw)
+            self.pending_visits = []
+            self.pending_raw = []
+
+        # Only checkpoint once the rows are on disk, so a crash never loses a report
+        if self.pending_hashes:
+            self.checkpoint.write(''.join(f'{sha256}\n' for sha256 in self.pending_hashes))
+            self.checkpoint.flush()
+            os.fsync(self.checkpoint.fileno())
+            self.pending_hashes = []
+
+    def close(self):
+        self.flush()
+        self.checkpoint.close()
+
+    def _write_table(self, table: str, rows: List[Dict]):
+        if self.output_format == 'parquet':
+            import pandas as pd
+
+            table_dir = os.path.join(self.output_dir, table)
+            os.makedirs(table_dir, exist_ok=True)
+            part = len([name for name in os.listdir(table_dir) if name.endswith('.parquet')])
+            frame = pd.DataFrame.from_records(rows, columns=self.columns[table])
+            frame.to_parquet(os.path.join(table_dir, f'part-{part:05d}.parquet'), index=False)
+            return
+
+        path = os.path.join(self.output_dir, f'{table}.csv')
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns[table])
+            if write_header:
+                writer.writeheader()
+            writer.writerows(rows)
+
+
+def ingest(root: str, output_dir: str, workers: int, output_format: str = 'csv', chunk_size: int = 500,
+           resume: bool = True, log=sys.stderr, patient_db: Optional[str] = None,
+           patient_manifest: Optional[str] = None) -> Dict:
+    os.makedirs(output_dir, exist_ok=True)
+    if not resume:
+        stale = [CHECKPOINT_FILE] + [f'{table}.csv' for table in TABLES] + list(TABLES)
+        for name in stale:
+            path = os.path.join(output_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.unlink(path)
+
+    completed = load_checkpoint(output_dir)
+    extractor = SimpleMedicalExtractor()
+    metrics = list(extractor.clinical_ranges)
+    visits = load_manifest(patient_manifest, root) if patient_manifest else {}
+    patient_store = PatientStore(patient_db) if patient_db else None
+    writer = ChunkWriter(output_dir, output_format, metrics, patient_store, version_fingerprint(extractor))
+    stats = {'processed': 0, 'skipped': 0, 'duplicates': 0, 'failed': 0}
+    seen = set()
+    start = time.perf_counter()
+
+    try:
+        with POOL_CONTEXT.Pool(workers, initializer=_init_worker, initargs=(completed,)) as pool:
+            for pdf_path, sha256, result, raw in pool.imap_unordered(_ingest_file, find_pdfs(root), chunksize=4):
+                if result is None:
+                    stats['skipped'] += 1
+                    continue
+                if sha256 and sha256 in seen:
+                    stats['duplicates'] += 1
+                    continue
+                seen.add(sha256)
+
+                visit = visits.get(os.path.abspath(pdf_path)) if 'error' not in result else None
+                writer.add(sha256, result_rows(metrics, pdf_path, sha256, result), visit, result, raw)
+                stats['processed'] += 1
+                if 'error' in result:
+                    stats['failed'] += 1
+
+                if stats['processed'] % chunk_size == 0:
+                    writer.flush()
+                    elapsed = time.perf_counter() - start
+                    print(f"{stats['processed']} reports ({stats['processed'] / elapsed * 60:.0f}/min), "
+                          f"{stats['failed']} failed, {stats['skipped']} already done", file=log)
+    finally:
+        writer.close()
+
+    stats['elapsed_seconds'] = round(time.perf_counter() - start, 2)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root', help='Directory tree to scan for PDFs')
+    parser.add_argument('--output', '-o', required=True, help='Output directory for tables and checkpoint')
+    parser.add_argument('--workers', '-w', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--format', choices=('csv', 'parquet'), default='csv')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Reports per write/checkpoint')
+    parser.add_argument('--no-resume', action='store_true', help='Ignore and reset the existing checkpoint')
+    parser.add_argument('--patient-db', help='Also save results to this patient store (SQLite)')
+    parser.add_argument('--patient-manifest', help='CSV mapping path (relative to root) to patient_id and visit_date')
+    args = parser.parse_args(argv)
+    if bool(args.patient_db) != bool(args.patient_manifest):
+        parser.error('--patient-db and --patient-manifest must be given together')
+
+    stats = ingest(args.root, args.output, args.workers, args.format, args.chunk_size, resume=not args.no_resume,
+                   patient_db=args.patient_db, patient_manifest=args.patient_manifest)
+    print(f"Done: {stats['processed']} processed, {stats['failed']} failed, {stats['skipped']} already done, "
+          f"{stats['duplicates']} duplicates in {stats['elapsed_seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_JOB_DIR = os.path.join(tempfile.gettempdir(), 'patient_analyzer_jobs')
+
+# Last event of every job; 'done' carries the result, 'failed' the error
+TERMINAL_EVENTS = ('done', 'failed')
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite-backed job table shared by every worker process on the host"""
+
+    def __init__(self, job_dir: str = DEFAULT_JOB_DIR):
+        self.job_dir = job_dir
+        self.upload_dir = os.path.join(job_dir, 'uploads')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.db_path = os.path.join(job_dir, 'jobs.sqlite3')
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT,
+                    status TEXT NOT NULL,
+                    pdf_path TEXT,
+                    owner_pid INTEGER,
+                    submitted_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    result TEXT,
+                    error TEXT,
+                    patient_id TEXT,
+                    visit_date TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)')
+            # Progress events per job; the global, increasing id doubles as the SSE event ID
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id, id)')
+            # Stores created before jobs could be tagged with a patient visit
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for column in ('patient_id', 'visit_date'):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} TEXT')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _add_event(conn: sqlite3.Connection, job_id: str, event: str, data: Dict):
+        conn.execute(
+            'INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)',
+            (job_id, event, json.dumps(data), time.time())
+        )
+
+    def create(self, filename: str, pdf_bytes: bytes, visit: Optional[Tuple[str, str]] = None) -> str:
+        job_id = uuid.uuid4().hex
+        pdf_path = os.path.join(self.upload_dir, f'{job_id}.pdf')
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf_bytes)
+
+        patient_id, visit_date = visit or (None, None)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, filename, status, pdf_path, submitted_at, patient_id, visit_date) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, filename, 'queued', pdf_path, time.time(), patient_id, visit_date)
+            )
+            self._add_event(conn, job_id, 'queued', {})
+        return job_id
+
+    def create_finished(self, filename: str, result: Dict, visit: Optional[Tuple[str, str]] = None) -> str:
+        """Record a job that was answered without running (e.g. from the result cache)"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        patient_id, visit_date = visit or (None, None)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, filename, status, submitted_at, started_at, finished_at, result, patient_id, visit_date) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, filename, 'done', now, now, now, json.dumps(result), patient_id, visit_date)
+            )
+            self._add_event(conn, job_id, 'done', {'result': result})
+        return job_id
+
+    def claim(self, job_id: str) -> Optional[Tuple[str, Optional[Tuple[str, str]]]]:
+        """Atomically move a queued job to running; returns (PDF path, patient visit or None), or None if already taken"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'running', owner_pid = ?, started_at = ? WHERE id = ? AND status = 'queued'",
+                (os.getpid(), time.time(), job_id)
+            )
+            if cursor.rowcount != 1:
+                return None
+            self._add_event(conn, job_id, 'started', {})
+            row = conn.execute('SELECT pdf_path, patient_id, visit_date FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            visit = (row['patient_id'], row['visit_date']) if row['patient_id'] else None
+            return row['pdf_path'], visit
+
+    def finish(self, job_id: str, result: Dict = None, error: str = None):
+        status = 'failed' if error else 'done'
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?',
+                (status, time.time(), json.dumps(result) if result is not None else None, error, job_id)
+            )
+            self._add_event(conn, job_id, status, {'error': error} if error else {'result': result})
+
+    def add_event(self, job_id: str, event: str, data: Dict):
+        """Record a progress event (e.g. a process_pdf stage) for a running job"""
+        with self._connect() as conn:
+            self._add_event(conn, job_id, event, data)
+
+    def events(self, job_id: str, after_id: int = 0) -> List[Dict]:
+        """A job's events with an ID above `after_id`, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT id, event, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id',
+                (job_id, after_id)
+            ).fetchall()
+        return [{'id': row['id'], 'event': row['event'], 'data': json.loads(row['data'])} for row in rows]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row['id'],
+            'filename': row['filename'],
+            'status': row['status'],
+            'submitted_at': row['submitted_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'patient_id': row['patient_id'],
+            'visit_date': row['visit_date'],
+            'queue_seconds': None,
+            'run_seconds': None,
+        }
+        if row['started_at']:
+            job['queue_seconds'] = round(row['started_at'] - row['submitted_at'], 3)
+        if row['started_at'] and row['finished_at']:
+            job['run_seconds'] = round(row['finished_at'] - row['started_at'], 3)
+        if row['result'] is not None:
+            job['result'] = json.loads(row['result'])
+        if row['error'] is not None:
+            job['error'] = row['error']
+        return job
+
+    def pending_count(self) -> int:
+        """Jobs not yet finished (queued or running)"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+
+    def recoverable_ids(self) -> List[str]:
+        """Queued jobs plus running jobs whose owning process has died"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, status, owner_pid FROM jobs WHERE status IN ('queued', 'running') ORDER BY submitted_at"
+            ).fetchall()
+            job_ids = []
+            for row in rows:
+                if row['status'] == 'running':
+                    if _pid_alive(row['owner_pid']):
+                        continue
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', owner_pid = NULL, started_at = NULL WHERE id = ? AND status = 'running'",
+                        (row['id'],)
+                    )
+                    self._add_event(conn, row['id'], 'queued', {'recovered': True})
+                job_ids.append(row['id'])
+        return job_ids
+
+    def purge(self, older_than_seconds: float):
+        cutoff = time.time() - older_than_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?)",
+                (cutoff,)
+            )
+            conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,))
+
+
+class JobQueue:
+    """Runs stored jobs through SimpleMedicalExtractor.process_pdf on a background thread pool"""
+
+    def __init__(self, extractor, store: JobStore, max_workers: int = 2, retention_seconds: float = 86400, cache=None,
+                 patient_store=None, start: bool = True, extraction_version: Optional[str] = None):
+        self.extractor = extractor
+        self.store = store
+        self.cache = cache
+        self.patient_store = patient_store
+        # Raw extractions are kept with stored visits (for PatientStore.rederive) when this is set
+        self.extraction_version = extraction_version
+        self.retention_seconds = retention_seconds
+        self.max_workers = max_workers
+        self.pool = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        if start:
+            self.start()
+
+    def start(self):
+        """Start worker threads in this process and resume unfinished jobs; a no-op if already started here.
+
+        Threads do not survive fork, so a queue built in a preloading master (start=False) is
+        started in each worker after the fork.
+        """
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job-worker')
+            self._pid = os.getpid()
+
+        for job_id in self.store.recoverable_ids():
+            self.pool.submit(self._run, job_id)
+
+    def submit(self, filename: str, pdf_bytes: bytes, visit: Optional[Tuple[str, str]] = None) -> str:
+        """Queue a PDF; with visit=(patient_id, visit_date) the result is also saved to the patient store"""
+        self.store.purge(self.retention_seconds)
+
+        if self.cache is not None:
+            cached_result = self.cache.get(self.cache.key(pdf_bytes, self.extractor.ranges.current().version))
+            if cached_result is not None:
+                self._store_visit(visit, pdf_bytes, cached_result)
+                return self.store.create_finished(filename, cached_result, visit)
+
+        job_id = self.store.create(filename, pdf_bytes, visit)
+        self.start()
+        self.pool.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def events(self, job_id: str, after_id: int = 0) -> List[Dict]:
+        return self.store.events(job_id, after_id)
+
+    def pending(self) -> int:
+        return self.store.pending_count()
+
+    def _store_visit(self, visit: Optional[Tuple[str, str]], pdf_bytes: bytes, result: Dict, raw: Optional[Dict] = None):
+        if visit is not None and self.patient_store is not None:
+            patient_id, visit_date = visit
+            sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+            self.patient_store.add_visit(patient_id, visit_date, result, sha256)
+            if raw is not None and self.extraction_version is not None:
+                self.patient_store.add_raw_extractions([(sha256, self.extraction_version, raw)])
+
+    def _run(self, job_id: str):
+        claimed = self.store.claim(job_id)
+        if claimed is None:
+            return
+        pdf_path, visit = claimed
+
+        try:
+            ranges = self.extractor.ranges.current()
+            progress = lambda event, data: self.store.add_event(job_id, event, data)
+            raw = self.extractor.extract_raw(pdf_path, progress=progress)
+            result = raw if 'error' in raw else self.extractor.derive(raw, ranges, progress)
+            if 'error' in result:
+                self.store.finish(job_id, error=result['error'])
+            else:
+                if self.cache is not None or visit is not None:
+                    with open(pdf_path, 'rb') as f:
+                        pdf_bytes = f.read()
+                    if self.cache is not None:
+                        self.cache.put(self.cache.key(pdf_bytes, ranges.version), result)
+                    self._store_visit(visit, pdf_bytes, result, raw)
+                self.store.finish(job_id, result=result)
+        except Exception as e:
+            self.store.finish(job_id, error=f'Error processing PDF: {str(e)}')
+        finally:
+            if os.path.exists(pdf_path):
+                os.unlink(pdf_path)
@@ -1,75 +1,455 @@
+import bisect
 import fitz
+import hashlib
+import io
+import os
 import re
-import pandas as pd
-from typing import Dict
+import time
+from collections import namedtuple
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from audiogram_extractor import AUDIOGRAM_KEYWORDS, AudiogramExtractor
+from clinical_ranges import DEFAULT_RANGES_PATH, ClinicalRanges, ReloadableRanges
+from instrumentation import COMBINED_REPORTS, PDF_BYTES, PDF_PAGES, PDF_PAGES_READ, STAGE_ERRORS, record_stage, timed_stage
+from ocr import PageOcr
+from pdf_lock import MUPDF_LOCK, POOL_CONTEXT
+from report_splitter import ReportSegment, split_reports
+
+if TYPE_CHECKING:
+    # pandas (and numpy, via cohort) are only imported by interpret_cohort, not by every worker
+    import pandas as pd
+
+# Declarative layout of every metric in a COGNISION report.
+#   'inline' metrics: anchor appears anywhere in a line; take the last number on that line,
+#       otherwise the first number on the next line (unless it is a label or an interpretation).
+#   'table' metrics: anchor is a whole line (optionally followed by `follows`); the value sits
+#       `offset` lines below and the averaged value used as a fallback `average_offset` lines below.
+MetricSpec = namedtuple('MetricSpec', ['metric', 'anchor', 'rule', 'follows', 'offset', 'average_offset'])
+
+METRIC_SPECS = (
+    MetricSpec('Button Press Accuracy', 'Button Press Accuracy', 'inline', None, None, None),
+    MetricSpec('False Alarms', 'False Alarms', 'inline', None, None, None),
+    MetricSpec('Median Reaction Time', 'Median Reaction Time', 'inline', None, None, None),
+    MetricSpec('P50 Amplitude', 'P50', 'table', 'Standard', 2, 4),
+    MetricSpec('N100 Amplitude', 'N100', 'table', 'Standard', 2, 4),
+    MetricSpec('P200 Amplitude', 'P200', 'table', 'Standard', 2, 4),
+    MetricSpec('N200 Amplitude', 'N200', 'table', 'Standard', 2, 4),
+    MetricSpec('P3b Amplitude', 'P3b', 'table', 'Target', 2, 4),
+    MetricSpec('P3b Latency', 'P3b', 'table', 'Target', 3, None),
+    MetricSpec('Slow Wave Amplitude', 'Slow Wave', 'table', 'Standard', 2, 4),
+    MetricSpec('P3a Amplitude', 'P3a', 'table', 'Standard', 2, 4),
+    MetricSpec('Peak Alpha Frequency', 'Peak Alpha', 'table', None, 1, None),
+)
+
+EXTRACTED_METRICS = frozenset(spec.metric for spec in METRIC_SPECS)
+
+# Table anchors are only matched this many lines before the end of the text
+TABLE_SCAN_MARGIN = 5
+
+NUMBER_PATTERN = re.compile(r'\d+\.?\d*')
+NEXT_LINE_STOP_WORDS = ('normal', 'delayed', 'high', 'low', 'borderline')
+
+# Section headers, found case-insensitively by SectionIndex. The Study Discussion runs from its
+# header to the first end header after it (or the end of the text).
+DISCUSSION_HEADER = 'Study Discussion'
+DISCUSSION_END_HEADERS = ('Study Protocol', 'Test Name', 'Physician')
+SECTION_HEADERS = (DISCUSSION_HEADER,) + DISCUSSION_END_HEADERS + AUDIOGRAM_KEYWORDS
+SECTION_NEEDLES = {header: header.lower() for header in SECTION_HEADERS}
+SECTION_PATTERNS_IGNORECASE = {header: re.compile(re.escape(header), re.IGNORECASE) for header in SECTION_HEADERS}
+
+DISCUSSION_INTERPRETATION_PATTERNS = {
+    metric: re.compile(rf'{metric}[:\s]*({labels})', re.IGNORECASE)
+    for metric, labels in (
+        ('Button Press Accuracy', 'Low|Normal|High|Borderline|High Risk'),
+        ('Median Reaction Time', 'Delayed|Normal|Fast|Borderline|High Risk'),
+        ('P50 Amplitude', 'Low|Normal|High|Borderline|High Risk'),
+        ('P3b Amplitude', 'Low|Normal|High|Borderline|High Risk'),
+        ('P3b Latency', 'Delayed|Normal|Fast|Borderline|High Risk'),
+        ('Peak Alpha Frequency', 'Low|Normal|High|Borderline|High Risk'),
+    )
+}
+
+
+def _compile_metric_specs(specs):
+    inline_specs = tuple(spec for spec in specs if spec.rule == 'inline')
+    anchor_index = {}
+    for spec in specs:
+        if spec.rule != 'table':
+            continue
+        follows, value_specs, average_specs = anchor_index.setdefault(spec.anchor, (spec.follows, [], []))
+        value_specs.append(spec)
+        if spec.average_offset is not None:
+            average_specs.append(spec)
+    anchor_index = {anchor: (follows, tuple(value_specs), tuple(average_specs))
+                    for anchor, (follows, value_specs, average_specs) in anchor_index.items()}
+    average_fallbacks = tuple(spec.metric for spec in specs if spec.average_offset is not None)
+    return inline_specs, anchor_index, average_fallbacks
+
+
+INLINE_METRIC_SPECS, METRIC_ANCHOR_INDEX, AVERAGE_FALLBACK_METRICS = _compile_metric_specs(METRIC_SPECS)
+
+
+class SectionIndex:
+    """Start offsets of every SECTION_HEADERS occurrence in a text, found case-insensitively when the index is built.
+    
+    The text is lowercased once and each header located with str.find, which scans it several times
+    faster than one alternation regex would. Overlapping headers (e.g. 'Hearing Test Name') are all
+    reported.
+    """
+    __slots__ = ('text', '_positions')
+    
+    def __init__(self, text: str):
+        self.text = text
+        self._positions = {}
+        lowered = text.lower()
+        for header in SECTION_HEADERS:
+            positions = []
+            if len(lowered) == len(text):
+                needle = SECTION_NEEDLES[header]
+                position = lowered.find(needle)
+                while position != -1:
+                    positions.append(position)
+                    position = lowered.find(needle, position + 1)
+            else:
+                # Some non-ASCII characters lowercase to several, which would shift the offsets
+                pattern = SECTION_PATTERNS_IGNORECASE[header]
+                match = pattern.search(text)
+                while match:
+                    positions.append(match.start())
+                    match = pattern.search(text, match.start() + 1)
+            self._positions[header] = positions
+    
+    def first(self, headers: Union[str, Tuple[str, ...]], start: int = 0) -> int:
+        """Offset of the earliest occurrence of `headers` (one or several) at or after `start`, -1 if none"""
+        found = -1
+        for header in ((headers,) if isinstance(headers, str) else headers):
+            positions = self._positions[header]
+            index = bisect.bisect_left(positions, start)
+            if index < len(positions) and (found == -1 or positions[index] < found):
+                found = positions[index]
+        return found
+    
+    def __getitem__(self, header: str) -> List[int]:
+        return self._positions[header]
+
+
+def index_sections(text: str) -> SectionIndex:
+    """Section header index of a text (see SectionIndex); build it once per text and share it"""
+    return SectionIndex(text)
+
+
+def discussion_section(text: str, sections: SectionIndex) -> str:
+    """The stripped Study Discussion body: after the first header (and an optional colon) up to the next end header"""
+    header = sections.first(DISCUSSION_HEADER)
+    if header == -1:
+        return ""
+    start = header + len(DISCUSSION_HEADER)
+    if text.startswith(':', start):
+        start += 1
+    # Whitespace after the header cannot hold an end header, and strip() drops it
+    end = sections.first(DISCUSSION_END_HEADERS, start)
+    return text[start:end if end != -1 else len(text)].strip()
+
+# Report text templates. The metric narrative depends only on the (metric, interpretation) profile,
+# so it is rendered once per distinct profile and memoized; see _findings_narrative/_discussion_narrative.
+NORMAL_STUDY_TEXT = "This is a normal study with all measured parameters within expected ranges."
+
+# Findings: an implication is stated when any High Risk metric (lowercased) falls in its domain
+FINDINGS_IMPLICATIONS = (
+    (frozenset({'button press accuracy', 'median reaction time', 'p3b latency', 'p3b amplitude'}),
+     "significantly reduced cognitive processing and attentional resources"),
+    (frozenset({'p50 amplitude', 'n100 amplitude', 'p200 amplitude'}), "impaired sensory processing and gating mechanisms"),
+    (frozenset({'false alarms', 'n200 amplitude', 'p3a amplitude'}), "compromised executive function and inhibitory control"),
+    (frozenset({'peak alpha frequency'}), "altered cortical arousal and attention networks"),
+)
+FINDINGS_CONCLUSION = " This pattern is consistent with significant cognitive decline and warrants immediate clinical attention."
+
+# Discussion: the phrase for each (interpretation, metric); metrics without one are not named
+DISCUSSION_PHRASES = {
+    'High Risk': {
+        'Button Press Accuracy': "low button press accuracy",
+        'Median Reaction Time': "delayed median reaction time",
+        'P3b Latency': "delayed P3b latency",
+        'P3b Amplitude': "reduced P3b amplitude",
+        'Peak Alpha Frequency': "reduced peak alpha frequency",
+        'False Alarms': "elevated false alarms",
+    },
+    'Borderline': {
+        'P3b Amplitude': "borderline P3b amplitude",
+        'Button Press Accuracy': "borderline button press accuracy",
+    },
+}
+# (interpretations that count, metrics, implication), in output order
+DISCUSSION_IMPLICATIONS = (
+    (frozenset({'High Risk'}), frozenset({'Button Press Accuracy', 'Median Reaction Time', 'P3b Latency'}),
+     "reduced stimulus processing (including evaluation and classification speed)"),
+    (frozenset({'High Risk', 'Borderline'}), frozenset({'Button Press Accuracy', 'P3b Amplitude'}),
+     "reduced attentional resources and executive function"),
+)
+DISCUSSION_CONCLUSION = "These findings suggest increased risk of cognitive dysfunction and premorbid dementia. Clinical correlation is suggested."
+
+# Worst hearing-loss band of an ear -> wording in the findings and in the discussion (None: not mentioned)
+HEARING_FINDINGS_PHRASES = {'severe': "moderate to severe hearing loss", 'moderate': "moderate hearing loss", 'mild': "mild hearing loss"}
+HEARING_DISCUSSION_PHRASES = {'severe': "moderate-severe hearing loss", 'moderate': "moderate hearing loss", 'mild': None}
+
+ProfileKey = Tuple[Tuple[str, str], ...]
+
+
+def _findings_series(items: List[str]) -> str:
+    return items[0] if len(items) == 1 else f"{', '.join(items[:-1])}, and {items[-1]}"
+
+
+def _discussion_series(items: List[str]) -> str:
+    if len(items) <= 2:
+        return ' and '.join(items)
+    return f"{', '.join(items[:-1])}, and {items[-1]}"
+
+
+@lru_cache(maxsize=4096)
+def _findings_narrative(profile: ProfileKey) -> str:
+    """Study findings text for an ordered ((metric, interpretation), ...) profile, before the audiogram part"""
+    high_risk = [metric.lower() for metric, interpretation in profile if interpretation == 'High Risk']
+    borderline = [metric.lower() for metric, interpretation in profile if interpretation == 'Borderline']
+    if not high_risk and not borderline:
+        return NORMAL_STUDY_TEXT
+    
+    parts = []
+    if high_risk:
+        parts.append(f"high risk {_findings_series(high_risk)}")
+    if borderline:
+        parts.append(f"borderline {_findings_series(borderline)}")
+    findings = f"This is an abnormal study due to {' and '.join(parts)}."
+    
+    implications = [implication for metrics, implication in FINDINGS_IMPLICATIONS if not metrics.isdisjoint(high_risk)]
+    if implications:
+        findings = f"{findings} These findings suggest {', and '.join(implications)}.{FINDINGS_CONCLUSION}"
+    return findings
+
+
+@lru_cache(maxsize=4096)
+def _discussion_narrative(profile: ProfileKey) -> Optional[Tuple[str, ...]]:
+    """Study discussion sentences for a profile, before the audiogram part; None for a normal study"""
+    high_risk = [metric for metric, interpretation in profile if interpretation == 'High Risk']
+    borderline = [metric for metric, interpretation in profile if interpretation == 'Borderline']
+    if not high_risk and not borderline:
+        return None
+    
+    phrases = DISCUSSION_PHRASES['High Risk']
+    abnormal_findings = [phrases[metric] for metric in high_risk if metric in phrases]
+    phrases = DISCUSSION_PHRASES['Borderline']
+    abnormal_findings += [phrases[metric] for metric in borderline if metric in phrases]
+    
+    sentences = []
+    if abnormal_findings:
+        sentences.append(f"This is an abnormal study due to {_discussion_series(abnormal_findings)}.")
+    
+    implications = [
+        implication for counted, metrics, implication in DISCUSSION_IMPLICATIONS
+        if any(interpretation in counted and metric in metrics for metric, interpretation in profile)
+    ]
+    if implications:
+        sentences.append(f"Collectively, study findings suggest {' as well as '.join(implications)}.")
+        sentences.append(DISCUSSION_CONCLUSION)
+    return tuple(sentences)
+
+
+def _hearing_loss_bands(thresholds: Dict, bands) -> Tuple[Optional[str], List]:
+    """Worst hearing-loss band of one ear ('severe', 'moderate', 'mild' or None) and its frequencies"""
+    worst = {'severe': [], 'moderate': [], 'mild': []}
+    for freq, htl in thresholds.items():
+        if htl > bands.moderate_max:
+            worst['severe'].append(freq)
+        elif htl > bands.mild_max:
+            worst['moderate'].append(freq)
+        elif htl > bands.normal_max:
+            worst['mild'].append(freq)
+    for band, freqs in worst.items():
+        if freqs:
+            return band, freqs
+    return None, []
+
+PdfSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+# process_pdf progress callback: called as progress(event, data) after each stage, in PROGRESS_EVENTS order
+ProgressCallback = Callable[[str, Dict], None]
+PROGRESS_EVENTS = ('pages_parsed', 'metrics_found', 'audiogram_analyzed', 'findings_generated')
+
+_worker_extractor = None
+
+
+def _init_worker():
+    global _worker_extractor
+    # The pool already runs one document per process, so OCR stays in-process instead of nesting pools
+    _worker_extractor = SimpleMedicalExtractor(ocr=PageOcr(max_workers=0))
+
+
+def _process_pdf_worker(pdf_source: PdfSource) -> Dict:
+    try:
+        return _worker_extractor.process_pdf(pdf_source)
+    except Exception as e:
+        return {"error": f"Error processing PDF: {str(e)}"}
+
+
+def _extract_raw_worker(pdf_source: PdfSource) -> Dict:
+    try:
+        return _worker_extractor.extract_raw(pdf_source)
+    except Exception as e:
+        return {"error": f"Error processing PDF: {str(e)}"}
+
+
+def load_pdf_source(source: PdfSource) -> Union[str, os.PathLike, bytes, bytearray, io.BytesIO]:
+    """Normalize a PDF path, buffer or stream into something fitz.open can take, copying only when unavoidable"""
+    if isinstance(source, (str, os.PathLike, bytes, bytearray, io.BytesIO)):
+        return source
+    if isinstance(source, memoryview):
+        if isinstance(source.obj, (bytes, bytearray)) and source.contiguous and source.nbytes == len(source.obj):
+            return source.obj
+        return source.tobytes()
+    return source.read()
+
+
+def pdf_source_size(source: PdfSource) -> Optional[int]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).nbytes
+    if isinstance(source, io.BytesIO):
+        return source.getbuffer().nbytes
+    if isinstance(source, (str, os.PathLike)):
+        try:
+            return os.path.getsize(source)
+        except OSError:
+            return None
+    return None
+
+
+def open_pdf(source: PdfSource) -> fitz.Document:
+    source = load_pdf_source(source)
+    with MUPDF_LOCK:
+        if isinstance(source, (str, os.PathLike)):
+            return fitz.open(source)
+        return fitz.open(stream=source, filetype="pdf")
+
 
 class SimpleMedicalExtractor:
-    def __init__(self):
-        self.clinical_ranges = {
-            'Button Press Accuracy': {'normal': 94.1, 'mild_ad': 82.2, 'direction': 'lower'},
-            'False Alarms': {'normal': 1.1, 'mild_ad': 4.9, 'direction': 'higher'},
-            'Median Reaction Time': {'normal': 458, 'mild_ad': 499, 'direction': 'higher'},
-            'P50 Amplitude': {'normal': 2.77, 'mild_ad': 2.95, 'direction': 'higher'},
-            'N100 Amplitude': {'normal': -7.23, 'mild_ad': -6.00, 'direction': 'higher'},
-            'P200 Amplitude': {'normal': 5.26, 'mild_ad': 4.64, 'direction': 'lower'},
-            'N200 Amplitude': {'normal': -0.31, 'mild_ad': -1.10, 'direction': 'lower'},
-            'P3b Amplitude': {'normal': 6.03, 'mild_ad': 4.42, 'direction': 'lower'},
-            'P3b Latency': {'normal': 396.0, 'mild_ad': 419.6, 'direction': 'higher'},
-            'Slow Wave Amplitude': {'normal': -2.54, 'mild_ad': -2.65, 'direction': 'lower'},
-            'P3a Amplitude': {'normal': 5.88, 'mild_ad': 3.63, 'direction': 'lower'},
-            'Peak Alpha Frequency': {'normal': 9.39, 'mild_ad': 8.34, 'direction': 'lower'}
-        }
+    def __init__(self, ranges_path: str = DEFAULT_RANGES_PATH, ranges_check_interval: float = 5.0, ocr: Optional[PageOcr] = None):
+        # Thresholds come from a versioned config that is re-read when the file changes
+        self.ranges = ReloadableRanges(ranges_path, ranges_check_interval)
+        # Pages without a text layer are OCRed when a Tesseract engine is installed
+        self.ocr = ocr if ocr is not None else PageOcr()
         self.audiogram_frequencies = [250, 500, 1000, 2000, 4000, 8000]
+        self.audiogram_extractor = AudiogramExtractor(self.audiogram_frequencies)
+    
+    @property
+    def clinical_ranges(self) -> Dict:
+        """Reference ranges of the current config as {metric: {'normal', 'mild_ad', 'direction'}}"""
+        return self.ranges.current().reference_ranges
+    
+    def iter_pdf_pages(self, pdf_source: PdfSource) -> Iterator[str]:
+        """Yield page text one page at a time; pages after the consumer stops are never loaded.
+        
+        Pages without a text layer are OCRed: at the first one, every remaining image-only page is
+        sent to the OCR pool at once and their text is yielded in page order as it completes.
+        """
+        with timed_stage('open'):
+            doc = open_pdf(pdf_source)
+        with MUPDF_LOCK:
+            page_count = doc.page_count
+        PDF_PAGES.observe(page_count)
+        
+        text_seconds = 0.0
+        pages_read = 0
+        lookahead = {}
+        ocr_texts = None
+        # Image-only pages before this page number have been handed to the OCR batch in ocr_texts
+        ocr_batch_end = 0
+        try:
+            for number in range(page_count):
+                start = time.perf_counter()
+                if number in lookahead:
+                    page_text = lookahead.pop(number)
+                else:
+                    with MUPDF_LOCK:
+                        page_text = doc[number].get_text()
+                if not page_text.strip() and self.ocr.available:
+                    if number >= ocr_batch_end:
+                        # Look only as far ahead as OCR keeps pages in flight, so an early stop still skips the rest
+                        ocr_batch_end = min(number + self.ocr.window, page_count)
+                        with MUPDF_LOCK:
+                            for later in range(number + 1, ocr_batch_end):
+                                lookahead[later] = doc[later].get_text()
+                        image_pages = [number] + [later for later in range(number + 1, ocr_batch_end) if not lookahead[later].strip()]
+                        if ocr_texts is not None:
+                            ocr_texts.close()
+                        ocr_texts = self.ocr.page_texts(doc, image_pages)
+                    text_seconds += time.perf_counter() - start
+                    page_text = next(ocr_texts)
+                else:
+                    text_seconds += time.perf_counter() - start
+                pages_read += 1
+                yield page_text
+        finally:
+            if ocr_texts is not None:
+                ocr_texts.close()
+            with MUPDF_LOCK:
+                doc.close()
+            record_stage('get_text', text_seconds)
+            PDF_PAGES_READ.inc(pages_read)
     
-    def extract_pdf_text(self, pdf_path: str) -> str:
+    def extract_pdf_text(self, pdf_source: PdfSource) -> str:
         try:
-            doc = fitz.open(pdf_path)
-            text = ""
-            for page in doc:
-                text += page.get_text() + "\n"
-            doc.close()
-            return text
+            return "".join(page_text + "\n" for page_text in self.iter_pdf_pages(pdf_source))
         except Exception as e:
             return ""
     
-    def calculate_clinical_interpretation(self, metric: str, value: float) -> str:
-        if metric not in self.clinical_ranges:
-            return 'Unknown'
-        
-        if metric == 'Peak Alpha Frequency' and value < 8.0:
-            return 'CRITICAL - RETEST REQUIRED'
-        
-        range_info = self.clinical_ranges[metric]
-        normal_val = range_info['normal']
-        mild_ad_val = range_info['mild_ad']
-        direction = range_info['direction']
-        
-        if direction == 'lower':
-            if value <= mild_ad_val:
-                return 'High Risk'
-            elif value < normal_val:
-                return 'Borderline'
-            else:
-                return 'Normal'
-        else:
-            if value >= mild_ad_val:
-                return 'High Risk'
-            elif value > normal_val:
-                return 'Borderline'
-            else:
-                return 'Normal'
+    def read_report_pages(self, pdf_source: PdfSource, stop_early: bool = True) -> List[str]:
+        """Page texts, stopping (when stop_early) once every metric and the whole Study Discussion have been read"""
+        pages = []
+        found_metrics = set()
+        discussion_open = False
+        discussion_closed = False
+        
+        try:
+            for page_text in self.iter_pdf_pages(pdf_source):
+                pages.append(page_text)
+                if not stop_early:
+                    continue
+                
+                found_metrics.update(self.extract_all_values(page_text))
+                
+                if not discussion_closed:
+                    sections = index_sections(page_text)
+                    search_from = 0
+                    if not discussion_open:
+                        header = sections.first(DISCUSSION_HEADER)
+                        if header != -1:
+                            discussion_open = True
+                            search_from = header + len(DISCUSSION_HEADER)
+                    if discussion_open and sections.first(DISCUSSION_END_HEADERS, search_from) != -1:
+                        discussion_closed = True
+                
+                if discussion_closed and found_metrics.issuperset(EXTRACTED_METRICS):
+                    break
+        except Exception as e:
+            return []
+        
+        return pages
     
-    def interpret_hearing_loss(self, htl_db: float) -> str:
-        if htl_db <= 25:
-            return 'Normal'
-        elif htl_db <= 40:
-            return 'Mild'
-        elif htl_db <= 55:
-            return 'Moderate'
-        else:
-            return 'Moderate to Severe'
+    def calculate_clinical_interpretation(self, metric: str, value: float, ranges: Optional[ClinicalRanges] = None) -> str:
+        return (ranges or self.ranges.current()).classify(metric, value)
+    
+    def interpret_cohort(self, values: 'pd.DataFrame') -> 'pd.DataFrame':
+        """Vectorized calculate_clinical_interpretation over a patients x metrics DataFrame"""
+        from cohort import CohortScorer
+        
+        ranges = self.ranges.current()
+        return CohortScorer(ranges.reference_ranges, ranges.critical_floors).score(values)
     
-    def analyze_audiogram_asymmetry(self, audiogram_data: Dict) -> Dict:
+    def interpret_hearing_loss(self, htl_db: float, ranges: Optional[ClinicalRanges] = None) -> str:
+        return (ranges or self.ranges.current()).hearing_loss.classify(htl_db)
+    
+    def analyze_audiogram_asymmetry(self, audiogram_data: Dict, ranges: Optional[ClinicalRanges] = None) -> Dict:
+        bands = (ranges or self.ranges.current()).asymmetry
         asymmetry_analysis = {
             'asymmetries': {},
             'flags': [],
@@ -86,15 +466,7 @@ class SimpleMedicalExtractor:
         for freq in [250, 500, 1000, 2000, 4000, 8000]:
             if freq in left_ear and freq in right_ear:
                 asymmetry = abs(left_ear[freq] - right_ear[freq])
-                
-                if asymmetry <= 25:
-                    asymmetry_classification = 'Normal'
-                elif asymmetry <= 40:
-                    asymmetry_classification = 'Mild'
-                elif asymmetry <= 55:
-                    asymmetry_classification = 'Moderate'
-                else:
-                    asymmetry_classification = 'Moderate to Severe'
+                asymmetry_classification = bands.classify(asymmetry)
                 
                 asymmetry_analysis['asymmetries'][freq] = {
                     'left_ear_htl': left_ear[freq],
@@ -107,19 +479,17 @@ class SimpleMedicalExtractor:
                 if asymmetry > asymmetry_analysis['max_asymmetry']:
                     asymmetry_analysis['max_asymmetry'] = asymmetry
                 
-                if asymmetry > 55:
-                    asymmetry_analysis['concerning_frequencies'].append(freq)
-                elif asymmetry > 40:
+                if asymmetry > bands.mild_max:
                     asymmetry_analysis['concerning_frequencies'].append(freq)
         
         max_asymmetry = asymmetry_analysis['max_asymmetry']
-        if max_asymmetry > 55:
+        if max_asymmetry > bands.moderate_max:
             asymmetry_analysis['overall_flag'] = 'SEVERE_ASYMMETRY'
             asymmetry_analysis['clinical_significance'] = 'Moderate to severe asymmetry detected. Immediate audiological referral recommended.'
-        elif max_asymmetry > 40:
+        elif max_asymmetry > bands.mild_max:
             asymmetry_analysis['overall_flag'] = 'MODERATE_ASYMMETRY'
             asymmetry_analysis['clinical_significance'] = 'Moderate asymmetry detected. Consider audiological evaluation.'
-        elif max_asymmetry > 25:
+        elif max_asymmetry > bands.normal_max:
             asymmetry_analysis['overall_flag'] = 'MILD_ASYMMETRY'
             asymmetry_analysis['clinical_significance'] = 'Mild asymmetry present. Monitor for progression.'
         else:
@@ -128,17 +498,18 @@ class SimpleMedicalExtractor:
         
         return asymmetry_analysis
 
-    def check_cognision_compatibility(self, audiogram_data: Dict) -> Dict:
+    def check_cognision_compatibility(self, audiogram_data: Dict, ranges: Optional[ClinicalRanges] = None) -> Dict:
+        max_htl = (ranges or self.ranges.current()).cognision_max_htl
         compatibility = {'left_ear': True, 'right_ear': True, 'overall': True}
         issues = []
         
         for ear in ['left_ear', 'right_ear']:
             if ear in audiogram_data:
                 for freq, htl in audiogram_data[ear].items():
-                    if htl > 45:
+                    if htl > max_htl:
                         compatibility[ear] = False
                         compatibility['overall'] = False
-                        issues.append(f"{ear.replace('_', ' ').title()}: {freq}Hz = {htl}dB (>45dB limit)")
+                        issues.append(f"{ear.replace('_', ' ').title()}: {freq}Hz = {htl}dB (>{max_htl}dB limit)")
         
         return {
             'compatible': compatibility['overall'],
@@ -147,366 +518,290 @@ class SimpleMedicalExtractor:
             'issues': issues
         }
     
-    def estimate_audiogram_from_typical_pattern(self) -> Dict:
-        import random
-        
-        base_left = random.randint(30, 40)
-        base_right = random.randint(25, 35)
-        
-        left_ear = {
-            250: base_left + random.randint(15, 25),
-            500: base_left + random.randint(5, 15),
-            1000: base_left + random.randint(-5, 5),
-            2000: max(15, base_left - random.randint(5, 15)),
-            4000: max(5, base_left - random.randint(25, 35)),
-            8000: max(20, base_left - random.randint(5, 15))
-        }
+    def extract_audiogram_data(self, text: str, pdf_source: PdfSource = None, page_numbers: Optional[List[int]] = None,
+                               search_from: Optional[int] = None, sections: Optional[SectionIndex] = None) -> Dict:
+        """Thresholds read from the audiogram plot in the PDF; empty when there is none or it cannot be read.
+        
+        `page_numbers` limits the search to known audiogram pages; `search_from` lets it continue into
+        pages that were not read (after an early stop) when those pages yield nothing. `sections` is
+        index_sections(text), when the caller already has it.
+        """
+        if sections is None:
+            sections = index_sections(text)
+        if pdf_source is None or sections.first(AUDIOGRAM_KEYWORDS) == -1:
+            return {}
         
-        right_ear = {
-            250: base_right + random.randint(10, 20),
-            500: base_right + random.randint(0, 10),
-            1000: max(20, base_right - random.randint(0, 10)),
-            2000: max(20, base_right - random.randint(0, 10)),
-            4000: base_right + random.randint(0, 10),
-            8000: base_right + random.randint(10, 20)
-        }
+        try:
+            doc = open_pdf(pdf_source)
+        except Exception as e:
+            return {}
         
-        return {'left_ear': left_ear, 'right_ear': right_ear}
+        try:
+            with MUPDF_LOCK:
+                return self.audiogram_extractor.extract(doc, page_numbers, search_from)
+        except Exception as e:
+            return {}
+        finally:
+            with MUPDF_LOCK:
+                doc.close()
     
-    def extract_audiogram_data(self, text: str, pdf_path: str = None) -> Dict:
-        audiogram_data = {}
-        
-        if any(keyword in text.lower() for keyword in ['audiogram', 'hearing test']):
-            audiogram_data = self.estimate_audiogram_from_typical_pattern()
-        
-        return audiogram_data
-    
-    def generate_study_findings(self, values: Dict, interpretations: Dict, audiogram_data: Dict = None, cognision_compatibility: Dict = None, asymmetry_analysis: Dict = None) -> str:
-        high_risk_findings = []
-        borderline_findings = []
-        
-        for metric, interpretation in interpretations.items():
-            if interpretation == 'High Risk':
-                high_risk_findings.append(metric.lower())
-            elif interpretation == 'Borderline':
-                borderline_findings.append(metric.lower())
-        
-        if not high_risk_findings and not borderline_findings:
-            findings = "This is a normal study with all measured parameters within expected ranges."
-        else:
-            findings_parts = []
-            
-            if high_risk_findings:
-                if len(high_risk_findings) == 1:
-                    findings_parts.append(f"high risk {high_risk_findings[0]}")
-                else:
-                    findings_parts.append(f"high risk {', '.join(high_risk_findings[:-1])}, and {high_risk_findings[-1]}")
-            
-            if borderline_findings:
-                if len(borderline_findings) == 1:
-                    findings_parts.append(f"borderline {borderline_findings[0]}")
-                else:
-                    findings_parts.append(f"borderline {', '.join(borderline_findings[:-1])}, and {borderline_findings[-1]}")
-            
-            if len(findings_parts) == 1:
-                findings = f"This is an abnormal study due to {findings_parts[0]}."
-            else:
-                findings = f"This is an abnormal study due to {' and '.join(findings_parts)}."
-            
-            if high_risk_findings:
-                implications = []
-                
-                cognitive_metrics = ['button press accuracy', 'median reaction time', 'p3b latency', 'p3b amplitude']
-                if any(metric in cognitive_metrics for metric in high_risk_findings):
-                    implications.append("significantly reduced cognitive processing and attentional resources")
-                
-                sensory_metrics = ['p50 amplitude', 'n100 amplitude', 'p200 amplitude']
-                if any(metric in sensory_metrics for metric in high_risk_findings):
-                    implications.append("impaired sensory processing and gating mechanisms")
-                
-                executive_metrics = ['false alarms', 'n200 amplitude', 'p3a amplitude']
-                if any(metric in executive_metrics for metric in high_risk_findings):
-                    implications.append("compromised executive function and inhibitory control")
-                
-                if 'peak alpha frequency' in high_risk_findings:
-                    implications.append("altered cortical arousal and attention networks")
-                
-                if implications:
-                    findings += f" These findings suggest {', and '.join(implications)}."
-                    findings += " This pattern is consistent with significant cognitive decline and warrants immediate clinical attention."
+    def generate_study_findings(self, values: Dict, interpretations: Dict, audiogram_data: Dict = None, cognision_compatibility: Dict = None, asymmetry_analysis: Dict = None,
+                                ranges: Optional[ClinicalRanges] = None) -> str:
+        ranges = ranges or self.ranges.current()
+        findings = _findings_narrative(tuple(interpretations.items()))
         
         if audiogram_data and cognision_compatibility:
-            findings += "\n\nAudiogram Analysis: "
+            parts = [findings, "\n\nAudiogram Analysis: "]
             
             if cognision_compatibility.get('compatible', True):
-                findings += "Hearing levels are compatible with COGNISION testing (all frequencies ≤45dB HTL)."
+                parts.append(f"Hearing levels are compatible with COGNISION testing (all frequencies ≤{ranges.cognision_max_htl}dB HTL).")
             else:
-                findings += "⚠️ Hearing levels may affect COGNISION test reliability. "
+                parts.append("⚠️ Hearing levels may affect COGNISION test reliability. ")
                 issues = cognision_compatibility.get('issues', [])
                 if issues:
-                    findings += f"Issues found: {'; '.join(issues)}. "
-                findings += "COGNISION can compensate for up to 45dB HTL."
+                    parts.append(f"Issues found: {'; '.join(issues)}. ")
+                parts.append(f"COGNISION can compensate for up to {ranges.cognision_max_htl}dB HTL.")
             
             hearing_concerns = []
             for ear in ['left_ear', 'right_ear']:
                 if ear in audiogram_data:
-                    severe_freqs = [f for f, htl in audiogram_data[ear].items() if htl > 55]
-                    moderate_freqs = [f for f, htl in audiogram_data[ear].items() if 41 <= htl <= 55]
-                    mild_freqs = [f for f, htl in audiogram_data[ear].items() if 26 <= htl <= 40]
-                    
-                    if severe_freqs:
-                        hearing_concerns.append(f"{ear.replace('_', ' ')}: moderate to severe hearing loss at {severe_freqs}Hz")
-                    elif moderate_freqs:
-                        hearing_concerns.append(f"{ear.replace('_', ' ')}: moderate hearing loss at {moderate_freqs}Hz")
-                    elif mild_freqs:
-                        hearing_concerns.append(f"{ear.replace('_', ' ')}: mild hearing loss at {mild_freqs}Hz")
+                    band, freqs = _hearing_loss_bands(audiogram_data[ear], ranges.hearing_loss)
+                    if band:
+                        hearing_concerns.append(f"{ear.replace('_', ' ')}: {HEARING_FINDINGS_PHRASES[band]} at {freqs}Hz")
             
             if hearing_concerns:
-                findings += f" Hearing loss detected: {'; '.join(hearing_concerns)}."
+                parts.append(f" Hearing loss detected: {'; '.join(hearing_concerns)}.")
             
             if asymmetry_analysis and asymmetry_analysis.get('overall_flag') != 'NORMAL_ASYMMETRY':
-                findings += f" {asymmetry_analysis.get('clinical_significance', '')}"
+                parts.append(f" {asymmetry_analysis.get('clinical_significance', '')}")
                 if asymmetry_analysis.get('concerning_frequencies'):
-                    concerning_freqs = asymmetry_analysis['concerning_frequencies']
-                    findings += f" Significant asymmetries noted at {concerning_freqs}Hz."
+                    parts.append(f" Significant asymmetries noted at {asymmetry_analysis['concerning_frequencies']}Hz.")
+            findings = ''.join(parts)
         
         return findings
     
-    def generate_study_discussion(self, values: Dict, interpretations: Dict, audiogram_data: Dict = None, asymmetry_analysis: Dict = None) -> str:
+    def generate_study_discussion(self, values: Dict, interpretations: Dict, audiogram_data: Dict = None, asymmetry_analysis: Dict = None,
+                                  ranges: Optional[ClinicalRanges] = None) -> str:
         """Generate concise Study Discussion based on extracted values and interpretations"""
+        ranges = ranges or self.ranges.current()
         
-        high_risk_metrics = []
-        borderline_metrics = []
-        
-        for metric, interpretation in interpretations.items():
-            if interpretation == 'High Risk':
-                high_risk_metrics.append(metric)
-            elif interpretation == 'Borderline':
-                borderline_metrics.append(metric)
-        
-        if not high_risk_metrics and not borderline_metrics:
-            return "This is a normal study with all measured parameters within expected ranges."
-        
-        discussion_parts = []
-        
-        abnormal_findings = []
-        if high_risk_metrics:
-            for metric in high_risk_metrics:
-                if metric == 'Button Press Accuracy':
-                    abnormal_findings.append("low button press accuracy")
-                elif metric == 'Median Reaction Time':
-                    abnormal_findings.append("delayed median reaction time")
-                elif metric == 'P3b Latency':
-                    abnormal_findings.append("delayed P3b latency")
-                elif metric == 'P3b Amplitude':
-                    abnormal_findings.append("reduced P3b amplitude")
-                elif metric == 'Peak Alpha Frequency':
-                    abnormal_findings.append("reduced peak alpha frequency")
-                elif metric == 'False Alarms':
-                    abnormal_findings.append("elevated false alarms")
-        
-        if borderline_metrics:
-            for metric in borderline_metrics:
-                if metric == 'P3b Amplitude':
-                    abnormal_findings.append("borderline P3b amplitude")
-                elif metric == 'Button Press Accuracy':
-                    abnormal_findings.append("borderline button press accuracy")
-        
-        if abnormal_findings:
-            if len(abnormal_findings) == 1:
-                discussion_parts.append(f"This is an abnormal study due to {abnormal_findings[0]}.")
-            elif len(abnormal_findings) == 2:
-                discussion_parts.append(f"This is an abnormal study due to {abnormal_findings[0]} and {abnormal_findings[1]}.")
-            else:
-                discussion_parts.append(f"This is an abnormal study due to {', '.join(abnormal_findings[:-1])}, and {abnormal_findings[-1]}.")
-        
-        implications = []
-        
-        if any(metric in ['Button Press Accuracy', 'Median Reaction Time', 'P3b Latency'] for metric in high_risk_metrics):
-            implications.append("reduced stimulus processing (including evaluation and classification speed)")
-        
-        if any(metric in ['Button Press Accuracy', 'P3b Amplitude'] for metric in high_risk_metrics + borderline_metrics):
-            implications.append("reduced attentional resources and executive function")
-        
-        if implications:
-            discussion_parts.append(f"Collectively, study findings suggest {' as well as '.join(implications)}.")
-            discussion_parts.append("These findings suggest increased risk of cognitive dysfunction and premorbid dementia. Clinical correlation is suggested.")
+        narrative = _discussion_narrative(tuple(interpretations.items()))
+        if narrative is None:
+            return NORMAL_STUDY_TEXT
+        discussion_parts = list(narrative)
         
         if audiogram_data:
             hearing_issues = []
             for ear in ['left_ear', 'right_ear']:
                 if ear in audiogram_data:
-                    severe_loss = any(htl > 55 for htl in audiogram_data[ear].values())
-                    moderate_loss = any(41 <= htl <= 55 for htl in audiogram_data[ear].values())
-                    if severe_loss:
-                        hearing_issues.append(f"{ear.replace('_', ' ')} moderate-severe hearing loss")
-                    elif moderate_loss:
-                        hearing_issues.append(f"{ear.replace('_', ' ')} moderate hearing loss")
+                    band, _ = _hearing_loss_bands(audiogram_data[ear], ranges.hearing_loss)
+                    if HEARING_DISCUSSION_PHRASES.get(band):
+                        hearing_issues.append(f"{ear.replace('_', ' ')} {HEARING_DISCUSSION_PHRASES[band]}")
             
-            if hearing_issues or (asymmetry_analysis and asymmetry_analysis.get('max_asymmetry', 0) > 25):
+            asymmetry_limit = ranges.asymmetry.normal_max
+            significant_asymmetry = asymmetry_analysis and asymmetry_analysis.get('max_asymmetry', 0) > asymmetry_limit
+            if hearing_issues or significant_asymmetry:
                 discussion_parts.append("")  # Line break
                 if hearing_issues:
                     discussion_parts.append(f"Audiogram reveals {' and '.join(hearing_issues)}.")
-                if asymmetry_analysis and asymmetry_analysis.get('max_asymmetry', 0) > 25:
+                if significant_asymmetry:
                     discussion_parts.append(f"Significant ear-to-ear asymmetry noted (max {asymmetry_analysis['max_asymmetry']}dB).")
         
         return ' '.join(discussion_parts)
     
     def extract_all_values(self, text: str) -> Dict:
-        values = {}
+        inline_values = {}
+        table_values = {}
         avg_amplitudes = {}
         lines = [line.strip() for line in text.split('\n')]
+        line_count = len(lines)
+        table_limit = line_count - TABLE_SCAN_MARGIN
         
         for i, line in enumerate(lines):
-            if 'Button Press Accuracy' in line:
-                numbers = re.findall(r'\d+\.?\d*', line)
-                if numbers:
-                    values['Button Press Accuracy'] = float(numbers[-1])
-                elif i+1 < len(lines):
-                    next_line = lines[i+1].strip()
-                    if ':' not in next_line and not any(word in next_line.lower() for word in ['normal', 'delayed', 'high', 'low', 'borderline']):
-                        numbers = re.findall(r'\d+\.?\d*', next_line)
-                        if numbers:
-                            values['Button Press Accuracy'] = float(numbers[0])
+            for spec in INLINE_METRIC_SPECS:
+                if spec.anchor in line:
+                    value = self._inline_metric_value(lines, i)
+                    if value is not None:
+                        inline_values[spec.metric] = value
             
-            if 'False Alarms' in line:
-                numbers = re.findall(r'\d+\.?\d*', line)
-                if numbers:
-                    values['False Alarms'] = float(numbers[-1])
-                elif i+1 < len(lines):
-                    next_line = lines[i+1].strip()
-                    if ':' not in next_line and not any(word in next_line.lower() for word in ['normal', 'delayed', 'high', 'low', 'borderline']):
-                        numbers = re.findall(r'\d+\.?\d*', next_line)
-                        if numbers:
-                            values['False Alarms'] = float(numbers[0])
-            
-            if 'Median Reaction Time' in line:
-                numbers = re.findall(r'\d+\.?\d*', line)
-                if numbers:
-                    values['Median Reaction Time'] = float(numbers[-1])
-                elif i+1 < len(lines):
-                    next_line = lines[i+1].strip()
-                    if ':' not in next_line and not any(word in next_line.lower() for word in ['normal', 'delayed', 'high', 'low', 'borderline']):
-                        numbers = re.findall(r'\d+\.?\d*', next_line)
-                        if numbers:
-                            values['Median Reaction Time'] = float(numbers[0])
-        
-        for i in range(len(lines) - 5):
-            if lines[i] == 'P50' and i+1 < len(lines) and lines[i+1] == 'Standard':
-                if i+2 < len(lines):
-                    try:
-                        values['P50 Amplitude'] = float(lines[i+2])
-                    except ValueError:
-                        pass
-                if i+4 < len(lines):
-                    try:
-                        avg_amplitudes['P50 Amplitude'] = float(lines[i+4])
-                    except ValueError:
-                        pass
+            if i >= table_limit:
+                continue
             
-            if lines[i] == 'P3b' and i+1 < len(lines) and lines[i+1] == 'Target':
-                if i+2 < len(lines) and i+3 < len(lines):
-                    try:
-                        values['P3b Amplitude'] = float(lines[i+2])
-                        values['P3b Latency'] = float(lines[i+3])
-                    except ValueError:
-                        pass
-                if i+4 < len(lines):
-                    try:
-                        avg_amplitudes['P3b Amplitude'] = float(lines[i+4])
-                    except ValueError:
-                        pass
+            table_entry = METRIC_ANCHOR_INDEX.get(line)
+            if table_entry is None:
+                continue
             
-            # Extract other ERP components
-            erp_patterns = {
-                'N100': ['N100', 'Standard'],
-                'P200': ['P200', 'Standard'],
-                'N200': ['N200', 'Standard'],
-                'P3a': ['P3a', 'Standard'],
-                'Slow Wave': ['Slow Wave', 'Standard']
-            }
+            follows, value_specs, average_specs = table_entry
+            if follows is not None and lines[i+1] != follows:
+                continue
             
-            for erp_name, pattern in erp_patterns.items():
-                if lines[i] == pattern[0] and i+1 < len(lines) and lines[i+1] == pattern[1]:
-                    if i+2 < len(lines):
-                        try:
-                            values[f'{erp_name} Amplitude'] = float(lines[i+2])
-                        except ValueError:
-                            pass
-                    if i+4 < len(lines):
-                        try:
-                            avg_amplitudes[f'{erp_name} Amplitude'] = float(lines[i+4])
-                        except ValueError:
-                            pass
+            # Values sharing an anchor are read in order and stop at the first unparseable line
+            for spec in value_specs:
+                try:
+                    table_values[spec.metric] = float(lines[i+spec.offset])
+                except ValueError:
+                    break
             
-            if lines[i] == 'Peak Alpha' and i+1 < len(lines):
+            for spec in average_specs:
                 try:
-                    values['Peak Alpha Frequency'] = float(lines[i+1])
+                    avg_amplitudes[spec.metric] = float(lines[i+spec.average_offset])
                 except ValueError:
                     pass
         
-        for amplitude_metric in ['P50 Amplitude', 'N100 Amplitude', 'P200 Amplitude', 
-                                'N200 Amplitude', 'P3b Amplitude', 'Slow Wave Amplitude', 'P3a Amplitude']:
+        values = inline_values
+        values.update(table_values)
+        
+        for amplitude_metric in AVERAGE_FALLBACK_METRICS:
             if amplitude_metric not in values and amplitude_metric in avg_amplitudes:
                 values[amplitude_metric] = avg_amplitudes[amplitude_metric]
         
         return values
     
+    def _inline_metric_value(self, lines: List[str], i: int) -> Optional[float]:
+        numbers = NUMBER_PATTERN.findall(lines[i])
+        if numbers:
+            return float(numbers[-1])
+        
+        if i+1 < len(lines):
+            next_line = lines[i+1]
+            lowered = next_line.lower()
+            if ':' not in next_line and not any(word in lowered for word in NEXT_LINE_STOP_WORDS):
+                numbers = NUMBER_PATTERN.findall(next_line)
+                if numbers:
+                    return float(numbers[0])
+        
+        return None
+    
     def extract_discussion_interpretations(self, discussion_text: str) -> Dict:
         interpretations = {}
         
-        patterns = {
-            'Button Press Accuracy': r'Button Press Accuracy[:\s]*(Low|Normal|High|Borderline|High Risk)',
-            'Median Reaction Time': r'Median Reaction Time[:\s]*(Delayed|Normal|Fast|Borderline|High Risk)',
-            'P50 Amplitude': r'P50 Amplitude[:\s]*(Low|Normal|High|Borderline|High Risk)',
-            'P3b Amplitude': r'P3b Amplitude[:\s]*(Low|Normal|High|Borderline|High Risk)',
-            'P3b Latency': r'P3b Latency[:\s]*(Delayed|Normal|Fast|Borderline|High Risk)',
-            'Peak Alpha Frequency': r'Peak Alpha Frequency[:\s]*(Low|Normal|High|Borderline|High Risk)'
-        }
-        
-        for metric, pattern in patterns.items():
-            match = re.search(pattern, discussion_text, re.IGNORECASE)
+        for metric, pattern in DISCUSSION_INTERPRETATION_PATTERNS.items():
+            match = pattern.search(discussion_text)
             if match:
                 interpretations[metric] = match.group(1)
         
         return interpretations
     
-    def process_pdf(self, pdf_path: str) -> Dict:
-        text = self.extract_pdf_text(pdf_path)
-        if not text:
-            return {"error": "Could not extract text from PDF"}
+    def process_pdf(self, pdf_source: PdfSource, stop_early: bool = True, ranges: Optional[ClinicalRanges] = None,
+                    progress: Optional[ProgressCallback] = None) -> Dict:
+        """Analyze a PDF given as a path, bytes, memoryview or binary file-like object.
+        
+        Runs extract_raw and then derive. Every derived stage uses one ranges snapshot (the current
+        one unless given), whose version is reported as 'range_version'. With `progress`, each stage's
+        partial results are passed to progress(event, data) as soon as they exist (see PROGRESS_EVENTS).
+        """
+        raw = self.extract_raw(pdf_source, stop_early, progress)
+        if 'error' in raw:
+            return raw
+        return self.derive(raw, ranges, progress)
+    
+    def extract_raw(self, pdf_source: PdfSource, stop_early: bool = True, progress: Optional[ProgressCallback] = None) -> Dict:
+        """The parts of a result read from the PDF itself (text_sha256, extracted_values, audiogram_data,
+        original_discussion), or {'error': ...}.
         
-        values = self.extract_all_values(text)
-        clinical_interpretations = {}
+        Nothing here depends on the reference ranges, so a stored raw extraction can be re-derived
+        under new ranges without reopening the PDF.
+        """
+        try:
+            pdf_source = load_pdf_source(pdf_source)
+        except Exception as e:
+            return {"error": "Could not extract text from PDF"}
         
-        for metric, value in values.items():
-            clinical_interpretations[metric] = self.calculate_clinical_interpretation(metric, value)
+        size = pdf_source_size(pdf_source)
+        if size is not None:
+            PDF_BYTES.observe(size)
         
-        audiogram_data = self.extract_audiogram_data(text, pdf_path)
-        audiogram_interpretations = {}
-        cognision_compatibility = {}
-        asymmetry_analysis = {}
+        pages = self.read_report_pages(pdf_source, stop_early)
+        text = "".join(page_text + "\n" for page_text in pages)
+        if not text.strip():
+            STAGE_ERRORS.inc(stage='no_text')
+            return {"error": "Could not extract text from PDF"}
+        if progress:
+            progress('pages_parsed', {'pages': len(pages)})
+        
+        with timed_stage('sections'):
+            sections = index_sections(text)
+            page_starts = []
+            offset = 0
+            for page_text in pages:
+                page_starts.append(offset)
+                offset += len(page_text) + 1
+        
+        with timed_stage('extract_values'):
+            values = self.extract_all_values(text)
+        
+        with timed_stage('audiogram'):
+            audiogram_pages = []
+            if sections.first(AUDIOGRAM_KEYWORDS) != -1:
+                audiogram_pages = sorted({bisect.bisect_right(page_starts, position) - 1
+                                          for keyword in AUDIOGRAM_KEYWORDS for position in sections[keyword]})
+            audiogram_data = self.extract_audiogram_data(text, pdf_source, audiogram_pages,
+                                                         search_from=len(pages) if stop_early else None,
+                                                         sections=sections)
+        
+        with timed_stage('original_discussion'):
+            original_discussion_text = discussion_section(text, sections)
         
-        if audiogram_data:
-            for ear in ['left_ear', 'right_ear']:
-                if ear in audiogram_data:
-                    audiogram_interpretations[ear] = {}
-                    for freq, htl in audiogram_data[ear].items():
-                        audiogram_interpretations[ear][freq] = self.interpret_hearing_loss(htl)
+        return {
+            'text_sha256': hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest(),
+            'extracted_values': values,
+            'audiogram_data': audiogram_data,
+            'original_discussion': original_discussion_text,
+        }
+    
+    def derive(self, raw: Dict, ranges: Optional[ClinicalRanges] = None, progress: Optional[ProgressCallback] = None) -> Dict:
+        """The full process_pdf result for a raw extraction, under `ranges` (the current snapshot unless given).
+        
+        Only interpretation and text generation run here; a raw extraction read back from JSON
+        (string frequency keys) is accepted as is.
+        """
+        ranges = ranges or self.ranges.current()
+        values = raw['extracted_values']
+        audiogram_data = {ear: {int(freq): htl for freq, htl in thresholds.items()}
+                          for ear, thresholds in raw['audiogram_data'].items()}
+        
+        with timed_stage('interpret'):
+            clinical_interpretations = {}
+            for metric, value in values.items():
+                clinical_interpretations[metric] = ranges.classify(metric, value)
+        if progress:
+            progress('metrics_found', {'extracted_values': values, 'clinical_interpretations': clinical_interpretations})
+        
+        with timed_stage('interpret_audiogram'):
+            audiogram_interpretations = {}
+            cognision_compatibility = {}
+            asymmetry_analysis = {}
             
-            cognision_compatibility = self.check_cognision_compatibility(audiogram_data)
-            asymmetry_analysis = self.analyze_audiogram_asymmetry(audiogram_data)
-        
-        generated_findings = self.generate_study_findings(values, clinical_interpretations, audiogram_data, cognision_compatibility, asymmetry_analysis)
-        generated_discussion = self.generate_study_discussion(values, clinical_interpretations, audiogram_data, asymmetry_analysis)
-        
-        original_discussion_text = ""
-        discussion_pattern = r'Study Discussion:?\s*(.*?)(?=Study Protocol|Test Name|Physician|$)'
-        discussion_match = re.search(discussion_pattern, text, re.DOTALL | re.IGNORECASE)
-        if discussion_match:
-            original_discussion_text = discussion_match.group(1).strip()
-        
-        original_interpretations = self.extract_discussion_interpretations(original_discussion_text)
+            if audiogram_data:
+                for ear in ['left_ear', 'right_ear']:
+                    if ear in audiogram_data:
+                        audiogram_interpretations[ear] = {}
+                        for freq, htl in audiogram_data[ear].items():
+                            audiogram_interpretations[ear][freq] = self.interpret_hearing_loss(htl, ranges)
+                
+                cognision_compatibility = self.check_cognision_compatibility(audiogram_data, ranges)
+                asymmetry_analysis = self.analyze_audiogram_asymmetry(audiogram_data, ranges)
+        if progress:
+            progress('audiogram_analyzed', {
+                'audiogram_data': audiogram_data,
+                'audiogram_interpretations': audiogram_interpretations,
+                'cognision_compatibility': cognision_compatibility,
+                'asymmetry_analysis': asymmetry_analysis,
+            })
+        
+        with timed_stage('findings'):
+            generated_findings = self.generate_study_findings(values, clinical_interpretations, audiogram_data, cognision_compatibility, asymmetry_analysis, ranges)
+        
+        with timed_stage('discussion'):
+            generated_discussion = self.generate_study_discussion(values, clinical_interpretations, audiogram_data, asymmetry_analysis, ranges)
+        
+        original_interpretations = self.extract_discussion_interpretations(raw['original_discussion'])
+        if progress:
+            progress('findings_generated', {
+                'generated_study_findings': generated_findings,
+                'generated_study_discussion': generated_discussion,
+                'original_interpretations': original_interpretations,
+            })
         
         return {
             'generated_study_findings': generated_findings,
@@ -518,4 +813,52 @@ class SimpleMedicalExtractor:
             'cognision_compatibility': cognision_compatibility,
             'asymmetry_analysis': asymmetry_analysis,
             'original_interpretations': original_interpretations,
-        }
\ No newline at end of file
+            'range_version': ranges.version,
+        }
+    
+    def process_many(self, pdf_sources: Union[Iterable[str], Mapping[str, PdfSource]], max_workers: Optional[int] = None) -> Dict:
+        """Process several PDFs on a bounded process pool, keyed by path (or by the keys of a {name: source} mapping)"""
+        if not isinstance(pdf_sources, Mapping):
+            pdf_sources = {pdf_path: pdf_path for pdf_path in pdf_sources}
+        if not pdf_sources:
+            return {}
+        
+        names = list(pdf_sources)
+        sources = [load_pdf_source(pdf_sources[name]) for name in names]
+        max_workers = min(max_workers or os.cpu_count() or 1, len(names))
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=POOL_CONTEXT, initializer=_init_worker) as pool:
+            results = pool.map(_process_pdf_worker, sources)
+            return dict(zip(names, results))
+    
+    def split_reports(self, pdf_source: PdfSource) -> List[ReportSegment]:
+        """The reports of a combined export (several visits in one PDF; see report_splitter), [] if it cannot be read"""
+        try:
+            pdf_source = load_pdf_source(pdf_source)
+            page_texts = list(self.iter_pdf_pages(pdf_source))
+            with timed_stage('split'):
+                doc = open_pdf(pdf_source)
+                try:
+                    segments = split_reports(doc, page_texts)
+                finally:
+                    with MUPDF_LOCK:
+                        doc.close()
+        except Exception as e:
+            return []
+        
+        duplicates = sum(1 for segment in segments if segment.duplicate_of is not None)
+        COMBINED_REPORTS.inc(len(segments) - duplicates, kind='unique')
+        COMBINED_REPORTS.inc(duplicates, kind='duplicate')
+        return segments
+    
+    def extract_reports(self, segments: Sequence[ReportSegment], max_workers: Optional[int] = None):
+        """Fill in `raw` for every unique segment that has none, on a bounded process pool when there are several"""
+        pending = [segment for segment in segments if segment.duplicate_of is None and segment.raw is None]
+        max_workers = min(max_workers or os.cpu_count() or 1, len(pending))
+        if max_workers <= 1:
+            for segment in pending:
+                segment.raw = self.extract_raw(segment.pdf_bytes)
+            return
+        
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=POOL_CONTEXT, initializer=_init_worker) as pool:
+            for segment, raw in zip(pending, pool.map(_extract_raw_worker, [segment.pdf_bytes for segment in pending])):
+                segment.raw = raw
@@ -0,0 +1,260 @@
+"""OCR fallback for pages without a text layer (scanned or faxed reports).
+
+Image-only pages are rendered with PyMuPDF in the calling process, then cleaned up with OpenCV
+(binarized, despeckled, deskewed, table rulings removed, cropped to the printed area) and read by the
+Tesseract CLI on a process pool. Text is cached by a hash of the page's content stream and
+images, so a report that is faxed again is not re-read.
+
+    TESSERACT_CMD   tesseract executable (default: 'tesseract' on PATH); OCR is off without it
+    OCR_WORKERS     OCR processes (default: CPU count; 0 runs OCR in the calling process)
+    OCR_LANGUAGE    Tesseract language (default: eng)
+    OCR_CACHE_DIR   optional on-disk page cache shared by all workers
+"""
+import hashlib
+import logging
+import math
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, Optional
+
+import fitz
+
+from instrumentation import OCR_PAGES, STAGE_ERRORS, record_stage
+from pdf_lock import MUPDF_LOCK, POOL_CONTEXT
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+OCR_COMMAND = os.environ.get('TESSERACT_CMD', 'tesseract')
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', -1))
+OCR_LANGUAGE = os.environ.get('OCR_LANGUAGE', 'eng')
+OCR_DPI = 300
+OCR_TIMEOUT = 120
+# Page layout mode 6: one uniform block of text, which keeps table rows on their own lines
+OCR_PAGE_SEGMENTATION = '6'
+
+# Skew outside this range (degrees) is treated as a misdetection rather than corrected
+MAX_DESKEW_DEGREES = 15.0
+MIN_DESKEW_DEGREES = 0.3
+CROP_MARGIN = 20
+
+
+def ocr_fingerprint(language: str = OCR_LANGUAGE, dpi: int = OCR_DPI) -> str:
+    """Hash of this module's source and settings, so text read by older preprocessing never matches"""
+    digest = hashlib.sha256()
+    digest.update(f'{language} {dpi} {OCR_PAGE_SEGMENTATION}'.encode())
+    with open(__file__, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def default_ocr_cache() -> ResultCache:
+    return ResultCache(
+        ocr_fingerprint(),
+        max_entries=int(os.environ.get('OCR_CACHE_SIZE', 1024)),
+        ttl_seconds=float(os.environ.get('OCR_CACHE_TTL', 30 * 86400)),
+        disk_dir=os.environ.get('OCR_CACHE_DIR') or None,
+        disk_max_entries=int(os.environ.get('OCR_CACHE_DISK_ENTRIES', 10000))
+    )
+
+
+def page_fingerprint(doc: fitz.Document, page: fitz.Page) -> str:
+    """SHA-256 of everything that determines how a page renders: geometry, content stream and images"""
+    digest = hashlib.sha256()
+    digest.update(f'{page.rotation} {tuple(page.rect)}'.encode())
+    digest.update(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(doc.xref_stream_raw(image[0]) or b'')
+    return digest.hexdigest()
+
+
+def render_page(page: fitz.Page, dpi: int = OCR_DPI) -> bytes:
+    """Grayscale PNG of a page at `dpi`"""
+    return page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes('png')
+
+
+def _despeckle(ink, dpi: int):
+    """Drop ink blobs smaller than a printed period (fax noise)"""
+    import cv2
+    import numpy as np
+
+    min_area = max(int((dpi / 100) ** 2), 1)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    keep = stats[:, cv2.CC_STAT_AREA] >= min_area
+    keep[0] = False  # background
+    return np.where(keep[labels], 255, 0).astype(np.uint8)
+
+
+def _skew_angle(ink, dpi: int) -> float:
+    """Median angle (degrees, image coordinates) of the text lines, from words smeared into line blobs"""
+    import cv2
+    import numpy as np
+
+    lines = cv2.dilate(ink, np.ones((1, max(dpi // 6, 1)), np.uint8))
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    angles = []
+    for contour in contours:
+        box = cv2.boxPoints(cv2.minAreaRect(contour))
+        edges = [box[(i + 1) % 4] - box[i] for i in range(2)]
+        dx, dy = max(edges, key=lambda edge: edge[0] ** 2 + edge[1] ** 2)
+        short = min(np.hypot(*edge) for edge in edges)
+        if np.hypot(dx, dy) < max(dpi, 5 * short):
+            continue  # not a line of text
+        angle = math.degrees(math.atan2(dy, dx))
+        angles.append((angle + 90) % 180 - 90)
+    return float(np.median(angles)) if angles else 0.0
+
+
+def preprocess(gray, dpi: int = OCR_DPI):
+    """Binarize, despeckle, deskew, drop table rulings and crop a grayscale page image; returns black text on white"""
+    import cv2
+    import numpy as np
+
+    # Otsu picks the ink threshold; ink becomes 255
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    ink = _despeckle(ink, dpi)
+
+    angle = _skew_angle(ink, dpi)
+    if MIN_DESKEW_DEGREES <= abs(angle) <= MAX_DESKEW_DEGREES:
+        height, width = ink.shape
+        rotation = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        ink = cv2.warpAffine(ink, rotation, (width, height), flags=cv2.INTER_NEAREST, borderValue=0)
+
+    # Table rulings are long runs of ink; Tesseract reads them as stray characters or merges rows
+    height, width = ink.shape
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, np.ones((1, max(width // 20, 1)), np.uint8))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, np.ones((max(height // 20, 1), 1), np.uint8))
+    ink = cv2.bitwise_and(ink, cv2.bitwise_not(cv2.bitwise_or(horizontal, vertical)))
+
+    points = cv2.findNonZero(ink)
+    if points is not None:
+        x, y, box_width, box_height = cv2.boundingRect(points)
+        ink = ink[max(y - CROP_MARGIN, 0):y + box_height + CROP_MARGIN, max(x - CROP_MARGIN, 0):x + box_width + CROP_MARGIN]
+    return cv2.bitwise_not(ink)
+
+
+def recognize(png: bytes, command: str = OCR_COMMAND, language: str = OCR_LANGUAGE, dpi: int = OCR_DPI) -> str:
+    """Text of a rendered page image; runs in an OCR pool process"""
+    import cv2
+    import numpy as np
+
+    gray = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_GRAYSCALE)
+    _, encoded = cv2.imencode('.png', preprocess(gray, dpi))
+    completed = subprocess.run(
+        [command, 'stdin', 'stdout', '-l', language, '--psm', OCR_PAGE_SEGMENTATION, '--dpi', str(dpi)],
+        input=encoded.tobytes(), capture_output=True, timeout=OCR_TIMEOUT, check=True
+    )
+    return completed.stdout.decode('utf-8', 'replace')
+
+
+class PageOcr:
+    """Reads image-only pages of an open document, in page order, through the cache and the OCR pool"""
+
+    def __init__(self, command: str = OCR_COMMAND, max_workers: int = OCR_WORKERS, cache: Optional[ResultCache] = None,
+                 language: str = OCR_LANGUAGE, dpi: int = OCR_DPI):
+        self.command = shutil.which(command)
+        self.max_workers = None if max_workers < 0 else max_workers
+        self.cache = cache if cache is not None else default_ocr_cache()
+        self.language = language
+        self.dpi = dpi
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.command is not None
+
+    @property
+    def window(self) -> int:
+        """Pages kept in flight ahead of the consumer: two per pool process"""
+        return 1 if self.max_workers == 0 else 2 * (self.max_workers or os.cpu_count() or 1)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=POOL_CONTEXT)
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        """Drop a broken pool (a worker died), so the next _executor() call starts a fresh one"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_to_pool(self, png: bytes) -> Future:
+        pool = self._executor()
+        try:
+            return pool.submit(recognize, png, self.command, self.language, self.dpi)
+        except BrokenProcessPool:
+            # A worker died on an earlier page (which reads as empty text); resubmit once to a fresh pool
+            self._discard(pool)
+            return self._executor().submit(recognize, png, self.command, self.language, self.dpi)
+
+    def _submit(self, doc: fitz.Document, page_number: int):
+        """(page number, cache key, text | Future | None); None means recognize it in-process when reached"""
+        with MUPDF_LOCK:
+            key = self.cache.key_from_digest(page_fingerprint(doc, doc[page_number]))
+        cached = self.cache.get(key)
+        if cached is not None:
+            OCR_PAGES.inc(source='cache')
+            return page_number, key, cached['text']
+        if self.max_workers == 0:
+            return page_number, key, None
+        with MUPDF_LOCK:
+            png = render_page(doc[page_number], self.dpi)
+        return page_number, key, self._submit_to_pool(png)
+
+    def page_texts(self, doc: fitz.Document, page_numbers: Iterable[int]) -> Iterator[str]:
+        """OCR text of each page, in order.
+
+        Up to two pages per pool process are in flight ahead of the consumer, so pages are read in
+        parallel while a consumer that stops early leaves little wasted work; the rest is cancelled.
+        """
+        queue = deque(page_numbers)
+        window = self.window
+        pending = deque()
+        seconds = 0.0
+        try:
+            while queue or pending:
+                start = time.perf_counter()
+                while queue and len(pending) < window:
+                    pending.append(self._submit(doc, queue.popleft()))
+                page_number, key, result = pending.popleft()
+                if isinstance(result, str):
+                    text = result
+                else:
+                    try:
+                        if isinstance(result, Future):
+                            text = result.result()
+                        else:
+                            with MUPDF_LOCK:
+                                png = render_page(doc[page_number], self.dpi)
+                            text = recognize(png, self.command, self.language, self.dpi)
+                    except Exception as e:
+                        # The page reads as blank; the rest of the report can still be analyzed
+                        logger.warning('OCR failed on page %d: %s', page_number + 1, e)
+                        STAGE_ERRORS.inc(stage='ocr')
+                        text = ''
+                    else:
+                        OCR_PAGES.inc(source='engine')
+                        self.cache.put(key, {'text': text})
+                seconds += time.perf_counter() - start
+                yield text
+        finally:
+            for _, _, result in pending:
+                if isinstance(result, Future):
+                    result.cancel()
+            record_stage('ocr', seconds)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATIENT_DB = 'patients.sqlite3'
+
+# (patient_id, visit_date, sha256, result) as accepted by PatientStore.add_visits
+Visit = Tuple[str, str, Optional[str], Dict]
+# (sha256, extraction_version, raw) as accepted by PatientStore.add_raw_extractions
+RawExtraction = Tuple[str, str, Dict]
+
+
+class PatientStore:
+    """SQLite store of process_pdf results per patient visit, indexed for longitudinal trend queries.
+
+    Each visit keeps the full result; every metric value is also stored as its own row in
+    metric_values, whose (patient_id, metric, visit_date) index covers trend queries. The raw
+    extraction of each report (SimpleMedicalExtractor.extract_raw) is kept by PDF hash, so stored
+    visits can be re-derived under new reference ranges without the PDFs (rederive).
+    """
+
+    def __init__(self, db_path: str = DEFAULT_PATIENT_DB):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS visits (
+                    id INTEGER PRIMARY KEY,
+                    patient_id TEXT NOT NULL,
+                    visit_date TEXT NOT NULL,
+                    sha256 TEXT NOT NULL DEFAULT '',
+                    stored_at REAL NOT NULL,
+                    extracted_values TEXT NOT NULL,
+                    clinical_interpretations TEXT NOT NULL,
+                    asymmetry_analysis TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    UNIQUE (patient_id, visit_date, sha256)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metric_values (
+                    visit_id INTEGER NOT NULL REFERENCES visits (id) ON DELETE CASCADE,
+                    patient_id TEXT NOT NULL,
+                    visit_date TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    value REAL,
+                    interpretation TEXT
+                )
+            ''')
+            # Covering index: a trend query never touches the table itself
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_metric_values_trend
+                ON metric_values (patient_id, metric, visit_date, value, interpretation)
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_metric_values_visit ON metric_values (visit_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_metric_values_metric_date ON metric_values (metric, visit_date)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_visits_patient_date ON visits (patient_id, visit_date)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_visits_sha256 ON visits (sha256)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS raw_extractions (
+                    sha256 TEXT PRIMARY KEY,
+                    extraction_version TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    raw TEXT NOT NULL
+                )
+            ''')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def add_visit(self, patient_id: str, visit_date: str, result: Dict, sha256: Optional[str] = None) -> int:
+        return self.add_visits([(patient_id, visit_date, sha256, result)])[0]
+
+    def add_visits(self, visits: Iterable[Visit]) -> List[int]:
+        """Store many visits in one transaction; re-storing the same report for a visit replaces it.
+
+        A report is identified by its PDF hash; when the same visit and hash occur more than once in
+        `visits`, the last one wins. Returns the visit IDs in input order.
+        """
+        visit_ids = []
+        metric_rows = {}
+        now = time.time()
+        with self._connect() as conn:
+            for patient_id, visit_date, sha256, result in visits:
+                values = result.get('extracted_values', {})
+                interpretations = result.get('clinical_interpretations', {})
+                conn.execute(
+                    '''
+                    INSERT INTO visits (patient_id, visit_date, sha256, stored_at, extracted_values,
+                                        clinical_interpretations, asymmetry_analysis, result)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (patient_id, visit_date, sha256) DO UPDATE SET
+                        stored_at = excluded.stored_at,
+                        extracted_values = excluded.extracted_values,
+                        clinical_interpretations = excluded.clinical_interpretations,
+                        asymmetry_analysis = excluded.asymmetry_analysis,
+                        result = excluded.result
+                    ''',
+                    (patient_id, visit_date, sha256 or '', now, json.dumps(values), json.dumps(interpretations),
+                     json.dumps(result.get('asymmetry_analysis', {})), json.dumps(result))
+                )
+                visit_id = conn.execute(
+                    'SELECT id FROM visits WHERE patient_id = ? AND visit_date = ? AND sha256 = ?',
+                    (patient_id, visit_date, sha256 or '')
+                ).fetchone()['id']
+                visit_ids.append(visit_id)
+                metric_rows[visit_id] = [
+                    (visit_id, patient_id, visit_date, metric, value, interpretations.get(metric))
+                    for metric, value in values.items()
+                ]
+
+            conn.executemany('DELETE FROM metric_values WHERE visit_id = ?', [(visit_id,) for visit_id in metric_rows])
+            conn.executemany(
+                'INSERT INTO metric_values (visit_id, patient_id, visit_date, metric, value, interpretation) VALUES (?, ?, ?, ?, ?, ?)',
+                [row for rows in metric_rows.values() for row in rows]
+            )
+        return visit_ids
+
+    def trend(self, patient_id: str, metric: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """One metric's values for a patient in visit-date order, optionally limited to [since, until]"""
+        query = 'SELECT visit_date, value, interpretation FROM metric_values WHERE patient_id = ? AND metric = ?'
+        params = [patient_id, metric]
+        if since:
+            query += ' AND visit_date >= ?'
+            params.append(since)
+        if until:
+            query += ' AND visit_date <= ?'
+            params.append(until)
+        query += ' ORDER BY visit_date'
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [{'visit_date': row['visit_date'], 'value': row['value'], 'interpretation': row['interpretation']}
+                for row in rows]
+
+    def visits(self, patient_id: str) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                '''
+                SELECT id, visit_date, sha256, stored_at, extracted_values, clinical_interpretations, asymmetry_analysis
+                FROM visits WHERE patient_id = ? ORDER BY visit_date, id
+                ''',
+                (patient_id,)
+            ).fetchall()
+        return [{
+            'visit_id': row['id'],
+            'visit_date': row['visit_date'],
+            'sha256': row['sha256'] or None,
+            'stored_at': row['stored_at'],
+            'extracted_values': json.loads(row['extracted_values']),
+            'clinical_interpretations': json.loads(row['clinical_interpretations']),
+            'asymmetry_analysis': json.loads(row['asymmetry_analysis']),
+        } for row in rows]
+
+    def add_raw_extractions(self, extractions: Iterable[RawExtraction]):
+        """Store raw extractions by PDF hash; storing one again replaces it"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                '''
+                INSERT INTO raw_extractions (sha256, extraction_version, stored_at, raw) VALUES (?, ?, ?, ?)
+                ON CONFLICT (sha256) DO UPDATE SET
+                    extraction_version = excluded.extraction_version,
+                    stored_at = excluded.stored_at,
+                    raw = excluded.raw
+                ''',
+                [(sha256, extraction_version, now, json.dumps(raw)) for sha256, extraction_version, raw in extractions]
+            )
+
+    def raw_extraction(self, sha256: str, extraction_version: Optional[str] = None) -> Optional[Dict]:
+        """The stored raw extraction of a PDF; None if there is none (or it was made by another extraction_version)"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT extraction_version, raw FROM raw_extractions WHERE sha256 = ?', (sha256,)).fetchone()
+        if row is None or (extraction_version is not None and row['extraction_version'] != extraction_version):
+            return None
+        return json.loads(row['raw'])
+
+    def rederive(self, derive: Callable[[Dict], Dict], patient_id: Optional[str] = None, chunk_size: int = 500,
+                 extraction_version: Optional[str] = None) -> Dict:
+        """Recompute every stored visit (or one patient's) from its raw extraction with derive(raw) -> result.
+
+        Visits are rewritten in chunks of `chunk_size`, each in its own transaction; a report shared by
+        several visits is derived once per chunk. Visits without a raw extraction are left as they are.
+        Returns counts of rederived visits, visits without a raw extraction, failures, and rederived
+        visits whose raw extraction was made by an extraction_version other than the given one.
+        """
+        stats = {'rederived': 0, 'without_raw': 0, 'failed': 0, 'other_extraction_version': 0}
+        patient_filter = ' AND v.patient_id = ?' if patient_id is not None else ''
+        patient_params = (patient_id,) if patient_id is not None else ()
+        with self._connect() as conn:
+            stats['without_raw'] = conn.execute(
+                'SELECT COUNT(*) FROM visits v LEFT JOIN raw_extractions r ON r.sha256 = v.sha256 '
+                f'WHERE r.sha256 IS NULL{patient_filter}',
+                patient_params
+            ).fetchone()[0]
+
+        last_id = 0
+        while True:
+            # Keyset pages, so no read cursor stays open across the writes
+            with self._connect() as conn:
+                rows = conn.execute(
+                    'SELECT v.id, v.patient_id, v.visit_date, v.sha256, r.extraction_version, r.raw '
+                    f'FROM visits v JOIN raw_extractions r ON r.sha256 = v.sha256 WHERE v.id > ?{patient_filter} '
+                    'ORDER BY v.id LIMIT ?',
+                    (last_id, *patient_params, chunk_size)
+                ).fetchall()
+            if not rows:
+                return stats
+            last_id = rows[-1]['id']
+
+            results = {}
+            visits = []
+            for row in rows:
+                sha256 = row['sha256']
+                if sha256 not in results:
+                    try:
+                        results[sha256] = derive(json.loads(row['raw']))
+                    except Exception as e:
+                        # Counted as failed; the visit keeps its previous result
+                        logger.warning('Could not re-derive report %s: %s', sha256, e)
+                        results[sha256] = None
+                if results[sha256] is None:
+                    stats['failed'] += 1
+                    continue
+                if extraction_version is not None and row['extraction_version'] != extraction_version:
+                    stats['other_extraction_version'] += 1
+                visits.append((row['patient_id'], row['visit_date'], sha256, results[sha256]))
+            self.add_visits(visits)
+            stats['rederived'] += len(visits)
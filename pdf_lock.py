@@ -0,0 +1,33 @@
+"""The lock every PyMuPDF call in this package holds.
+
+MuPDF keeps process-wide state (allocator, resource store, error stack) that PyMuPDF does not guard,
+so two threads must not be inside fitz at the same time, even on different documents. Each call
+still opens its own document, and documents are never handed to another thread; the lock only
+serializes the fitz calls themselves, and text processing between them runs concurrently.
+
+This serialization is deliberate, and it has a cost. Per-thread document handles would not lift it,
+since the unguarded state belongs to the process rather than to a document. Fitz calls are most of
+process_pdf, so the threads of one gthread worker gain nothing on parsing: they overlap uploads,
+responses, cache and store work, and the Python between fitz calls, but parse one PDF at a time.
+Parallel parsing comes from process pools (batch, PDF_WORKERS, OCR_WORKERS) and gunicorn workers.
+
+Process pools are created with POOL_CONTEXT, which starts their workers from a forkserver instead of
+forking the calling process. That process is usually threaded (gthread workers, the job queue), and
+a fork copies every lock another thread holds at that moment (logging, SQLite, the stores), not
+just this one.
+"""
+import multiprocessing
+import os
+import threading
+
+MUPDF_LOCK = threading.RLock()
+
+# The forkserver is a fresh single-threaded interpreter; preloading the extractor there means pool
+# workers fork from it already imported (PyMuPDF, compiled patterns) instead of importing it each
+POOL_CONTEXT = multiprocessing.get_context('forkserver')
+POOL_CONTEXT.set_forkserver_preload(['medical_extractor'])
+
+# Forks of this process remain: gunicorn forking workers from the preloaded master, or code using
+# the default start method. One forked while another thread is inside fitz would inherit the lock
+# held forever, so forks wait for the current fitz call instead.
+os.register_at_fork(before=MUPDF_LOCK.acquire, after_in_parent=MUPDF_LOCK.release, after_in_child=MUPDF_LOCK.release)
@@ -0,0 +1,83 @@
+"""Sampling profiler for a live server process, off unless PROFILER_TOKEN is set.
+
+profile() snapshots the stack of every other thread in the process with sys._current_frames() at a
+fixed interval and counts identical stacks. Nothing is installed in the threads being sampled, so
+they run at full speed; the cost is one stack walk per thread per sample in the profiling thread.
+Output is the collapsed-stack format read by flamegraph.pl, speedscope and inferno: one
+"thread;file:function;...;file:function count" line per distinct stack, root first.
+
+Only the calling process is sampled: with several gunicorn workers each request profiles whichever
+worker serves it, and batch/OCR pool processes are not included.
+"""
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+PROFILE_MAX_SECONDS = 60.0
+PROFILE_DEFAULT_INTERVAL = 0.01
+PROFILE_MIN_INTERVAL = 0.001
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profile of this process is still running"""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+def _stack(frame) -> Tuple[str, ...]:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def sample_stacks(seconds: float, interval: float = PROFILE_DEFAULT_INTERVAL) -> Tuple[Counter, int]:
+    """Count (thread name, stack) pairs over `seconds`; returns the counts and the number of samples taken"""
+    own = threading.get_ident()
+    counts = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                counts[(names.get(ident, f'thread-{ident}'),) + _stack(frame)] += 1
+        samples += 1
+        time.sleep(interval)
+    return counts, samples
+
+
+def collapsed(counts: Dict[Tuple[str, ...], int]) -> str:
+    """Collapsed-stack text, heaviest stacks first"""
+    return ''.join(f'{";".join(stack)} {count}\n' for stack, count in counts.most_common())
+
+
+def profile(seconds: float, interval: float = PROFILE_DEFAULT_INTERVAL) -> Tuple[str, int]:
+    """Collapsed stacks of this process over `seconds` (capped at PROFILE_MAX_SECONDS) and the sample count.
+    The interval is kept between PROFILE_MIN_INTERVAL and `seconds`.
+
+    Raises ValueError for a non-finite `seconds` or `interval`, and ProfilerBusy rather than letting
+    profiles overlap (each would show the other's sampler).
+    """
+    if not (math.isfinite(seconds) and math.isfinite(interval)):
+        raise ValueError('seconds and interval must be finite')
+    seconds = min(max(seconds, 0.0), PROFILE_MAX_SECONDS)
+    interval = max(min(interval, seconds), PROFILE_MIN_INTERVAL)
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy('A profile is already running')
+    try:
+        counts, samples = sample_stacks(seconds, interval)
+    finally:
+        _profile_lock.release()
+    return collapsed(counts), samples
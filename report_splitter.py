@@ -0,0 +1,182 @@
+"""Splitting combined chart exports (several COGNISION visits concatenated into one PDF) into reports.
+
+A page whose first HEADER_LINES non-blank lines include a report title (REPORT_HEADER_PATTERN)
+starts a new report, unless whatever its header names of the patient ID and test date matches the
+report in progress: a running header repeated on every page names both, while a continuation page's
+title often names one or neither. Pages before the first title belong to the first report. Each
+report's pages are copied into a PDF of their own with insert_pdf, which copies the page objects
+without re-rendering anything, so every visit goes through the unchanged single-report pipeline.
+
+Pages are compared by page_fingerprint (content stream, images and geometry). A page identical to
+an earlier page of the same report is dropped, and a report whose remaining pages are identical to
+an earlier report's is not processed again but marked as its duplicate.
+
+    REPORT_HEADER_PATTERN   case-insensitive regex for a report's title line (default: COGNISION ... Report)
+"""
+import hashlib
+import os
+import re
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import fitz
+
+from ocr import page_fingerprint
+from pdf_lock import MUPDF_LOCK
+
+REPORT_HEADER_PATTERN = re.compile(os.environ.get('REPORT_HEADER_PATTERN', r'^\s*COGNISION\b.*\bReport\b'), re.IGNORECASE)
+# How far down a page its header may reach, in non-blank lines
+HEADER_LINES = 8
+
+PATIENT_ID_PATTERN = re.compile(r'Patient\s+ID\s*[:#]?\s*([\w-]+)', re.IGNORECASE)
+TEST_DATE_PATTERN = re.compile(r'(?:Test|Visit|Study)\s+Date\s*:?\s*(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}/\d{2,4})', re.IGNORECASE)
+TEST_DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y')
+
+
+def header_lines(page_text: str) -> List[str]:
+    lines = []
+    for line in page_text.splitlines():
+        if line.strip():
+            lines.append(line)
+            if len(lines) == HEADER_LINES:
+                break
+    return lines
+
+
+def parse_test_date(value: str) -> Optional[str]:
+    """ISO date of a header's test date, None if it is not a valid date"""
+    for date_format in TEST_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def header_identity(lines: Sequence[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(patient ID, ISO test date) named in a page header; either is None when absent"""
+    text = '\n'.join(lines)
+    patient = PATIENT_ID_PATTERN.search(text)
+    test_date = TEST_DATE_PATTERN.search(text)
+    return (patient.group(1) if patient else None,
+            parse_test_date(test_date.group(1)) if test_date else None)
+
+
+def continues_report(identity: Tuple[Optional[str], Optional[str]],
+                     current: Tuple[Optional[str], Optional[str]]) -> bool:
+    """Whether a title page naming `identity` continues the report named `current`: every part it names matches"""
+    return all(part is None or part == current_part for part, current_part in zip(identity, current))
+
+
+def report_starts(page_texts: Sequence[str]) -> List[Tuple[int, Optional[str], Optional[str]]]:
+    """(first page, patient ID, test date) of each report, in page order"""
+    starts = []
+    for number, page_text in enumerate(page_texts):
+        lines = header_lines(page_text)
+        if not any(REPORT_HEADER_PATTERN.search(line) for line in lines):
+            continue
+        identity = header_identity(lines)
+        if starts and continues_report(identity, starts[-1][1:]):
+            continue  # running header of the report in progress, or a title naming less of it
+        starts.append((number,) + identity)
+    if not starts:
+        return [(0, None, None)]
+    if starts[0][0] != 0:
+        # Pages before the first title (a cover sheet) belong to the first report
+        starts[0] = (0,) + starts[0][1:]
+    return starts
+
+
+def _page_runs(pages: Sequence[int]) -> List[Tuple[int, int]]:
+    """Consecutive page numbers as (first, last) runs"""
+    runs = []
+    for number in pages:
+        if runs and runs[-1][1] == number - 1:
+            runs[-1] = (runs[-1][0], number)
+        else:
+            runs.append((number, number))
+    return runs
+
+
+def copy_pages(doc: fitz.Document, pages: Sequence[int]) -> bytes:
+    """A new PDF holding `pages` of `doc`, in order; page objects are copied, not re-rendered"""
+    # MuPDF writes a file itself, while tobytes() passes every chunk through a Python stream (~6x slower)
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+        with MUPDF_LOCK:
+            report = fitz.open()
+            try:
+                for first, last in _page_runs(pages):
+                    report.insert_pdf(doc, from_page=first, to_page=last)
+                report.save(f.name)
+            finally:
+                report.close()
+        # MuPDF replaces the file rather than writing through this handle
+        with open(f.name, 'rb') as saved:
+            return saved.read()
+
+
+class ReportSegment:
+    """One report of a combined export. Page numbers are 0-based positions in the export;
+    `pdf_bytes` holds the report's own PDF and `raw` its extraction, once made (neither is set for duplicates)"""
+    __slots__ = ('index', 'pages', 'skipped_pages', 'patient_id', 'test_date', 'sha256', 'duplicate_of', 'pdf_bytes', 'raw')
+
+    def __init__(self, index: int, pages: List[int], skipped_pages: List[int], patient_id: Optional[str],
+                 test_date: Optional[str], sha256: str, duplicate_of: Optional[int] = None):
+        self.index = index
+        self.pages = pages
+        self.skipped_pages = skipped_pages
+        self.patient_id = patient_id
+        self.test_date = test_date
+        self.sha256 = sha256
+        self.duplicate_of = duplicate_of
+        self.pdf_bytes = None
+        self.raw = None
+
+    def to_dict(self) -> Dict:
+        """Where the report sits in the export, with 1-based page numbers"""
+        return {
+            'report': self.index + 1,
+            'first_page': self.pages[0] + 1,
+            'last_page': max(self.pages + self.skipped_pages) + 1,
+            'page_count': len(self.pages),
+            'duplicate_pages': [number + 1 for number in self.skipped_pages],
+            'patient_id': self.patient_id,
+            'test_date': self.test_date,
+            'duplicate_of': None if self.duplicate_of is None else self.duplicate_of + 1,
+        }
+
+
+def split_reports(doc: fitz.Document, page_texts: Sequence[str]) -> List[ReportSegment]:
+    """The reports of an open export, given the text of each of its pages.
+
+    Unique reports get their own PDF in `pdf_bytes`; a report identical to an earlier one gets its
+    index in `duplicate_of` instead.
+    """
+    with MUPDF_LOCK:
+        fingerprints = [page_fingerprint(doc, doc[number]) for number in range(doc.page_count)]
+    starts = report_starts(page_texts[:len(fingerprints)])
+
+    segments = []
+    first_with_sha = {}
+    for index, (first, patient_id, test_date) in enumerate(starts):
+        end = starts[index + 1][0] if index + 1 < len(starts) else len(fingerprints)
+        pages = []
+        skipped_pages = []
+        seen = set()
+        digest = hashlib.sha256()
+        for number in range(first, end):
+            if fingerprints[number] in seen:
+                skipped_pages.append(number)
+                continue
+            seen.add(fingerprints[number])
+            pages.append(number)
+            digest.update(bytes.fromhex(fingerprints[number]))
+
+        sha256 = digest.hexdigest()
+        segment = ReportSegment(index, pages, skipped_pages, patient_id, test_date, sha256, first_with_sha.get(sha256))
+        if segment.duplicate_of is None:
+            first_with_sha[sha256] = index
+            segment.pdf_bytes = copy_pages(doc, pages)
+        segments.append(segment)
+    return segments
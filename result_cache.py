@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Least often the disk tier is swept for expired and surplus files, in seconds (per process)
+DISK_SWEEP_INTERVAL = 60.0
+
+
+def version_fingerprint(extractor) -> str:
+    """Hash of the extractor's source and settings, so results from older code never match.
+
+    Reference ranges are hot-reloadable, so their version is part of each key instead (see key()).
+    """
+    import audiogram_extractor
+    import clinical_ranges
+    import medical_extractor
+    import ocr
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(extractor.audiogram_frequencies).encode())
+    for module in (medical_extractor, audiogram_extractor, clinical_ranges, ocr):
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class ResultCache:
+    """Two-tier (in-memory LRU + optional shared on-disk) cache of process_pdf results.
+
+    Keys carry the code fingerprint and range version, so entries written under older ones are never
+    read again; writes therefore sweep the disk tier now and then, deleting expired files and then
+    the oldest ones beyond `disk_max_entries`.
+    """
+
+    def __init__(self, fingerprint: str, max_entries: int = 128, ttl_seconds: float = 3600, disk_dir: Optional[str] = None,
+                 disk_max_entries: int = 10000):
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = 0.0
+        self._stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_evictions': 0}
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key(self, pdf_bytes: bytes, range_version: str = '') -> str:
+        return self.key_from_digest(hashlib.sha256(pdf_bytes).hexdigest(), range_version)
+
+    def key_from_digest(self, sha256: str, range_version: str = '') -> str:
+        """Key for an upload whose SHA-256 hex digest is already known (e.g. hashed while streaming)"""
+        return f'{sha256}-{self.fingerprint}-{range_version}'
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    self._stats['memory_hits'] += 1
+                    return result
+                del self._entries[key]
+
+        result = self._disk_get(key, now)
+        with self._lock:
+            if result is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['disk_hits'] += 1
+            self._memory_put(key, result, now)
+        return result
+
+    def put(self, key: str, result: Dict):
+        now = time.time()
+        with self._lock:
+            self._memory_put(key, result, now)
+        self._disk_put(key, result)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        stats['ttl_seconds'] = self.ttl_seconds
+        stats['disk_tier'] = bool(self.disk_dir)
+        stats['disk_max_entries'] = self.disk_max_entries
+        stats['fingerprint'] = self.fingerprint
+        return stats
+
+    def _memory_put(self, key: str, result: Dict, now: float):
+        self._entries[key] = (now, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f'{key}.json')
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict]:
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl_seconds:
+                os.unlink(path)
+                return None
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key: str, result: Dict):
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so other workers never read a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(result, f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError):
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
+        self._maybe_sweep()
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + DISK_SWEEP_INTERVAL
+            self.sweep_disk(now)
+        finally:
+            self._sweep_lock.release()
+
+    def sweep_disk(self, now: Optional[float] = None) -> int:
+        """Delete expired disk entries (and leftover temp files), then the oldest beyond disk_max_entries; returns the count removed"""
+        if not self.disk_dir:
+            return 0
+        now = now if now is not None else time.time()
+
+        entries = []
+        expired = []
+        for shard in os.scandir(self.disk_dir):
+            if not shard.is_dir():
+                continue
+            try:
+                files = list(os.scandir(shard.path))
+            except OSError:
+                continue
+            for entry in files:
+                try:
+                    modified = entry.stat().st_mtime
+                except OSError:
+                    continue
+                # A temp file this old belongs to a writer that died before renaming it
+                if now - modified > self.ttl_seconds or (entry.name.endswith('.tmp') and now - modified > DISK_SWEEP_INTERVAL):
+                    expired.append(entry.path)
+                elif entry.name.endswith('.json'):
+                    entries.append((modified, entry.path))
+
+        surplus = len(entries) - self.disk_max_entries
+        if surplus > 0:
+            entries.sort()
+            expired += [path for _, path in entries[:surplus]]
+
+        removed = 0
+        for path in expired:
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError:
+                pass  # already removed by another worker
+        with self._lock:
+            self._stats['disk_evictions'] += removed
+        return removed
@@ -0,0 +1,406 @@
+"""Compact typed results and their binary wire format.
+
+process_pdf returns nested dicts keyed by metric name and frequency. AnalysisResult holds the same
+result over fixed indexes instead: one slot per RESULT_METRICS entry (the clinical_ranges metrics)
+and per RESULT_FREQUENCIES entry (the audiogram frequencies), with the small label vocabularies
+stored as one-byte codes. encode_result/decode_result pack it with struct, little-endian:
+
+    header      '<4sBB'  magic b'CGNR', FORMAT_VERSION, section flags (FLAG_*)
+    error       str                                  (FLAG_ERROR: nothing else follows)
+    metrics     '<12d12BH'  values (NaN = not extracted), interpretation codes, original-text mask
+                str per metric set in the mask       (the report's own interpretation)
+    left ear    '<6h6B'  thresholds (MISSING_HTL = none), hearing-loss codes   (FLAG_LEFT_EAR)
+    right ear   '<6h6B'                                                          (FLAG_RIGHT_EAR)
+    compat.     '<BH'    compatible bits, issue count, then the issues as str   (FLAG_COMPATIBILITY)
+    asymmetry   '<6BhBBH' classification codes (0 = not compared), max asymmetry, concerning-frequency
+                mask, overall flag code (0 = none), flag count, then the flags as str (FLAG_ASYMMETRY)
+                str clinical significance when the overall flag is set
+    text        str findings, str discussion, str range version
+
+where str is a '<I' byte length followed by UTF-8. A batch is '<4sBI' (magic b'CGNB', FORMAT_VERSION,
+count) followed by count × (str name, '<I' record length, record). A code of 0 always means absent;
+other codes index the label tuples below, from 1.
+"""
+import math
+import struct
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from clinical_ranges import CRITICAL_LABEL
+from medical_extractor import METRIC_SPECS
+
+RESULT_MEDIA_TYPE = 'application/x-analysis-result'
+BATCH_MEDIA_TYPE = 'application/x-analysis-results'
+FORMAT_VERSION = 1
+
+RESULT_METRICS = tuple(spec.metric for spec in METRIC_SPECS)
+RESULT_FREQUENCIES = (250, 500, 1000, 2000, 4000, 8000)
+EARS = ('left_ear', 'right_ear')
+MISSING_HTL = -32768
+
+INTERPRETATION_LABELS = ('Normal', 'Borderline', 'High Risk', CRITICAL_LABEL, 'Unknown')
+SEVERITY_LABELS = ('Normal', 'Mild', 'Moderate', 'Moderate to Severe')
+ASYMMETRY_FLAGS = ('NORMAL_ASYMMETRY', 'MILD_ASYMMETRY', 'MODERATE_ASYMMETRY', 'SEVERE_ASYMMETRY')
+
+FLAG_ERROR = 1
+FLAG_LEFT_EAR = 2
+FLAG_RIGHT_EAR = 4
+FLAG_COMPATIBILITY = 8
+FLAG_ASYMMETRY = 16
+
+_RESULT_MAGIC = b'CGNR'
+_BATCH_MAGIC = b'CGNB'
+_HEADER = struct.Struct('<4sBB')
+_BATCH_HEADER = struct.Struct('<4sBI')
+_METRICS = struct.Struct(f'<{len(RESULT_METRICS)}d{len(RESULT_METRICS)}BH')
+_EAR = struct.Struct(f'<{len(RESULT_FREQUENCIES)}h{len(RESULT_FREQUENCIES)}B')
+_COMPATIBILITY = struct.Struct('<BH')
+_ASYMMETRY = struct.Struct(f'<{len(RESULT_FREQUENCIES)}BhBBH')
+_LENGTH = struct.Struct('<I')
+
+_METRIC_INDEX = {metric: i for i, metric in enumerate(RESULT_METRICS)}
+_FREQUENCY_INDEX = {frequency: i for i, frequency in enumerate(RESULT_FREQUENCIES)}
+_INTERPRETATION_CODES = {label: i + 1 for i, label in enumerate(INTERPRETATION_LABELS)}
+_SEVERITY_CODES = {label: i + 1 for i, label in enumerate(SEVERITY_LABELS)}
+_ASYMMETRY_FLAG_CODES = {flag: i + 1 for i, flag in enumerate(ASYMMETRY_FLAGS)}
+
+
+def _code(codes: Dict[str, int], label: str, field: str) -> int:
+    try:
+        return codes[label]
+    except KeyError:
+        raise ValueError(f'{field}: no code for {label!r}')
+
+
+def _frequency_slot(frequency) -> int:
+    """Index of a frequency key; keys are ints, or strings after a JSON round trip"""
+    try:
+        return _FREQUENCY_INDEX[int(frequency)]
+    except (KeyError, ValueError):
+        raise ValueError(f'{frequency!r} is not one of {RESULT_FREQUENCIES}')
+
+
+class AnalysisResult:
+    """One process_pdf result over fixed metric and frequency indexes; to_dict() gives the dict back"""
+    __slots__ = ('values', 'interpretations', 'original_interpretations', 'thresholds', 'hearing_loss',
+                 'compatibility', 'issues', 'asymmetry', 'max_asymmetry', 'concerning', 'overall_flag',
+                 'asymmetry_flags', 'clinical_significance', 'findings', 'discussion', 'range_version')
+
+    def __init__(self, values: array, interpretations: bytes, original_interpretations: Tuple[Optional[str], ...],
+                 thresholds: Tuple[Optional[array], Optional[array]], hearing_loss: Tuple[Optional[bytes], Optional[bytes]],
+                 compatibility: Optional[int], issues: Tuple[str, ...], asymmetry: Optional[bytes], max_asymmetry: int,
+                 concerning: int, overall_flag: int, asymmetry_flags: Tuple[str, ...], clinical_significance: Optional[str],
+                 findings: str, discussion: str, range_version: str):
+        self.values = values                                        # array('d') per metric, NaN if absent
+        self.interpretations = interpretations                      # INTERPRETATION_LABELS code per metric
+        self.original_interpretations = original_interpretations    # report text per metric, or None
+        self.thresholds = thresholds                                # per ear: array('h') per frequency, or None
+        self.hearing_loss = hearing_loss                            # per ear: SEVERITY_LABELS code per frequency
+        self.compatibility = compatibility                          # bits 1/2/4: overall/left/right; None if not checked
+        self.issues = issues
+        self.asymmetry = asymmetry                                  # SEVERITY_LABELS code per frequency; None if not run
+        self.max_asymmetry = max_asymmetry
+        self.concerning = concerning                                # bit i set: RESULT_FREQUENCIES[i] is concerning
+        self.overall_flag = overall_flag                            # ASYMMETRY_FLAGS code
+        self.asymmetry_flags = asymmetry_flags
+        self.clinical_significance = clinical_significance
+        self.findings = findings
+        self.discussion = discussion
+        self.range_version = range_version
+
+    @classmethod
+    def from_dict(cls, result: Dict) -> 'AnalysisResult':
+        """Compact form of a successful process_pdf result; raises ValueError for anything it cannot hold"""
+        values = array('d', [math.nan] * len(RESULT_METRICS))
+        interpretations = bytearray(len(RESULT_METRICS))
+        original = [None] * len(RESULT_METRICS)
+        try:
+            for metric, value in result['extracted_values'].items():
+                values[_METRIC_INDEX[metric]] = value
+            for metric, label in result['clinical_interpretations'].items():
+                interpretations[_METRIC_INDEX[metric]] = _code(_INTERPRETATION_CODES, label, metric)
+            for metric, text in result['original_interpretations'].items():
+                original[_METRIC_INDEX[metric]] = text
+        except KeyError as e:
+            raise ValueError(f'Not a representable result: {e!r}')
+
+        thresholds = []
+        hearing_loss = []
+        for ear in EARS:
+            if ear not in result['audiogram_data']:
+                thresholds.append(None)
+                hearing_loss.append(None)
+                continue
+            htl = array('h', [MISSING_HTL] * len(RESULT_FREQUENCIES))
+            for frequency, db in result['audiogram_data'][ear].items():
+                htl[_frequency_slot(frequency)] = db
+            codes = bytearray(len(RESULT_FREQUENCIES))
+            for frequency, label in result['audiogram_interpretations'].get(ear, {}).items():
+                codes[_frequency_slot(frequency)] = _code(_SEVERITY_CODES, label, ear)
+            thresholds.append(htl)
+            hearing_loss.append(bytes(codes))
+
+        compatibility = None
+        issues = ()
+        checked = result['cognision_compatibility']
+        if checked:
+            compatibility = checked['compatible'] | checked['left_ear_compatible'] << 1 | checked['right_ear_compatible'] << 2
+            issues = tuple(checked['issues'])
+
+        asymmetry = None
+        max_asymmetry = concerning = overall_flag = 0
+        asymmetry_flags = ()
+        clinical_significance = None
+        analysis = result['asymmetry_analysis']
+        if analysis:
+            codes = bytearray(len(RESULT_FREQUENCIES))
+            for frequency, entry in analysis['asymmetries'].items():
+                codes[_frequency_slot(frequency)] = _code(_SEVERITY_CODES, entry['asymmetry_classification'], 'asymmetry')
+            asymmetry = bytes(codes)
+            max_asymmetry = analysis['max_asymmetry']
+            for frequency in analysis['concerning_frequencies']:
+                concerning |= 1 << _frequency_slot(frequency)
+            asymmetry_flags = tuple(analysis['flags'])
+            if 'overall_flag' in analysis:
+                overall_flag = _code(_ASYMMETRY_FLAG_CODES, analysis['overall_flag'], 'overall_flag')
+                clinical_significance = analysis['clinical_significance']
+
+        return cls(values, bytes(interpretations), tuple(original), tuple(thresholds), tuple(hearing_loss), compatibility,
+                   issues, asymmetry, max_asymmetry, concerning, overall_flag, asymmetry_flags, clinical_significance,
+                   result['generated_study_findings'], result['generated_study_discussion'], result['range_version'])
+
+    def to_dict(self) -> Dict:
+        """The process_pdf result this was built from (frequency keys as ints)"""
+        values = {}
+        interpretations = {}
+        original = {}
+        for i, metric in enumerate(RESULT_METRICS):
+            if not math.isnan(self.values[i]):
+                values[metric] = self.values[i]
+            if self.interpretations[i]:
+                interpretations[metric] = INTERPRETATION_LABELS[self.interpretations[i] - 1]
+            if self.original_interpretations[i] is not None:
+                original[metric] = self.original_interpretations[i]
+
+        audiogram = {}
+        audiogram_interpretations = {}
+        for ear, htl, codes in zip(EARS, self.thresholds, self.hearing_loss):
+            if htl is None:
+                continue
+            audiogram[ear] = {frequency: db for frequency, db in zip(RESULT_FREQUENCIES, htl) if db != MISSING_HTL}
+            audiogram_interpretations[ear] = {frequency: SEVERITY_LABELS[code - 1]
+                                              for frequency, code in zip(RESULT_FREQUENCIES, codes) if code}
+
+        compatibility = {}
+        if self.compatibility is not None:
+            compatibility = {
+                'compatible': bool(self.compatibility & 1),
+                'left_ear_compatible': bool(self.compatibility & 2),
+                'right_ear_compatible': bool(self.compatibility & 4),
+                'issues': list(self.issues)
+            }
+
+        asymmetry = {}
+        if self.asymmetry is not None:
+            left, right = (audiogram.get(ear, {}) for ear in EARS)
+            asymmetry = {
+                'asymmetries': {
+                    frequency: {
+                        'left_ear_htl': left[frequency],
+                        'right_ear_htl': right[frequency],
+                        'asymmetry_db': abs(left[frequency] - right[frequency]),
+                        'asymmetry_classification': SEVERITY_LABELS[code - 1],
+                        'worse_ear': 'left' if left[frequency] > right[frequency] else 'right'
+                    }
+                    for frequency, code in zip(RESULT_FREQUENCIES, self.asymmetry) if code
+                },
+                'flags': list(self.asymmetry_flags),
+                'max_asymmetry': self.max_asymmetry,
+                'concerning_frequencies': [frequency for i, frequency in enumerate(RESULT_FREQUENCIES) if self.concerning >> i & 1]
+            }
+            if self.overall_flag:
+                asymmetry['overall_flag'] = ASYMMETRY_FLAGS[self.overall_flag - 1]
+                asymmetry['clinical_significance'] = self.clinical_significance
+
+        return {
+            'generated_study_findings': self.findings,
+            'generated_study_discussion': self.discussion,
+            'extracted_values': values,
+            'clinical_interpretations': interpretations,
+            'audiogram_data': audiogram,
+            'audiogram_interpretations': audiogram_interpretations,
+            'cognision_compatibility': compatibility,
+            'asymmetry_analysis': asymmetry,
+            'original_interpretations': original,
+            'range_version': self.range_version,
+        }
+
+
+def _pack_str(parts: List[bytes], text: str):
+    data = text.encode('utf-8')
+    parts.append(_LENGTH.pack(len(data)))
+    parts.append(data)
+
+
+class _Reader:
+    __slots__ = ('data', 'offset')
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.offset = offset
+
+    def unpack(self, layout: struct.Struct) -> tuple:
+        fields = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return fields
+
+    def read_bytes(self, size: int) -> bytes:
+        end = self.offset + size
+        if end > len(self.data):
+            raise ValueError('Truncated result')
+        chunk = bytes(self.data[self.offset:end])
+        self.offset = end
+        return chunk
+
+    def read_str(self) -> str:
+        size, = _LENGTH.unpack_from(self.data, self.offset)
+        start = self.offset + _LENGTH.size
+        end = start + size
+        if end > len(self.data):
+            raise ValueError('Truncated result')
+        self.offset = end
+        return str(self.data[start:end], 'utf-8')
+
+
+def encode_result(result: Dict) -> bytes:
+    """Binary record of a process_pdf result (a successful one or {'error': ...}) or an AnalysisResult"""
+    parts = []
+    if not isinstance(result, AnalysisResult) and 'error' in result:
+        parts.append(_HEADER.pack(_RESULT_MAGIC, FORMAT_VERSION, FLAG_ERROR))
+        _pack_str(parts, result['error'])
+        return b''.join(parts)
+
+    compact = result if isinstance(result, AnalysisResult) else AnalysisResult.from_dict(result)
+    flags = ((FLAG_LEFT_EAR if compact.thresholds[0] is not None else 0)
+             | (FLAG_RIGHT_EAR if compact.thresholds[1] is not None else 0)
+             | (FLAG_COMPATIBILITY if compact.compatibility is not None else 0)
+             | (FLAG_ASYMMETRY if compact.asymmetry is not None else 0))
+    parts.append(_HEADER.pack(_RESULT_MAGIC, FORMAT_VERSION, flags))
+
+    original_mask = 0
+    for i, text in enumerate(compact.original_interpretations):
+        if text is not None:
+            original_mask |= 1 << i
+    parts.append(_METRICS.pack(*compact.values, *compact.interpretations, original_mask))
+    for text in compact.original_interpretations:
+        if text is not None:
+            _pack_str(parts, text)
+
+    for htl, codes in zip(compact.thresholds, compact.hearing_loss):
+        if htl is not None:
+            parts.append(_EAR.pack(*htl, *codes))
+
+    if compact.compatibility is not None:
+        parts.append(_COMPATIBILITY.pack(compact.compatibility, len(compact.issues)))
+        for issue in compact.issues:
+            _pack_str(parts, issue)
+
+    if compact.asymmetry is not None:
+        parts.append(_ASYMMETRY.pack(*compact.asymmetry, compact.max_asymmetry, compact.concerning,
+                                     compact.overall_flag, len(compact.asymmetry_flags)))
+        for flag in compact.asymmetry_flags:
+            _pack_str(parts, flag)
+        if compact.overall_flag:
+            _pack_str(parts, compact.clinical_significance)
+
+    _pack_str(parts, compact.findings)
+    _pack_str(parts, compact.discussion)
+    _pack_str(parts, compact.range_version)
+    return b''.join(parts)
+
+
+def _read_result(reader: _Reader):
+    magic, version, flags = reader.unpack(_HEADER)
+    if magic != _RESULT_MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f'Not a version {FORMAT_VERSION} result record')
+    if flags & FLAG_ERROR:
+        return {'error': reader.read_str()}
+
+    fields = reader.unpack(_METRICS)
+    count = len(RESULT_METRICS)
+    values = array('d', fields[:count])
+    interpretations = bytes(fields[count:2 * count])
+    original_mask = fields[-1]
+    original = tuple(reader.read_str() if original_mask >> i & 1 else None for i in range(count))
+
+    thresholds = []
+    hearing_loss = []
+    for flag in (FLAG_LEFT_EAR, FLAG_RIGHT_EAR):
+        if flags & flag:
+            fields = reader.unpack(_EAR)
+            thresholds.append(array('h', fields[:len(RESULT_FREQUENCIES)]))
+            hearing_loss.append(bytes(fields[len(RESULT_FREQUENCIES):]))
+        else:
+            thresholds.append(None)
+            hearing_loss.append(None)
+
+    compatibility = None
+    issues = ()
+    if flags & FLAG_COMPATIBILITY:
+        compatibility, issue_count = reader.unpack(_COMPATIBILITY)
+        issues = tuple(reader.read_str() for _ in range(issue_count))
+
+    asymmetry = None
+    max_asymmetry = concerning = overall_flag = 0
+    asymmetry_flags = ()
+    clinical_significance = None
+    if flags & FLAG_ASYMMETRY:
+        fields = reader.unpack(_ASYMMETRY)
+        asymmetry = bytes(fields[:len(RESULT_FREQUENCIES)])
+        max_asymmetry, concerning, overall_flag, flag_count = fields[len(RESULT_FREQUENCIES):]
+        asymmetry_flags = tuple(reader.read_str() for _ in range(flag_count))
+        if overall_flag:
+            clinical_significance = reader.read_str()
+
+    return AnalysisResult(values, interpretations, original, tuple(thresholds), tuple(hearing_loss), compatibility,
+                          issues, asymmetry, max_asymmetry, concerning, overall_flag, asymmetry_flags,
+                          clinical_significance, reader.read_str(), reader.read_str(), reader.read_str())
+
+
+def decode_result(data: bytes, compact: bool = False):
+    """Result dict of an encode_result record (the AnalysisResult itself with `compact`); errors stay dicts"""
+    try:
+        result = _read_result(_Reader(memoryview(data)))
+    except struct.error as e:
+        raise ValueError(f'Truncated result: {e}')
+    if isinstance(result, AnalysisResult) and not compact:
+        return result.to_dict()
+    return result
+
+
+def encode_results(results: Dict[str, Dict]) -> bytes:
+    """Binary batch of {name: process_pdf result}, as returned by process_many"""
+    parts = [_BATCH_HEADER.pack(_BATCH_MAGIC, FORMAT_VERSION, len(results))]
+    for name, result in results.items():
+        record = encode_result(result)
+        _pack_str(parts, name)
+        parts.append(_LENGTH.pack(len(record)))
+        parts.append(record)
+    return b''.join(parts)
+
+
+def decode_results(data: bytes, compact: bool = False) -> Dict:
+    """{name: result} of an encode_results batch"""
+    reader = _Reader(memoryview(data))
+    try:
+        magic, version, count = reader.unpack(_BATCH_HEADER)
+        if magic != _BATCH_MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'Not a version {FORMAT_VERSION} result batch')
+        results = {}
+        for _ in range(count):
+            name = reader.read_str()
+            size, = reader.unpack(_LENGTH)
+            results[name] = decode_result(reader.read_bytes(size), compact)
+        return results
+    except struct.error as e:
+        raise ValueError(f'Truncated batch: {e}')
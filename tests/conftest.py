@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The Flask app module, imported once with its job store and patient DB under a temporary directory"""
+    directory = tmp_path_factory.mktemp('app')
+    os.environ['JOB_STORE_DIR'] = str(directory / 'jobs')
+    os.environ['PATIENT_DB'] = str(directory / 'patients.sqlite3')
+    os.environ['RATE_LIMIT_BURST'] = '100000'
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module, tmp_path, monkeypatch):
+    """Test client of the app with an empty result cache and patient store"""
+    from patient_store import PatientStore
+    from result_cache import ResultCache
+
+    monkeypatch.setattr(app_module, 'result_cache', ResultCache(app_module.EXTRACTION_VERSION))
+    monkeypatch.setattr(app_module, 'patient_store', PatientStore(str(tmp_path / 'patients.sqlite3')))
+    return app_module.app.test_client()
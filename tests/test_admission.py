@@ -0,0 +1,162 @@
+import io
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionControl, AnalysisQueue, RateLimiter, Rejected
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+def test_waiters_get_slots_in_arrival_order():
+    queue = AnalysisQueue(max_active=2, max_queued=10, timeout=5)
+    held = [queue.acquire(), queue.acquire()]
+    order = []
+
+    def waiter(name, slots):
+        started = queue.acquire(slots)
+        order.append(name)
+        queue.release(started, slots)
+
+    batch = threading.Thread(target=waiter, args=('batch', 2))
+    batch.start()
+    wait_until(lambda: queue.queued == 1)
+    single = threading.Thread(target=waiter, args=('single', 1))
+    single.start()
+    wait_until(lambda: queue.queued == 2)
+
+    # One slot frees up: the single analysis fits, but the batch arrived first and needs both
+    queue.release(held.pop())
+    time.sleep(0.05)
+    assert order == []
+    queue.release(held.pop())
+    batch.join(5)
+    single.join(5)
+    assert order == ['batch', 'single']
+    assert queue.active == 0 and queue.queued == 0
+
+
+def test_batch_is_not_starved_by_a_stream_of_single_analyses():
+    queue = AnalysisQueue(max_active=2, max_queued=10, timeout=5)
+    stop = threading.Event()
+    batch_done = threading.Event()
+
+    def singles():
+        while not stop.is_set():
+            with queue.slot():
+                time.sleep(0.001)
+
+    workers = [threading.Thread(target=singles) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    try:
+        with queue.slot(2):
+            batch_done.set()
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(5)
+    assert batch_done.is_set()
+
+
+def test_full_queue_rejects_at_once():
+    queue = AnalysisQueue(max_active=1, max_queued=0, timeout=5)
+    started = queue.acquire()
+    with pytest.raises(Rejected) as rejected:
+        queue.acquire()
+    assert (rejected.value.status, rejected.value.reason) == (503, 'queue_full')
+    assert rejected.value.headers['Retry-After'] == '1'
+    queue.release(started)
+
+
+def test_timed_out_head_lets_the_next_waiter_through():
+    queue = AnalysisQueue(max_active=2, max_queued=10, timeout=0.2)
+    held = queue.acquire()
+    outcomes = {}
+
+    def waiter(name, slots):
+        try:
+            queue.release(queue.acquire(slots), slots)
+            outcomes[name] = 'ran'
+        except Rejected as e:
+            outcomes[name] = e.reason
+
+    batch = threading.Thread(target=waiter, args=('batch', 2))
+    batch.start()
+    wait_until(lambda: queue.queued == 1)
+    time.sleep(0.1)  # so the single analysis's own deadline is well after the batch's
+    single = threading.Thread(target=waiter, args=('single', 1))
+    single.start()
+    batch.join(5)
+    single.join(5)
+    queue.release(held)
+    assert outcomes == {'batch': 'queue_timeout', 'single': 'ran'}
+
+
+def test_slots_are_capped_at_max_active():
+    queue = AnalysisQueue(max_active=2, max_queued=0, timeout=1)
+    with queue.slot(5):
+        assert queue.active == 2
+    assert queue.active == 0
+
+
+def test_batch_slots():
+    admission = AdmissionControl(max_active=4)
+    assert admission.batch_slots(1, 8) == 1
+    assert admission.batch_slots(10, 3) == 3
+    assert admission.batch_slots(10, 8) == 4
+    assert admission.batch_slots(0, 8) == 1
+
+
+def test_rate_limiter_refuses_beyond_the_burst():
+    limiter = RateLimiter(per_minute=60, burst=2)
+    assert limiter.wait_seconds('a') == 0
+    assert limiter.wait_seconds('a') == 0
+    assert 0 < limiter.wait_seconds('a') <= 1
+    assert limiter.wait_seconds('b') == 0
+
+
+def test_check_pages_rejects_long_pdfs():
+    from benchmarks.synthetic_report import report_pdf
+
+    admission = AdmissionControl(max_pages=2)
+    admission.check_pages(report_pdf(noise_pages=1))
+    with pytest.raises(Rejected) as rejected:
+        admission.check_pages(report_pdf(noise_pages=2))
+    assert (rejected.value.status, rejected.value.reason) == (413, 'too_many_pages')
+    admission.check_pages(b'not a pdf')
+
+
+def test_upload_endpoints_are_rate_limited_per_tenant(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.admission, 'limiter', RateLimiter(per_minute=1, burst=1))
+    monkeypatch.setattr(app_module, 'ADMISSION_CLIENT_HEADER', 'X-Tenant')
+
+    first = client.post('/api/analyze', headers={'X-Tenant': 'a'})
+    limited = client.post('/api/analyze', headers={'X-Tenant': 'a'})
+    other_tenant = client.post('/api/analyze', headers={'X-Tenant': 'b'})
+
+    assert first.status_code == other_tenant.status_code == 400
+    assert limited.status_code == 429
+    assert int(limited.headers['Retry-After']) >= 1
+    assert client.get('/api/health', headers={'X-Tenant': 'a'}).status_code == 200
+
+
+def test_analysis_is_refused_when_the_queue_is_full(client, app_module, monkeypatch):
+    from benchmarks.synthetic_report import report_pdf
+
+    queue = AnalysisQueue(max_active=1, max_queued=0, timeout=5)
+    monkeypatch.setattr(app_module.admission, 'queue', queue)
+    held = queue.acquire()
+    try:
+        response = client.post('/api/analyze', data={'pdf': (io.BytesIO(report_pdf(seed=16)), 'r.pdf')})
+    finally:
+        queue.release(held)
+
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
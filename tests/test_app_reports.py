@@ -0,0 +1,40 @@
+import io
+
+import fitz
+
+from benchmarks.synthetic_report import report_pdf
+from report_splitter import header_identity, header_lines
+
+
+def patient_ids(pdf_bytes):
+    doc = fitz.open(stream=pdf_bytes, filetype='pdf')
+    return [header_identity(header_lines(page.get_text()))[0] for page in doc]
+
+
+def test_report_for_another_patient_is_not_stored(client, app_module):
+    export = report_pdf(reports=2, seed=5)
+    first_patient, other_patient = patient_ids(export)
+    assert first_patient != other_patient
+
+    response = client.post('/api/analyze/reports', data={'pdf': (io.BytesIO(export), 'export.pdf'), 'patient_id': first_patient})
+
+    assert response.status_code == 200
+    first, other = response.get_json()['reports']
+    assert first['visit_id'] is not None and first['visit_error'] is None
+    assert other['visit_id'] is None and other_patient in other['visit_error']
+    assert 'error' not in other['data']
+    assert [visit['visit_id'] for visit in app_module.patient_store.visits(first_patient)] == [first['visit_id']]
+    assert app_module.patient_store.visits(other_patient) == []
+
+
+def test_single_report_export_reuses_the_analyze_result(client):
+    pdf = report_pdf(reports=1, seed=6)
+    patient = patient_ids(pdf)[0]
+
+    alone = client.post('/api/analyze', data={'pdf': (io.BytesIO(pdf), 'r.pdf'), 'patient_id': patient, 'visit_date': '2024-01-02'})
+    export = client.post('/api/analyze/reports', data={'pdf': (io.BytesIO(pdf), 'r.pdf'), 'patient_id': patient})
+
+    assert alone.status_code == export.status_code == 200
+    report, = export.get_json()['reports']
+    assert report['cached']
+    assert report['data'] == alone.get_json()['data']
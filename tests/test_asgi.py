@@ -0,0 +1,131 @@
+import asyncio
+import io
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import encode_multipart
+
+from benchmarks.synthetic_report import report_pdf
+from result_format import RESULT_MEDIA_TYPE, decode_result
+
+
+@pytest.fixture
+def asgi(client):
+    """The ASGI app, sharing the Flask app's (emptied) result cache and patient store; its PDF pool is shut down after"""
+    import asgi_app
+    yield asgi_app
+    if asgi_app._pdf_pool is not None:
+        asgi_app._pdf_pool.shutdown(cancel_futures=True)
+        asgi_app._pdf_pool = None
+
+
+def call(asgi_app, method, path, body=b'', headers=(), chunk_size=4096, content_length=True):
+    """Run one request through the ASGI app, sending the body in chunks; returns (status, headers, body)"""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b'']
+    headers = [(name.lower().encode(), value.encode()) for name, value in headers]
+    if content_length:
+        headers.append((b'content-length', str(len(body)).encode()))
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': headers,
+             'client': ('127.0.0.1', 1234), 'server': ('testserver', 80)}
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app.app(scope, receive, send))
+    start = sent[0]
+    return start['status'], dict(start['headers']), b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def upload(pdf, filename='r.pdf', **fields):
+    boundary, body = encode_multipart({'pdf': FileStorage(io.BytesIO(pdf), filename), **fields})
+    return body, [('Content-Type', f'multipart/form-data; boundary={boundary}')]
+
+
+def test_streamed_upload_gives_the_flask_result(asgi, app_module):
+    pdf = report_pdf(seed=10)
+    body, headers = upload(pdf, patient_id='P1', visit_date='2024-02-03')
+
+    status, _, response = call(asgi, 'POST', '/api/analyze', body, headers, chunk_size=1000)
+    status_again, _, response_again = call(asgi, 'POST', '/api/analyze', body, headers)
+
+    assert status == status_again == 200
+    payload, payload_again = json.loads(response), json.loads(response_again)
+    assert payload['data'] == app_module.extractor.process_pdf(pdf)
+    assert not payload['cached'] and payload_again['cached']
+    assert payload['visit_id'] is not None and payload_again['visit_id'] == payload['visit_id']
+
+
+def test_binary_result_over_asgi(asgi):
+    pdf = report_pdf(seed=11)
+    body, headers = upload(pdf)
+
+    _, _, as_json = call(asgi, 'POST', '/api/analyze', body, headers)
+    status, response_headers, as_binary = call(asgi, 'POST', '/api/analyze', body, [*headers, ('Accept', RESULT_MEDIA_TYPE)])
+
+    assert status == 200
+    assert response_headers[b'content-type'] == RESULT_MEDIA_TYPE.encode()
+    assert decode_result(as_binary) == json.loads(as_json)['data']
+
+
+def test_declared_oversized_upload_is_refused_before_reading(asgi, monkeypatch):
+    monkeypatch.setattr(asgi, 'MAX_UPLOAD_BYTES', 1000)
+    body, headers = upload(report_pdf(seed=12))
+
+    status, response_headers, _ = call(asgi, 'POST', '/api/analyze', body, headers)
+
+    assert status == 413
+    assert response_headers[b'connection'] == b'close'
+
+
+def test_streamed_body_over_the_limit_is_refused(asgi, monkeypatch):
+    monkeypatch.setattr(asgi, 'MAX_UPLOAD_BYTES', 1000)
+    body, headers = upload(report_pdf(seed=12))
+
+    status, _, _ = call(asgi, 'POST', '/api/analyze', body, headers, chunk_size=300, content_length=False)
+
+    assert status == 413
+
+
+@pytest.mark.parametrize('filename, error', [('notes.txt', 'File must be a PDF'), ('', 'No file selected')])
+def test_bad_uploads(asgi, filename, error):
+    body, headers = upload(b'%PDF-', filename=filename)
+
+    status, _, response = call(asgi, 'POST', '/api/analyze', body, headers)
+
+    assert (status, json.loads(response)) == (400, {'error': error})
+
+
+def test_bad_visit_date(asgi):
+    body, headers = upload(report_pdf(seed=13), patient_id='P1', visit_date='tomorrow')
+
+    status, _, _ = call(asgi, 'POST', '/api/analyze', body, headers)
+
+    assert status == 400
+
+
+def test_other_routes_are_served_by_flask(asgi):
+    status, _, response = call(asgi, 'GET', '/api/health')
+
+    assert status == 200
+    assert json.loads(response)['status']
+
+
+def test_pool_broken_by_a_dead_worker_is_replaced(asgi):
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(asgi._run_on_pool(os._exit, 1))
+    assert asyncio.run(asgi._run_on_pool(len, 'abc')) == 3
+
+    # Broken by an earlier call that did not go through _run_on_pool: found on submit and replaced
+    broken = asgi._pool()
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+    assert asyncio.run(asgi._run_on_pool(len, 'abcd')) == 4
+    assert asgi._pdf_pool is not broken
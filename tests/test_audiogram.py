@@ -0,0 +1,59 @@
+import random
+
+import fitz
+import pytest
+
+from audiogram_extractor import AudiogramExtractor, _parse_frequency
+from benchmarks.synthetic_report import audiogram_thresholds, draw_audiogram, report_lines, report_pdf
+from medical_extractor import SimpleMedicalExtractor
+
+
+def audiogram_doc(seed, raster):
+    left, right = audiogram_thresholds(random.Random(seed))
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 60), 'Summary page without a plot')
+    draw_audiogram(doc, left, right, raster=raster)
+    return doc, left, right
+
+
+@pytest.mark.parametrize('raster', [False, True], ids=['vector', 'raster'])
+@pytest.mark.parametrize('seed', range(4))
+def test_plotted_thresholds_are_read_back(seed, raster):
+    doc, left, right = audiogram_doc(seed, raster)
+
+    assert AudiogramExtractor().extract(doc) == {'left_ear': left, 'right_ear': right}
+
+
+def test_search_continues_past_the_given_pages():
+    doc, left, right = audiogram_doc(0, raster=False)
+
+    assert AudiogramExtractor().extract(doc, page_numbers=[0]) == {}
+    assert AudiogramExtractor().extract(doc, page_numbers=[0], search_from=1) == {'left_ear': left, 'right_ear': right}
+
+
+def test_page_without_a_plot_gives_nothing():
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 60), 'Audiogram: not performed')
+
+    assert AudiogramExtractor().extract(doc) == {}
+
+
+@pytest.mark.parametrize('label, frequency', [
+    ('250', 250), ('1000', 1000), ('1,000', 1000), ('1k', 1000), ('1.5 kHz', 1500), ('8K', 8000),
+    ('8000Hz', 8000), ('300', None), ('dB', None),
+])
+def test_frequency_labels(label, frequency):
+    assert _parse_frequency(label) == frequency
+
+
+def test_process_pdf_reports_the_plotted_thresholds():
+    pdf = report_pdf(audiogram='vector', seed=3)
+    rng = random.Random(3)
+    # report_pdf draws the summary first; replay its random stream to recover the thresholds
+    report_lines(rng, 0, audiogram=True)
+    left, right = audiogram_thresholds(rng)
+
+    audiogram = SimpleMedicalExtractor().process_pdf(pdf)['audiogram_data']
+
+    assert {ear: {int(f): db for f, db in values.items()} for ear, values in audiogram.items()
+            if ear in ('left_ear', 'right_ear')} == {'left_ear': left, 'right_ear': right}
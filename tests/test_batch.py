@@ -0,0 +1,81 @@
+import io
+import zipfile
+
+import pytest
+
+from benchmarks.synthetic_report import report_pdf
+from medical_extractor import SimpleMedicalExtractor
+
+
+def zip_of(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='module')
+def pdfs():
+    return [report_pdf(seed=seed) for seed in range(3)]
+
+
+def test_batch_of_files_and_zips_matches_single_analysis(client, pdfs):
+    archive = zip_of({'visits/a.pdf': pdfs[1], 'notes.txt': b'ignored', 'b.pdf': pdfs[2]})
+
+    response = client.post('/api/analyze/batch', data={'pdfs': [(io.BytesIO(pdfs[0]), 'a.pdf'),
+                                                                 (io.BytesIO(archive), 'export.zip')]})
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert (payload['count'], payload['failed']) == (3, 0)
+    extractor = SimpleMedicalExtractor()
+    assert payload['results'] == {
+        'a.pdf': extractor.process_pdf(pdfs[0]),
+        'export.zip/visits/a.pdf': extractor.process_pdf(pdfs[1]),
+        'export.zip/b.pdf': extractor.process_pdf(pdfs[2]),
+    }
+
+
+def test_same_named_uploads_get_unique_keys(client, pdfs):
+    files = [(io.BytesIO(pdf), 'scan.pdf') for pdf in pdfs]
+
+    response = client.post('/api/analyze/batch', data={'pdfs': files})
+
+    assert response.status_code == 200
+    assert sorted(response.get_json()['results']) == ['scan.pdf', 'scan.pdf (2)', 'scan.pdf (3)']
+
+
+def test_oversized_and_invalid_members_become_error_entries(client, app_module, monkeypatch, pdfs):
+    monkeypatch.setattr(app_module, 'MAX_UPLOAD_BYTES', max(len(pdf) for pdf in pdfs[:2]))
+    archive = zip_of({'ok.pdf': pdfs[0], 'big.pdf': pdfs[0] + b'\0' * len(pdfs[0])})
+
+    response = client.post('/api/analyze/batch', data={'pdfs': [(io.BytesIO(archive), 'in.zip'),
+                                                                 (io.BytesIO(b'not a zip'), 'bad.zip'),
+                                                                 (io.BytesIO(b'text'), 'notes.txt'),
+                                                                 (io.BytesIO(pdfs[1]), 'ok.pdf')]})
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    results = payload['results']
+    assert (payload['count'], payload['failed']) == (5, 3)
+    assert 'error' not in results['in.zip/ok.pdf'] and 'error' not in results['ok.pdf']
+    assert 'exceeds' in results['in.zip/big.pdf']['error']
+    assert results['bad.zip'] == {'error': 'File is not a valid zip archive'}
+    assert results['notes.txt'] == {'error': 'File must be a PDF or a zip of PDFs'}
+
+
+def test_batch_without_pdfs_is_rejected(client):
+    response = client.post('/api/analyze/batch', data={'pdfs': [(io.BytesIO(b'text'), 'notes.txt')]})
+
+    assert response.status_code == 400
+    assert response.get_json()['results'] == {'notes.txt': {'error': 'File must be a PDF or a zip of PDFs'}}
+
+
+def test_batch_over_the_file_limit_is_rejected(client, app_module, monkeypatch, pdfs):
+    monkeypatch.setattr(app_module, 'MAX_BATCH_FILES', 2)
+    archive = zip_of({f'{i}.pdf': pdfs[0] for i in range(3)})
+
+    response = client.post('/api/analyze/batch', data={'pdfs': [(io.BytesIO(archive), 'many.zip')]})
+
+    assert response.status_code == 413
@@ -0,0 +1,41 @@
+import fitz
+
+from benchmarks.harness import compare, measure, summarize, write_results
+from benchmarks.synthetic_report import report_pdf, report_text
+from medical_extractor import SimpleMedicalExtractor
+
+
+def test_summarize():
+    stats = summarize([0.3, 0.1, 0.2, 0.4], number=10)
+
+    assert stats == {'min': 0.1, 'median': 0.25, 'mean': 0.25, 'p95': 0.4, 'samples': 4, 'number': 10}
+
+
+def test_measure_times_each_call():
+    calls = []
+
+    stats = measure(lambda: calls.append(1), repeat=3, number=4)
+
+    assert len(calls) == 12
+    assert stats['samples'] == 3 and stats['number'] == 4
+
+
+def test_compare_reports_moves_beyond_the_threshold(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    write_results(str(baseline), {'suite': {'slower': {'median': 0.010}, 'faster': {'median': 0.010},
+                                            'steady': {'median': 0.010}}})
+
+    lines = compare(str(baseline), {'suite': {'slower': {'median': 0.012}, 'faster': {'median': 0.008},
+                                              'steady': {'median': 0.0105}, 'new': {'median': 0.001}}})
+
+    assert [line.split()[:2] for line in lines] == [['REGRESSION', 'suite.slower:'], ['improvement', 'suite.faster:']]
+
+
+def test_synthetic_reports_are_reproducible_and_readable():
+    assert report_text(reports=2, seed=3) == report_text(reports=2, seed=3)
+    pdf = report_pdf(reports=2, noise_pages=1, leading_noise_pages=1, audiogram='vector', seed=3)
+
+    assert fitz.open(stream=pdf, filetype='pdf').page_count == 2 * 4
+    values = SimpleMedicalExtractor().process_pdf(pdf)['extracted_values']
+    assert {'Button Press Accuracy', 'False Alarms', 'Median Reaction Time', 'P3b Amplitude',
+            'Peak Alpha Frequency'} <= set(values)
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+from clinical_ranges import DEFAULT_RANGES_PATH, CRITICAL_LABEL, ClinicalRanges, ReloadableRanges
+
+ADMIN = {'X-Admin-Token': 'secret'}
+
+
+@pytest.fixture
+def config():
+    with open(DEFAULT_RANGES_PATH) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def ranges_file(tmp_path, config):
+    path = tmp_path / 'ranges.json'
+    path.write_text(json.dumps(config))
+    return path
+
+
+def rewrite(path, config):
+    path.write_text(json.dumps(config))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_classify_follows_direction_and_critical_floor(config):
+    ranges = ClinicalRanges.from_config(config)
+    assert ranges.classify('Peak Alpha Frequency', 10.0) == 'Normal'
+    assert ranges.classify('Peak Alpha Frequency', 9.0) == 'Borderline'
+    assert ranges.classify('Peak Alpha Frequency', 8.2) == 'High Risk'
+    assert ranges.classify('Peak Alpha Frequency', 7.9) == CRITICAL_LABEL
+    assert ranges.classify('P3b Latency', 390.0) == 'Normal'
+    assert ranges.classify('P3b Latency', 420.0) == 'High Risk'
+    assert ranges.classify('Not A Metric', 1.0) == 'Unknown'
+
+
+def test_version_changes_with_content(config):
+    first = ClinicalRanges.from_config(config)
+    config['metrics']['P3b Latency']['normal'] = 400.0
+    second = ClinicalRanges.from_config(config)
+    assert first.version.split('+')[0] == second.version.split('+')[0] == config['version']
+    assert first.version != second.version
+
+
+@pytest.mark.parametrize('breakage', [
+    lambda config: config.pop('metrics'),
+    lambda config: config['metrics']['P3b Latency'].update(direction='sideways'),
+    lambda config: config['metrics']['P3b Latency'].update(normal='high'),
+    lambda config: config['hearing_loss_db'].update(mild_max=10),
+])
+def test_malformed_config_is_rejected(config, breakage):
+    breakage(config)
+    with pytest.raises(ValueError):
+        ClinicalRanges.from_config(config)
+
+
+def test_file_changes_are_picked_up_and_bad_ones_ignored(ranges_file, config):
+    ranges = ReloadableRanges(str(ranges_file), check_interval=0)
+    original = ranges.current()
+
+    config['metrics']['P3b Latency']['normal'] = 400.0
+    rewrite(ranges_file, config)
+    updated = ranges.current()
+    assert updated.version != original.version
+    assert updated.metrics['P3b Latency'].normal == 400.0
+
+    rewrite(ranges_file, {'version': 'broken'})
+    assert ranges.current() is updated
+    assert ranges.last_error.startswith('ValueError')
+
+
+def test_reload_endpoint_needs_the_admin_token(client, app_module, monkeypatch):
+    assert client.post('/api/clinical-ranges/reload', headers=ADMIN).status_code == 404
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    assert client.post('/api/clinical-ranges/reload').status_code == 404
+    assert client.post('/api/clinical-ranges/reload', headers={'X-Admin-Token': 'wrong'}).status_code == 404
+
+
+def test_reload_endpoint_swaps_ranges_or_reports_a_bad_file(client, app_module, monkeypatch, ranges_file, config):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(app_module.extractor, 'ranges', ReloadableRanges(str(ranges_file), check_interval=3600))
+
+    config['metrics']['P3b Latency']['normal'] = 400.0
+    rewrite(ranges_file, config)
+    response = client.post('/api/clinical-ranges/reload', headers=ADMIN)
+    assert response.status_code == 200
+    assert response.get_json()['range_version'] == app_module.extractor.ranges.current().version
+    assert response.get_json()['clinical_ranges']['P3b Latency']['normal'] == 400.0
+
+    rewrite(ranges_file, {'version': 'broken'})
+    response = client.post('/api/clinical-ranges/reload', headers=ADMIN)
+    assert response.status_code == 400
+    assert app_module.extractor.ranges.current().metrics['P3b Latency'].normal == 400.0
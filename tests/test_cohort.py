@@ -0,0 +1,60 @@
+import math
+import random
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_report import report_pdf
+from cohort import values_frame
+from medical_extractor import SimpleMedicalExtractor
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return SimpleMedicalExtractor()
+
+
+def cohort_values(ranges, patients, seed=0):
+    """Values around each metric's thresholds, exactly on them, and missing"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(patients):
+        row = {}
+        for metric, r in ranges.reference_ranges.items():
+            low, high = sorted((r['normal'], r['mild_ad']))
+            span = high - low
+            row[metric] = rng.choice([r['normal'], r['mild_ad'], math.nan, ranges.critical_floors.get(metric, low) - 0.1,
+                                      rng.uniform(low - span, high + span)])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def test_cohort_scoring_matches_per_value_interpretation(extractor):
+    ranges = extractor.ranges.current()
+    values = cohort_values(ranges, 200)
+
+    labels = extractor.interpret_cohort(values)
+
+    assert list(labels.columns) == list(values.columns)
+    for patient, row in values.iterrows():
+        for metric, value in row.items():
+            expected = None if math.isnan(value) else extractor.calculate_clinical_interpretation(metric, value)
+            assert labels.at[patient, metric] == expected, (metric, value)
+
+
+def test_unknown_columns_are_dropped(extractor):
+    values = pd.DataFrame({'Patient Name': ['A'], 'False Alarms': [2.0]})
+
+    assert list(extractor.interpret_cohort(values).columns) == ['False Alarms']
+
+
+def test_values_frame_of_process_pdf_results(extractor):
+    results = [extractor.process_pdf(report_pdf(seed=seed)) for seed in range(3)]
+
+    frame = values_frame(results, index=['a', 'b', 'c'])
+    labels = extractor.interpret_cohort(frame)
+
+    for patient, result in zip(frame.index, results):
+        for metric, value in result['extracted_values'].items():
+            assert frame.at[patient, metric] == value
+            assert labels.at[patient, metric] == extractor.calculate_clinical_interpretation(metric, value)
@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import pytest
+
+from benchmarks.synthetic_report import report_pdf
+from medical_extractor import SimpleMedicalExtractor
+
+THREADS = 8
+
+
+@pytest.fixture(scope='module')
+def reports():
+    kinds = (None, 'vector', 'raster')
+    return [report_pdf(noise_pages=seed % 3, audiogram=kinds[seed % 3], seed=seed) for seed in range(6)]
+
+
+class Overlap:
+    """Wraps fitz.Page methods to record the most threads ever inside them at once"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inside = 0
+        self.most = 0
+
+    def wrap(self, method):
+        def wrapper(*args, **kwargs):
+            with self.lock:
+                self.inside += 1
+                self.most = max(self.most, self.inside)
+            try:
+                time.sleep(0.0005)  # widen the window another thread would need to overlap
+                return method(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.inside -= 1
+        return wrapper
+
+
+def test_shared_extractor_matches_sequential_results(reports, monkeypatch):
+    extractor = SimpleMedicalExtractor()
+    expected = [extractor.process_pdf(pdf_bytes) for pdf_bytes in reports]
+    overlap = Overlap()
+    for name in ('get_text', 'get_drawings', 'get_images', 'get_pixmap'):
+        monkeypatch.setattr(fitz.Page, name, overlap.wrap(getattr(fitz.Page, name)))
+
+    order = [index for _ in range(3) for index in range(len(reports))]
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(lambda index: extractor.process_pdf(reports[index]), order))
+
+    assert [result == expected[index] for index, result in zip(order, results)] == [True] * len(order)
+    # Every PyMuPDF call runs under pdf_lock.MUPDF_LOCK
+    assert overlap.most == 1
+
+
+def test_shared_extractor_splits_exports_concurrently(reports):
+    extractor = SimpleMedicalExtractor()
+    doc = fitz.open()
+    for pdf_bytes in reports:
+        doc.insert_pdf(fitz.open(stream=pdf_bytes, filetype='pdf'))
+    export = doc.tobytes()
+    expected = [segment.to_dict() for segment in extractor.split_reports(export)]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        splits = list(pool.map(lambda _: extractor.split_reports(export), range(2 * THREADS)))
+
+    assert all([segment.to_dict() for segment in segments] == expected for segments in splits)
+    assert len(expected) == len(reports)
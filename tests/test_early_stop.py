@@ -0,0 +1,78 @@
+import fitz
+
+from benchmarks.synthetic_report import report_pdf
+from medical_extractor import SimpleMedicalExtractor
+
+
+class FakeOcr:
+    """Stands in for PageOcr: records which pages each batch was asked for"""
+    available = True
+    command = 'fake'
+
+    def __init__(self, window):
+        self.window = window
+        self.batches = []
+
+    def page_texts(self, doc, page_numbers):
+        self.batches.append(list(page_numbers))
+        for number in page_numbers:
+            yield f'ocr page {number}'
+
+
+def pdf_with_pages(texts):
+    doc = fitz.open()
+    for text in texts:
+        page = doc.new_page()
+        if text:
+            page.insert_text((50, 50), text)
+    return doc.tobytes()
+
+
+def test_reading_stops_once_the_report_is_complete():
+    extractor = SimpleMedicalExtractor()
+    pdf = report_pdf(noise_pages=12, seed=7)
+
+    pages = extractor.read_report_pages(pdf)
+    all_pages = extractor.read_report_pages(pdf, stop_early=False)
+
+    assert len(pages) < len(all_pages) == fitz.open(stream=pdf, filetype='pdf').page_count
+    assert all_pages[:len(pages)] == pages
+
+
+def test_early_stop_gives_the_full_document_result():
+    extractor = SimpleMedicalExtractor()
+    for seed, kwargs in enumerate([{'noise_pages': 12}, {'leading_noise_pages': 3, 'noise_pages': 5},
+                                   {'audiogram': 'vector', 'noise_pages': 4}]):
+        pdf = report_pdf(seed=seed, **kwargs)
+        assert extractor.process_pdf(pdf) == extractor.process_pdf(pdf, stop_early=False)
+
+
+def test_unterminated_discussion_reads_every_page():
+    extractor = SimpleMedicalExtractor()
+    pdf = pdf_with_pages(['Study Discussion: still going', 'more', 'and more'])
+    assert len(extractor.read_report_pages(pdf)) == 3
+
+
+def test_ocr_lookahead_stays_within_the_window():
+    extractor = SimpleMedicalExtractor()
+    extractor.ocr = FakeOcr(window=2)
+    pdf = pdf_with_pages(['text 0', '', '', 'text 3', '', '', ''])
+
+    pages = extractor.iter_pdf_pages(pdf)
+    assert [next(pages) for _ in range(3)] == ['text 0\n', 'ocr page 1', 'ocr page 2']
+    pages.close()
+    assert extractor.ocr.batches == [[1, 2]]
+
+    extractor.ocr = FakeOcr(window=2)
+    assert list(extractor.iter_pdf_pages(pdf)) == ['text 0\n', 'ocr page 1', 'ocr page 2', 'text 3\n',
+                                                   'ocr page 4', 'ocr page 5', 'ocr page 6']
+    assert extractor.ocr.batches == [[1, 2], [4, 5], [6]]
+
+
+def test_ocr_batch_skips_pages_with_text():
+    extractor = SimpleMedicalExtractor()
+    extractor.ocr = FakeOcr(window=4)
+    pdf = pdf_with_pages(['', 'text 1', '', '', ''])
+
+    assert list(extractor.iter_pdf_pages(pdf)) == ['ocr page 0', 'text 1\n', 'ocr page 2', 'ocr page 3', 'ocr page 4']
+    assert extractor.ocr.batches == [[0, 2, 3], [4]]
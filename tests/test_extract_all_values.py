@@ -0,0 +1,69 @@
+import pytest
+
+from benchmarks.bench_extract_all_values import legacy_extract_all_values
+from benchmarks.synthetic_report import report_text
+from medical_extractor import SimpleMedicalExtractor
+
+REPORT = '''
+Button Press Accuracy: 91.5
+False Alarms
+3
+Median Reaction Time
+Normal
+Peak Alpha
+9.75
+P50
+Standard
+2.90
+55
+3.05
+P3b
+Target
+5.10
+401
+5.30
+N100
+Standard
+n/a
+100
+-6.20
+Physician: Dr. Example
+'''
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return SimpleMedicalExtractor()
+
+
+def test_values_of_a_report(extractor):
+    assert extractor.extract_all_values(REPORT) == {
+        'Button Press Accuracy': 91.5,
+        'False Alarms': 3.0,
+        'P50 Amplitude': 2.9,
+        'P3b Amplitude': 5.1,
+        'P3b Latency': 401.0,
+        'Peak Alpha Frequency': 9.75,
+        # Unreadable table value, so the average column is used
+        'N100 Amplitude': -6.2,
+    }
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    'P50\nStandard',
+    'Peak Alpha\n9.75\n',
+    'P3b\nTarget\n5.1\nlate\n5.3\n\n\n\n\n',
+    'False Alarms\nAccuracy: 4\nMedian Reaction Time 480\n',
+    'Median Reaction Time\ndelayed 500\nPeak Alpha\nlow\n',
+    REPORT.replace('\n', '\n  '),
+])
+def test_edge_cases_match_the_two_pass_scanner(extractor, text):
+    assert extractor.extract_all_values(text) == legacy_extract_all_values(text)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_synthetic_reports_match_the_two_pass_scanner(extractor, seed):
+    text = report_text(reports=3, noise_per_report=50, seed=seed)
+
+    assert list(extractor.extract_all_values(text).items()) == list(legacy_extract_all_values(text).items())
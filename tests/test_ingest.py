@@ -0,0 +1,77 @@
+import csv
+import hashlib
+
+import pytest
+
+from benchmarks.synthetic_report import report_pdf
+from ingest import CHECKPOINT_FILE, ingest, load_checkpoint
+from patient_store import PatientStore
+
+
+@pytest.fixture
+def archive(tmp_path):
+    root = tmp_path / 'archive'
+    (root / 'site').mkdir(parents=True)
+    (root / 'a.pdf').write_bytes(report_pdf(seed=1))
+    (root / 'site' / 'b.pdf').write_bytes(report_pdf(seed=2))
+    (root / 'site' / 'b copy.pdf').write_bytes((root / 'site' / 'b.pdf').read_bytes())
+    (root / 'broken.pdf').write_bytes(b'%PDF-1.4 not really')
+    (root / 'notes.txt').write_text('not a pdf')
+    return root
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def sha256_of(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_ingest_writes_tables_and_checkpoints_successes_only(archive, tmp_path):
+    output = tmp_path / 'out'
+
+    stats = ingest(str(archive), str(output), workers=2, chunk_size=2)
+
+    assert {key: stats[key] for key in ('processed', 'failed', 'duplicates', 'skipped')} == \
+        {'processed': 3, 'failed': 1, 'duplicates': 1, 'skipped': 0}
+    assert sorted(row['sha256'] for row in read_csv(output / 'extracted_values.csv')) == \
+        sorted([sha256_of(archive / 'a.pdf'), sha256_of(archive / 'site' / 'b.pdf')])
+    assert [row['source_path'] for row in read_csv(output / 'errors.csv')] == [str(archive / 'broken.pdf')]
+    assert load_checkpoint(str(output)) == {sha256_of(archive / 'a.pdf'), sha256_of(archive / 'site' / 'b.pdf')}
+
+
+def test_rerun_skips_completed_reports_and_retries_failed_ones(archive, tmp_path):
+    output = tmp_path / 'out'
+    ingest(str(archive), str(output), workers=1)
+
+    stats = ingest(str(archive), str(output), workers=1)
+
+    assert {key: stats[key] for key in ('processed', 'failed', 'skipped')} == {'processed': 1, 'failed': 1, 'skipped': 3}
+    assert len(read_csv(output / 'extracted_values.csv')) == 2
+    assert len(read_csv(output / 'errors.csv')) == 2
+
+
+def test_no_resume_starts_over(archive, tmp_path):
+    output = tmp_path / 'out'
+    ingest(str(archive), str(output), workers=1)
+
+    stats = ingest(str(archive), str(output), workers=1, resume=False)
+
+    assert stats['skipped'] == 0
+    assert len(read_csv(output / 'extracted_values.csv')) == 2
+    assert (output / CHECKPOINT_FILE).exists()
+
+
+def test_manifest_visits_go_to_the_patient_store(archive, tmp_path):
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text('path,patient_id,visit_date\na.pdf,P1,2024-01-02\nbroken.pdf,P1,2024-02-02\n')
+    db = tmp_path / 'patients.sqlite3'
+
+    ingest(str(archive), str(tmp_path / 'out'), workers=1, patient_db=str(db), patient_manifest=str(manifest))
+
+    store = PatientStore(str(db))
+    visits = store.visits('P1')
+    assert [(visit['visit_date'], visit['sha256']) for visit in visits] == [('2024-01-02', sha256_of(archive / 'a.pdf'))]
+    assert store.raw_extraction(visits[0]['sha256']) is not None
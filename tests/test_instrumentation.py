@@ -0,0 +1,82 @@
+import io
+import re
+
+import pytest
+
+from benchmarks.synthetic_report import report_pdf
+from instrumentation import STAGE_ERRORS, MetricsRegistry, server_timing_header, timed_stage
+
+
+def sample(text, name, **labels):
+    """Value of one sample line of a Prometheus text exposition; None if absent"""
+    wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    for line in text.splitlines():
+        match = re.fullmatch(r'([^{ ]+)(?:\{(.*)\})? (\S+)', line)
+        if match and match.group(1) == name and (match.group(2) or '') == wanted:
+            return float(match.group(3))
+    return None
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency_seconds', 'Latency', ['stage'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, stage='open')
+
+    text = registry.render()
+
+    assert '# TYPE latency_seconds histogram' in text
+    assert sample(text, 'latency_seconds_bucket', stage='open', le='0.1') == 2
+    assert sample(text, 'latency_seconds_bucket', stage='open', le='1') == 3
+    assert sample(text, 'latency_seconds_bucket', stage='open', le='+Inf') == 4
+    assert sample(text, 'latency_seconds_count', stage='open') == 4
+    assert sample(text, 'latency_seconds_sum', stage='open') == pytest.approx(2.65)
+
+
+def test_counter_without_labels_renders_zero():
+    registry = MetricsRegistry()
+    counter = registry.counter('pages_total', 'Pages')
+
+    assert sample(registry.render(), 'pages_total') == 0
+    counter.inc(3)
+    assert sample(registry.render(), 'pages_total') == 3
+
+
+def test_timed_stage_counts_errors():
+    before = STAGE_ERRORS.value(stage='test_stage')
+
+    with pytest.raises(RuntimeError):
+        with timed_stage('test_stage'):
+            raise RuntimeError('boom')
+
+    assert STAGE_ERRORS.value(stage='test_stage') == before + 1
+
+
+def test_server_timing_sums_repeated_stages():
+    header = server_timing_header([('open', 0.001), ('findings', 0.002), ('open', 0.003)], total=0.01)
+
+    assert header == 'open;dur=4.00, findings;dur=2.00, total;dur=10.00'
+
+
+def test_metrics_endpoint_counts_analysis_stages(client):
+    def stage_count(stage):
+        return sample(client.get('/api/metrics').get_data(as_text=True), 'pdf_stage_duration_seconds_count', stage=stage) or 0
+
+    before = stage_count('extract_values')
+    response = client.post('/api/analyze', data={'pdf': (io.BytesIO(report_pdf(seed=8)), 'r.pdf')})
+
+    assert response.status_code == 200
+    assert stage_count('extract_values') == before + 1
+    metrics = client.get('/api/metrics')
+    assert metrics.mimetype == 'text/plain'
+    assert sample(metrics.get_data(as_text=True), 'http_request_duration_seconds_count',
+                  endpoint='analyze_pdf', status='200') >= 1
+
+
+def test_server_timing_header_when_enabled(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'SERVER_TIMING', True)
+
+    response = client.post('/api/analyze', data={'pdf': (io.BytesIO(report_pdf(seed=9)), 'r.pdf')})
+
+    stages = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+    assert 'open' in stages and stages[-1] == 'total'
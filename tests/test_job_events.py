@@ -0,0 +1,72 @@
+import io
+import json
+
+from benchmarks.synthetic_report import report_pdf
+
+
+def frames(text):
+    """SSE frames as dicts of their fields; comment lines are kept under ':'"""
+    parsed = []
+    for block in text.split('\n\n'):
+        if not block:
+            continue
+        frame = {}
+        for line in block.split('\n'):
+            field, _, value = line.partition(': ') if not line.startswith(':') else (':', '', line[1:].strip())
+            frame[field] = value
+        parsed.append(frame)
+    return parsed
+
+
+def events(client, job_id, **headers):
+    response = client.get(f'/api/jobs/{job_id}/events', headers=headers)
+    assert response.status_code == 200 and response.mimetype == 'text/event-stream'
+    return [frame for frame in frames(response.get_data(as_text=True)) if 'event' in frame]
+
+
+def test_stream_follows_a_job_to_its_result(client, app_module):
+    pdf = report_pdf(seed=14)
+    job_id = client.post('/api/jobs', data={'pdf': (io.BytesIO(pdf), 'r.pdf')}).get_json()['job_id']
+
+    stream = events(client, job_id)
+
+    names = [frame['event'] for frame in stream]
+    assert names[:2] == ['queued', 'started'] and names[-1] == 'done'
+    assert len(names) > 3
+    assert json.loads(stream[-1]['data'])['result'] == app_module.extractor.process_pdf(pdf)
+    ids = [int(frame['id']) for frame in stream]
+    assert ids == sorted(ids)
+
+
+def test_reconnect_resumes_after_the_last_event_id(client):
+    job_id = client.post('/api/jobs', data={'pdf': (io.BytesIO(report_pdf(seed=15)), 'r.pdf')}).get_json()['job_id']
+    stream = events(client, job_id)
+
+    resumed = events(client, job_id, **{'Last-Event-ID': stream[1]['id']})
+
+    assert resumed == stream[2:]
+    assert client.get(f"/api/jobs/{job_id}/events?after={stream[-2]['id']}").get_data(as_text=True).endswith(
+        stream[-1]['data'] + '\n\n')
+
+
+def test_stream_of_an_unfinished_job_sends_heartbeats_and_ends(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'SSE_STREAM_SECONDS', 0.3)
+    monkeypatch.setattr(app_module, 'SSE_HEARTBEAT_SECONDS', 0.05)
+    monkeypatch.setattr(app_module, 'SSE_POLL_SECONDS', 0.05)
+    # Stored but never handed to a worker, so it stays queued
+    job_id = app_module.job_queue.store.create('r.pdf', b'%PDF-')
+
+    try:
+        response = client.get(f'/api/jobs/{job_id}/events')
+        text = response.get_data(as_text=True)
+    finally:
+        app_module.job_queue.store.finish(job_id, error='never run')
+
+    assert text.startswith(f'retry: {app_module.SSE_RETRY_MS}\n\n')
+    assert [frame['event'] for frame in frames(text) if 'event' in frame] == ['queued']
+    assert ': keepalive\n\n' in text
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+
+def test_unknown_job_has_no_stream(client):
+    assert client.get('/api/jobs/missing/events').status_code == 404
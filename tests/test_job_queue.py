@@ -0,0 +1,92 @@
+import io
+import time
+
+import pytest
+
+from benchmarks.synthetic_report import report_pdf
+from job_queue import JobQueue, JobStore
+from medical_extractor import SimpleMedicalExtractor
+from result_cache import ResultCache
+
+
+def wait_finished(get, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+@pytest.fixture
+def extractor():
+    return SimpleMedicalExtractor()
+
+
+def test_submitted_job_finishes_with_the_process_pdf_result(tmp_path, extractor):
+    queue = JobQueue(extractor, JobStore(str(tmp_path)), max_workers=1)
+    pdf = report_pdf(seed=1)
+
+    job = wait_finished(queue.get, queue.submit('r.pdf', pdf))
+
+    assert job['status'] == 'done'
+    assert job['result'] == extractor.process_pdf(pdf)
+    assert job['queue_seconds'] is not None and job['run_seconds'] is not None
+    assert queue.pending() == 0
+    assert [event['event'] for event in queue.events(job['job_id'])][:2] == ['queued', 'started']
+
+
+def test_unreadable_pdf_fails_the_job(tmp_path, extractor):
+    queue = JobQueue(extractor, JobStore(str(tmp_path)), max_workers=1)
+
+    job = wait_finished(queue.get, queue.submit('bad.pdf', b'not a pdf'))
+
+    assert job['status'] == 'failed'
+    assert job['error'] and 'result' not in job
+
+
+def test_cached_result_finishes_the_job_without_running(tmp_path, extractor):
+    cache = ResultCache('test')
+    queue = JobQueue(extractor, JobStore(str(tmp_path)), max_workers=1, cache=cache)
+    pdf = report_pdf(seed=2)
+    cache.put(cache.key(pdf, extractor.ranges.current().version), {'cached': True})
+
+    job = queue.get(queue.submit('r.pdf', pdf))
+
+    assert job['status'] == 'done'
+    assert job['result'] == {'cached': True}
+
+
+def test_jobs_of_a_dead_worker_are_resumed(tmp_path, extractor):
+    store = JobStore(str(tmp_path))
+    job_id = store.create('r.pdf', report_pdf(seed=3))
+    store.claim(job_id)
+    with store._connect() as conn:
+        # A PID that cannot belong to a live process
+        conn.execute('UPDATE jobs SET owner_pid = ? WHERE id = ?', (2 ** 22 + 1, job_id))
+
+    queue = JobQueue(extractor, store, max_workers=1)
+
+    assert wait_finished(queue.get, job_id)['status'] == 'done'
+
+
+def test_job_endpoints(client, app_module):
+    pdf = report_pdf(seed=4)
+
+    submitted = client.post('/api/jobs', data={'pdf': (io.BytesIO(pdf), 'r.pdf')})
+
+    assert submitted.status_code == 202
+    payload = submitted.get_json()
+    assert payload['status_url'] == f"/api/jobs/{payload['job_id']}"
+    job = wait_finished(lambda job_id: client.get(f'/api/jobs/{job_id}').get_json(), payload['job_id'])
+    assert job['status'] == 'done'
+    assert job['result'] == app_module.extractor.process_pdf(pdf)
+    assert client.get('/api/jobs/missing').status_code == 404
+
+
+def test_job_with_a_bad_visit_date_is_rejected(client):
+    response = client.post('/api/jobs', data={'pdf': (io.BytesIO(report_pdf(seed=5)), 'r.pdf'),
+                                              'patient_id': 'P1', 'visit_date': '05/01/2024'})
+
+    assert response.status_code == 400
@@ -0,0 +1,62 @@
+import logging
+import os
+import stat
+
+import fitz
+import pytest
+
+from ocr import PageOcr, page_fingerprint
+from result_cache import ResultCache
+
+pytest.importorskip('cv2')
+
+
+def blank_pages(count):
+    doc = fitz.open()
+    for number in range(count):
+        page = doc.new_page()
+        # Drawn, not text: distinct pages without a text layer
+        page.draw_rect(fitz.Rect(50, 50 + 10 * number, 100, 60 + 10 * number), color=(0, 0, 0), fill=(0, 0, 0))
+    return doc
+
+
+def fake_engine(tmp_path, output, name='fake-tesseract'):
+    path = tmp_path / name
+    path.write_text(f'#!/bin/sh\ncat > /dev/null\necho "{output}"\n')
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def test_pages_are_recognized_in_order_and_cached(tmp_path):
+    ocr = PageOcr(command=fake_engine(tmp_path, 'Peak Alpha Frequency 9.5'), max_workers=0, cache=ResultCache('test'))
+    doc = blank_pages(3)
+
+    assert list(ocr.page_texts(doc, [0, 2])) == ['Peak Alpha Frequency 9.5\n'] * 2
+
+    ocr.command = fake_engine(tmp_path, 'changed', 'other-tesseract')
+    assert list(ocr.page_texts(doc, [0, 1])) == ['Peak Alpha Frequency 9.5\n', 'changed\n']
+
+
+def test_failed_page_reads_as_blank_and_is_logged(tmp_path, caplog):
+    if not os.path.exists('/bin/false'):
+        pytest.skip('needs /bin/false')
+    ocr = PageOcr(command='/bin/false', max_workers=0, cache=ResultCache('test'))
+
+    with caplog.at_level(logging.WARNING, logger='ocr'):
+        assert list(ocr.page_texts(blank_pages(2), [0, 1])) == ['', '']
+
+    assert [record.getMessage().split(':')[0] for record in caplog.records] == ['OCR failed on page 1', 'OCR failed on page 2']
+    # Failures are not cached, so the page is tried again next time
+    assert ocr.cache.stats()['entries'] == 0
+
+
+def test_window_is_two_pages_per_worker():
+    assert PageOcr(max_workers=0).window == 1
+    assert PageOcr(max_workers=3).window == 6
+
+
+def test_page_fingerprint_tells_pages_apart():
+    doc = blank_pages(2)
+    first, second = (page_fingerprint(doc, doc[number]) for number in range(2))
+    assert first != second
+    assert first == page_fingerprint(doc, doc[0])
@@ -0,0 +1,56 @@
+from patient_store import PatientStore
+
+
+def result(**values):
+    return {
+        'extracted_values': values,
+        'clinical_interpretations': {metric: 'Normal' for metric in values},
+        'asymmetry_analysis': {},
+    }
+
+
+def test_distinct_reports_of_a_visit_are_kept_apart(tmp_path):
+    store = PatientStore(str(tmp_path / 'patients.sqlite3'))
+    same = result(peak_alpha=10.0)
+
+    first, second = store.add_visits([('P1', '2024-01-02', 'aaa', same), ('P1', '2024-01-02', 'bbb', same)])
+
+    assert first != second
+    assert [visit['sha256'] for visit in store.visits('P1')] == ['aaa', 'bbb']
+    assert [row['value'] for row in store.trend('P1', 'peak_alpha')] == [10.0, 10.0]
+
+
+def test_repeated_report_in_one_call_is_stored_once(tmp_path):
+    store = PatientStore(str(tmp_path / 'patients.sqlite3'))
+
+    visit_ids = store.add_visits([
+        ('P1', '2024-01-02', 'aaa', result(peak_alpha=9.0)),
+        ('P1', '2024-01-02', 'aaa', result(peak_alpha=10.0)),
+    ])
+
+    assert visit_ids[0] == visit_ids[1]
+    assert store.trend('P1', 'peak_alpha') == [{'visit_date': '2024-01-02', 'value': 10.0, 'interpretation': 'Normal'}]
+
+
+def test_restoring_a_report_replaces_its_metrics(tmp_path):
+    store = PatientStore(str(tmp_path / 'patients.sqlite3'))
+    visit_id = store.add_visit('P1', '2024-01-02', result(peak_alpha=9.0, p300_latency=310.0), sha256='aaa')
+
+    assert store.add_visit('P1', '2024-01-02', result(peak_alpha=10.0), sha256='aaa') == visit_id
+
+    assert [row['value'] for row in store.trend('P1', 'peak_alpha')] == [10.0]
+    assert store.trend('P1', 'p300_latency') == []
+
+
+def test_trend_is_ordered_and_bounded_by_date(tmp_path):
+    store = PatientStore(str(tmp_path / 'patients.sqlite3'))
+    store.add_visits([
+        ('P1', '2024-03-01', 'c', result(peak_alpha=11.0)),
+        ('P1', '2024-01-01', 'a', result(peak_alpha=9.0)),
+        ('P1', '2024-02-01', 'b', result(peak_alpha=10.0)),
+        ('P2', '2024-02-01', 'd', result(peak_alpha=8.0)),
+    ])
+
+    assert [row['value'] for row in store.trend('P1', 'peak_alpha')] == [9.0, 10.0, 11.0]
+    assert [row['value'] for row in store.trend('P1', 'peak_alpha', since='2024-02-01')] == [10.0, 11.0]
+    assert [row['value'] for row in store.trend('P1', 'peak_alpha', until='2024-02-01')] == [9.0, 10.0]
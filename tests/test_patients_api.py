@@ -0,0 +1,53 @@
+import io
+
+from benchmarks.synthetic_report import report_pdf
+
+METRIC = 'Button Press Accuracy'
+
+
+def analyze(client, pdf, **form):
+    return client.post('/api/analyze', data={'pdf': (io.BytesIO(pdf), 'r.pdf'), **form})
+
+
+def test_visits_and_trend_of_analyzed_reports(client):
+    results = {}
+    for seed, visit_date in enumerate(['2024-03-01', '2023-01-15', '2024-07-30']):
+        response = analyze(client, report_pdf(seed=seed), patient_id='P1', visit_date=visit_date)
+        assert response.status_code == 200 and response.get_json()['visit_id'] is not None
+        results[visit_date] = response.get_json()['data']
+
+    visits = client.get('/api/patients/P1/visits').get_json()['visits']
+    trend = client.get('/api/patients/P1/trend', query_string={'metric': METRIC}).get_json()
+    window = client.get('/api/patients/P1/trend', query_string={'metric': METRIC, 'since': '2024-01-01',
+                                                                  'until': '2024-06-30'}).get_json()
+
+    assert [visit['visit_date'] for visit in visits] == sorted(results)
+    assert [visit['extracted_values'] for visit in visits] == [results[d]['extracted_values'] for d in sorted(results)]
+    assert trend['points'] == [{'visit_date': d, 'value': results[d]['extracted_values'][METRIC],
+                                'interpretation': results[d]['clinical_interpretations'][METRIC]}
+                               for d in sorted(results)]
+    assert [point['visit_date'] for point in window['points']] == ['2024-03-01']
+
+
+def test_untagged_upload_is_not_stored(client):
+    response = analyze(client, report_pdf(seed=4))
+
+    assert response.get_json()['visit_id'] is None
+    assert client.get('/api/patients/P2/visits').status_code == 404
+
+
+def test_bad_requests(client):
+    assert analyze(client, report_pdf(seed=5), patient_id='P1', visit_date='2024-13-01').status_code == 400
+    assert client.get('/api/patients/P1/trend').status_code == 400
+    assert client.get('/api/patients/P1/trend', query_string={'metric': 'Shoe Size'}).status_code == 400
+    assert client.get('/api/patients/nobody/visits').status_code == 404
+
+
+def test_trend_query_reads_only_the_covering_index(client, app_module):
+    with app_module.patient_store._connect() as conn:
+        plan = ' '.join(row['detail'] for row in conn.execute(
+            'EXPLAIN QUERY PLAN SELECT visit_date, value, interpretation FROM metric_values '
+            'WHERE patient_id = ? AND metric = ? AND visit_date >= ? ORDER BY visit_date', ('P1', METRIC, '2024-01-01')))
+
+    assert 'COVERING INDEX idx_metric_values_trend' in plan
+    assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,64 @@
+import io
+import pathlib
+
+import pytest
+
+from benchmarks.synthetic_report import report_pdf
+from medical_extractor import SimpleMedicalExtractor, load_pdf_source, pdf_source_size
+
+
+@pytest.fixture(scope='module')
+def pdf():
+    return report_pdf(seed=7)
+
+
+@pytest.fixture(scope='module')
+def expected(pdf):
+    return SimpleMedicalExtractor().process_pdf(pdf)
+
+
+class Upload:
+    """A binary stream that is not an io.BytesIO, like a werkzeug upload"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+@pytest.mark.parametrize('wrap', [
+    bytes,
+    bytearray,
+    memoryview,
+    lambda data: memoryview(b'xx' + data)[2:],
+    io.BytesIO,
+    Upload,
+], ids=['bytes', 'bytearray', 'memoryview', 'memoryview-slice', 'bytesio', 'stream'])
+def test_every_source_gives_the_same_result(pdf, expected, wrap):
+    assert expected and 'error' not in expected
+    assert SimpleMedicalExtractor().process_pdf(wrap(pdf)) == expected
+
+
+@pytest.mark.parametrize('to_path', [str, pathlib.Path])
+def test_paths_give_the_same_result(pdf, expected, tmp_path, to_path):
+    path = tmp_path / 'r.pdf'
+    path.write_bytes(pdf)
+
+    assert SimpleMedicalExtractor().process_pdf(to_path(path)) == expected
+    assert pdf_source_size(to_path(path)) == len(pdf)
+
+
+def test_whole_memoryview_is_not_copied(pdf):
+    assert load_pdf_source(memoryview(pdf)) is pdf
+    assert load_pdf_source(memoryview(b'xx' + pdf)[2:]) == pdf
+
+
+def test_sizes(pdf):
+    assert pdf_source_size(pdf) == pdf_source_size(memoryview(pdf)) == pdf_source_size(io.BytesIO(pdf)) == len(pdf)
+    assert pdf_source_size(Upload(pdf)) is None
+    assert pdf_source_size('/nonexistent/r.pdf') is None
+
+
+def test_unreadable_source_is_an_error_result():
+    assert 'error' in SimpleMedicalExtractor().process_pdf(b'not a pdf')
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+import profiler
+
+TOKEN = {'X-Profiler-Token': 'secret'}
+
+
+@pytest.fixture
+def profiled_client(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'PROFILER_TOKEN', 'secret')
+    return client
+
+
+def busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_samples_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy, args=(stop,), name='busy-worker')
+    worker.start()
+    try:
+        stacks, samples = profiler.profile(0.2, 0.01)
+    finally:
+        stop.set()
+        worker.join()
+    assert samples > 1
+    assert any(line.startswith('busy-worker;') and ':busy' in line for line in stacks.splitlines())
+
+
+@pytest.mark.parametrize('seconds, interval', [(float('inf'), 0.01), (float('nan'), 0.01), (1.0, float('inf')), (1.0, float('nan'))])
+def test_profile_rejects_non_finite_arguments(seconds, interval):
+    with pytest.raises(ValueError):
+        profiler.profile(seconds, interval)
+
+
+def test_profile_interval_is_capped_at_its_duration():
+    started = time.monotonic()
+    _, samples = profiler.profile(0.05, 30.0)
+    assert samples >= 1
+    assert time.monotonic() - started < 1.0
+
+
+def test_profile_endpoint_is_hidden_without_the_token(client, app_module, monkeypatch):
+    assert client.get('/api/debug/profile?seconds=0', headers=TOKEN).status_code == 404
+    monkeypatch.setattr(app_module, 'PROFILER_TOKEN', 'secret')
+    assert client.get('/api/debug/profile?seconds=0').status_code == 404
+    assert client.get('/api/debug/profile?seconds=0', headers={'X-Profiler-Token': 'wrong'}).status_code == 404
+
+
+@pytest.mark.parametrize('query', ['seconds=inf', 'seconds=nan', 'seconds=1&interval=inf', 'seconds=1&interval=nan',
+                                   'seconds=abc'])
+def test_profile_endpoint_rejects_bad_numbers(profiled_client, query):
+    assert profiled_client.get(f'/api/debug/profile?{query}', headers=TOKEN).status_code == 400
+
+
+def test_profile_endpoint_caps_the_interval(profiled_client):
+    started = time.monotonic()
+    response = profiled_client.get('/api/debug/profile?seconds=0.05&interval=30', headers=TOKEN)
+    assert response.status_code == 200
+    assert response.headers['X-Profile-Seconds'] == '0.05'
+    assert int(response.headers['X-Profile-Samples']) >= 1
+    assert time.monotonic() - started < 1.0
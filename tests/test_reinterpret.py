@@ -0,0 +1,99 @@
+import io
+import json
+import logging
+
+import pytest
+
+from admission import AdmissionControl
+from benchmarks.synthetic_report import report_pdf
+from clinical_ranges import DEFAULT_RANGES_PATH, ReloadableRanges
+from patient_store import PatientStore
+
+ADMIN = {'X-Admin-Token': 'secret'}
+
+
+@pytest.fixture
+def admin_client(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    return client
+
+
+def test_rederive_rewrites_visits_from_raw_extractions(tmp_path):
+    store = PatientStore(str(tmp_path / 'patients.sqlite3'))
+    store.add_raw_extractions([('aaa', 'v1', {'value': 1.0}), ('bbb', 'v0', {'value': 2.0}), ('bad', 'v1', {'value': None})])
+    store.add_visits([
+        ('P1', '2024-01-01', 'aaa', {'extracted_values': {'m': 0.0}}),
+        ('P1', '2024-02-01', 'bbb', {'extracted_values': {'m': 0.0}}),
+        ('P2', '2024-01-01', 'aaa', {'extracted_values': {'m': 0.0}}),
+        ('P2', '2024-03-01', 'bad', {'extracted_values': {'m': 0.0}}),
+        ('P2', '2024-04-01', 'none', {'extracted_values': {'m': 0.0}}),
+    ])
+
+    def derive(raw):
+        return {'extracted_values': {'m': raw['value'] * 10}}
+
+    stats = store.rederive(derive, chunk_size=2, extraction_version='v1')
+
+    assert stats == {'rederived': 3, 'without_raw': 1, 'failed': 1, 'other_extraction_version': 1}
+    assert [row['value'] for row in store.trend('P1', 'm')] == [10.0, 20.0]
+    assert [row['value'] for row in store.trend('P2', 'm')] == [10.0, 0.0, 0.0]
+    assert store.rederive(derive, patient_id='P1')['rederived'] == 2
+
+
+def test_rederive_logs_and_counts_failures(tmp_path, caplog):
+    store = PatientStore(str(tmp_path / 'patients.sqlite3'))
+    store.add_raw_extractions([('aaa', 'v1', {})])
+    store.add_visit('P1', '2024-01-01', {'extracted_values': {'m': 1.0}}, sha256='aaa')
+
+    def derive(raw):
+        raise KeyError('extracted_values')
+
+    with caplog.at_level(logging.WARNING, logger='patient_store'):
+        assert store.rederive(derive)['failed'] == 1
+
+    assert 'aaa' in caplog.text and 'extracted_values' in caplog.text
+    assert store.visits('P1')[0]['extracted_values'] == {'m': 1.0}
+
+
+def test_reinterpret_needs_the_admin_token(client, app_module, monkeypatch):
+    assert client.post('/api/reinterpret', headers=ADMIN).status_code == 404
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    assert client.post('/api/reinterpret').status_code == 404
+
+
+def test_reinterpret_applies_new_ranges_to_stored_visits(admin_client, app_module, monkeypatch, tmp_path):
+    pdf = report_pdf(seed=4)
+    response = admin_client.post('/api/analyze', data={'pdf': (io.BytesIO(pdf), 'r.pdf'), 'patient_id': 'P1',
+                                                       'visit_date': '2024-01-02'})
+    assert response.status_code == 200
+    stored = app_module.patient_store.visits('P1')[0]
+    latency = stored['extracted_values']['P3b Latency']
+
+    with open(DEFAULT_RANGES_PATH) as f:
+        config = json.load(f)
+    # Make the stored latency High Risk
+    config['metrics']['P3b Latency'].update(normal=latency - 20, mild_ad=latency - 10)
+    ranges_path = tmp_path / 'ranges.json'
+    ranges_path.write_text(json.dumps(config))
+    monkeypatch.setattr(app_module.extractor, 'ranges', ReloadableRanges(str(ranges_path), check_interval=3600))
+
+    response = admin_client.post('/api/reinterpret?patient_id=P1', headers=ADMIN)
+
+    assert response.status_code == 200
+    assert response.get_json()['rederived'] == 1
+    assert response.get_json()['range_version'] == app_module.extractor.ranges.current().version
+    visit = app_module.patient_store.visits('P1')[0]
+    assert visit['extracted_values'] == stored['extracted_values']
+    assert visit['clinical_interpretations']['P3b Latency'] == 'High Risk'
+
+
+def test_reinterpret_waits_for_an_analysis_slot(admin_client, app_module, monkeypatch):
+    admission = AdmissionControl(rate_per_minute=0, max_active=1, max_queued=0)
+    monkeypatch.setattr(app_module, 'admission', admission)
+
+    with admission.analysis_slot():
+        response = admin_client.post('/api/reinterpret', headers=ADMIN)
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+
+    assert admin_client.post('/api/reinterpret', headers=ADMIN).status_code == 200
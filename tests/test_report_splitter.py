@@ -0,0 +1,63 @@
+import fitz
+
+from benchmarks.synthetic_report import report_pdf
+from report_splitter import report_starts, split_reports
+
+
+def page(*lines):
+    return '\n'.join(lines)
+
+
+TITLE = 'COGNISION Report'
+
+
+def test_pages_before_the_first_title_belong_to_the_first_report():
+    texts = ['cover sheet', page(TITLE, 'Patient ID: 7', 'Test Date: 2024-01-02'), 'body']
+    assert report_starts(texts) == [(0, '7', '2024-01-02')]
+
+
+def test_running_header_continues_the_report():
+    header = page(TITLE, 'Patient ID: 7', 'Test Date: 2024-01-02')
+    assert report_starts([header, header, header]) == [(0, '7', '2024-01-02')]
+
+
+def test_title_naming_part_of_the_visit_continues_the_report():
+    texts = [
+        page(TITLE, 'Patient ID: 7', 'Test Date: 2024-01-02'),
+        page(TITLE, 'Patient ID: 7'),
+        page(TITLE, 'Test Date: 01/02/2024'),
+        page(TITLE),
+    ]
+    assert report_starts(texts) == [(0, '7', '2024-01-02')]
+
+
+def test_title_naming_another_visit_starts_a_report():
+    texts = [
+        page(TITLE, 'Patient ID: 7', 'Test Date: 2024-01-02'),
+        page(TITLE, 'Patient ID: 7', 'Test Date: 2024-02-02'),
+        page(TITLE, 'Test Date: 2024-02-02'),
+        page(TITLE, 'Patient ID: 8'),
+    ]
+    assert report_starts(texts) == [(0, '7', '2024-01-02'), (1, '7', '2024-02-02'), (3, '8', None)]
+
+
+def test_export_without_titles_is_one_report():
+    assert report_starts(['a', 'b']) == [(0, None, None)]
+
+
+def test_split_drops_repeated_pages_and_marks_repeated_reports():
+    source = fitz.open(stream=report_pdf(reports=2, noise_pages=1, seed=3), filetype='pdf')
+    doc = fitz.open()
+    # Report 1 with its noise page repeated, report 2, then report 1 again
+    for first, last in ((0, 1), (1, 1), (2, 3), (0, 1)):
+        doc.insert_pdf(source, from_page=first, to_page=last)
+    texts = [doc[number].get_text() for number in range(doc.page_count)]
+
+    segments = split_reports(doc, texts)
+
+    assert [segment.pages for segment in segments] == [[0, 1], [3, 4], [5, 6]]
+    assert segments[0].skipped_pages == [2]
+    assert segments[2].duplicate_of == 0 and segments[2].pdf_bytes is None
+    assert segments[0].sha256 != segments[1].sha256
+    report = fitz.open(stream=segments[0].pdf_bytes, filetype='pdf')
+    assert [report[number].get_text() for number in range(report.page_count)] == texts[:2]
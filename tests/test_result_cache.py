@@ -0,0 +1,108 @@
+import hashlib
+import io
+import os
+import time
+
+import result_cache
+from benchmarks.synthetic_report import report_pdf
+from result_cache import ResultCache
+
+
+def age(path, seconds):
+    modified = time.time() - seconds
+    os.utime(path, (modified, modified))
+
+
+def disk_files(directory, suffix='.json'):
+    return sorted(name for _, _, names in os.walk(directory) for name in names if name.endswith(suffix))
+
+
+def test_key_carries_hash_fingerprint_and_range_version():
+    cache = ResultCache('code1')
+    assert cache.key(b'pdf', 'r1') == cache.key_from_digest(hashlib.sha256(b'pdf').hexdigest(), 'r1')
+    assert cache.key(b'pdf', 'r1') != cache.key(b'pdf', 'r2')
+    assert cache.key(b'pdf', 'r1') != ResultCache('code2').key(b'pdf', 'r1')
+
+
+def test_memory_tier_is_lru_bounded():
+    cache = ResultCache('v', max_entries=2)
+    cache.put('a', {'n': 1})
+    cache.put('b', {'n': 2})
+    assert cache.get('a') == {'n': 1}
+    cache.put('c', {'n': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1} and cache.get('c') == {'n': 3}
+    stats = cache.stats()
+    assert (stats['evictions'], stats['memory_hits'], stats['misses'], stats['entries']) == (1, 3, 1, 2)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    cache = ResultCache('v', ttl_seconds=10)
+    cache.put('a', {'n': 1})
+    now = time.time()
+    monkeypatch.setattr(result_cache.time, 'time', lambda: now + 11)
+    assert cache.get('a') is None
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    writer = ResultCache('v', disk_dir=str(tmp_path))
+    reader = ResultCache('v', disk_dir=str(tmp_path))
+    writer.put('abc', {'n': 1})
+
+    assert reader.get('abc') == {'n': 1}
+    assert reader.stats()['disk_hits'] == 1
+    assert reader.get('abc') == {'n': 1}
+    assert reader.stats()['memory_hits'] == 1
+    assert disk_files(tmp_path) == ['abc.json']
+
+
+def test_expired_disk_entry_is_removed_on_read(tmp_path):
+    cache = ResultCache('v', ttl_seconds=60, disk_dir=str(tmp_path))
+    cache.put('abc', {'n': 1})
+    age(tmp_path / 'ab' / 'abc.json', 120)
+
+    assert ResultCache('v', ttl_seconds=60, disk_dir=str(tmp_path)).get('abc') is None
+    assert disk_files(tmp_path) == []
+
+
+def test_sweep_drops_expired_stale_temp_and_oldest_surplus_files(tmp_path):
+    cache = ResultCache('v', ttl_seconds=3600, disk_dir=str(tmp_path), disk_max_entries=2)
+    shard = tmp_path / 'aa'
+    for index, key in enumerate(['aa1', 'aa2', 'aa3', 'aa4']):
+        cache._disk_put(key, {'n': index})
+        age(shard / f'{key}.json', 100 - index)  # aa1 oldest
+    age(shard / 'aa1.json', 7200)
+    (shard / 'left.tmp').write_text('{')
+    age(shard / 'left.tmp', 2 * result_cache.DISK_SWEEP_INTERVAL)
+    (shard / 'writing.tmp').write_text('{')
+
+    removed = cache.sweep_disk()
+
+    assert removed == 3
+    assert disk_files(tmp_path) == ['aa3.json', 'aa4.json']
+    assert disk_files(tmp_path, '.tmp') == ['writing.tmp']
+    assert cache.stats()['disk_evictions'] == 3
+
+
+def test_writes_sweep_at_most_once_per_interval(tmp_path, monkeypatch):
+    cache = ResultCache('v', disk_dir=str(tmp_path), disk_max_entries=1)
+    cache.put('aa1', {'n': 1})
+    cache.put('aa2', {'n': 2})
+    assert len(disk_files(tmp_path)) == 2  # the first write swept; the second is within the interval
+
+    monkeypatch.setattr(result_cache, 'DISK_SWEEP_INTERVAL', 0.0)
+    cache._next_sweep = 0.0
+    age(tmp_path / 'aa' / 'aa1.json', 20)
+    age(tmp_path / 'aa' / 'aa2.json', 10)
+    cache.put('aa3', {'n': 3})
+    assert disk_files(tmp_path) == ['aa3.json']
+
+
+def test_reupload_is_served_from_the_cache(client):
+    pdf = report_pdf(seed=8)
+    first = client.post('/api/analyze', data={'pdf': (io.BytesIO(pdf), 'a.pdf')}).get_json()
+    second = client.post('/api/analyze', data={'pdf': (io.BytesIO(pdf), 'b.pdf')}).get_json()
+
+    assert (first['cached'], second['cached']) == (False, True)
+    assert second['data'] == first['data']
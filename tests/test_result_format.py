@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+from benchmarks.synthetic_report import report_pdf
+from medical_extractor import SimpleMedicalExtractor
+from result_format import (RESULT_MEDIA_TYPE, AnalysisResult, decode_result, decode_results, encode_result,
+                           encode_results)
+
+
+@pytest.fixture(scope='module')
+def results():
+    extractor = SimpleMedicalExtractor()
+    return {audiogram: extractor.process_pdf(report_pdf(audiogram=audiogram, seed=seed))
+            for seed, audiogram in enumerate((None, 'vector', 'raster'))}
+
+
+@pytest.mark.parametrize('audiogram', [None, 'vector', 'raster'])
+def test_result_round_trips(results, audiogram):
+    result = results[audiogram]
+    assert 'error' not in result
+
+    assert decode_result(encode_result(result)) == result
+
+
+def test_compact_decode_matches_the_dict(results):
+    compact = decode_result(encode_result(results['vector']), compact=True)
+
+    assert isinstance(compact, AnalysisResult)
+    assert compact.to_dict() == results['vector']
+
+
+def test_error_result_round_trips():
+    assert decode_result(encode_result({'error': 'Could not open PDF'})) == {'error': 'Could not open PDF'}
+
+
+def test_batch_round_trips(results):
+    batch = {'a.pdf': results[None], 'b.pdf': {'error': 'File too large'}, 'c.pdf': results['raster']}
+
+    assert decode_results(encode_results(batch)) == batch
+
+
+def test_truncated_or_foreign_data_is_rejected(results):
+    data = encode_result(results[None])
+
+    with pytest.raises(ValueError):
+        decode_result(data[:len(data) // 2])
+    with pytest.raises(ValueError):
+        decode_result(b'XXXX' + data[4:])
+
+
+def test_analyze_serves_the_binary_record_when_asked(client):
+    pdf = report_pdf(seed=3)
+
+    as_json = client.post('/api/analyze', data={'pdf': (io.BytesIO(pdf), 'r.pdf')})
+    as_binary = client.post('/api/analyze', data={'pdf': (io.BytesIO(pdf), 'r.pdf')},
+                            headers={'Accept': RESULT_MEDIA_TYPE})
+
+    assert as_binary.status_code == 200
+    assert as_binary.mimetype == RESULT_MEDIA_TYPE
+    assert as_binary.headers['X-Cached'] == 'true'
+    assert 'Accept' in as_binary.headers['Vary']
+    assert decode_result(as_binary.data) == as_json.get_json()['data']
+
+
+def test_json_wins_without_an_explicit_preference(client):
+    response = client.post('/api/analyze', data={'pdf': (io.BytesIO(report_pdf(seed=4)), 'r.pdf')},
+                           headers={'Accept': '*/*'})
+
+    assert response.mimetype == 'application/json'
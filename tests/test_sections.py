@@ -0,0 +1,84 @@
+import random
+import re
+
+import pytest
+
+from medical_extractor import DISCUSSION_HEADER, SECTION_HEADERS, discussion_section, index_sections
+
+# What process_pdf matched before the section index; discussion_section must return the same
+LEGACY_DISCUSSION_PATTERN = re.compile(r'Study Discussion:?\s*(.*?)(?=Study Protocol|Test Name|Physician|$)',
+                                       re.DOTALL | re.IGNORECASE)
+
+
+def legacy_discussion(text):
+    match = LEGACY_DISCUSSION_PATTERN.search(text)
+    return match.group(1).strip() if match else ''
+
+
+def discussion(text):
+    return discussion_section(text, index_sections(text))
+
+
+@pytest.mark.parametrize('text', [
+    'Header\nStudy Discussion: Normal study.\nStudy Protocol: standard',
+    'study discussion\n\n  Findings follow.  \nPHYSICIAN: Dr. A',
+    'Study Discussion:Test Name first',
+    'Study Discussion Study Discussion again\nTest Name',
+    'Study Protoco Test Nam Physicia\nStudy Discussion: near misses Study Protoco Test Nam Physicia',
+    'Physician before\nStudy Discussion: body\nTest Name',
+    'No discussion here. Study Protocol',
+    '',
+])
+def test_discussion_matches_the_legacy_regex(text):
+    assert discussion(text) == legacy_discussion(text)
+
+
+def test_unterminated_discussion_runs_to_the_end():
+    body = 'finding ' * 50_000
+    text = 'Study Discussion: ' + body
+    assert discussion(text) == body.strip() == legacy_discussion(text)
+
+
+def test_huge_text_without_headers():
+    text = 'x' * 2_000_000
+    sections = index_sections(text)
+    assert discussion_section(text, sections) == ''
+    assert all(sections[header] == [] for header in SECTION_HEADERS)
+    assert sections.first(SECTION_HEADERS) == -1
+
+
+def test_overlapping_headers_are_all_indexed():
+    text = 'Study Discussion: see audiogram\nHearing Test Name: pure tone'
+    sections = index_sections(text)
+    assert sections['hearing test'] == [text.index('Hearing Test')]
+    assert sections['Test Name'] == [text.index('Test Name')]
+    assert discussion_section(text, sections) == 'see audiogram\nHearing' == legacy_discussion(text)
+
+
+def test_first_finds_the_earliest_header_at_or_after_start():
+    text = 'Physician A. Study Discussion: body. Test Name B. Study Protocol C. Physician D.'
+    sections = index_sections(text)
+    assert sections.first(DISCUSSION_HEADER) == text.index('Study Discussion')
+    assert sections.first(('Study Protocol', 'Test Name', 'Physician')) == 0
+    assert sections.first(('Study Protocol', 'Test Name', 'Physician'), 1) == text.index('Test Name')
+    assert sections.first('Physician', text.index('Physician D')) == text.index('Physician D')
+    assert sections.first('Physician', len(text)) == -1
+
+
+@pytest.mark.parametrize('prefix', ['İ' * 3, 'Straße İstanbul ', 'ǅ' + 'İ' * 100])
+def test_offsets_survive_lowercasing_that_changes_length(prefix):
+    text = prefix + 'Study Discussion: Ünïcode body İ\nTest Name: x'
+    assert len(text.lower()) != len(text)
+    sections = index_sections(text)
+    assert sections[DISCUSSION_HEADER] == [len(prefix)]
+    assert sections['Test Name'] == [text.index('Test Name')]
+    assert discussion_section(text, sections) == 'Ünïcode body İ' == legacy_discussion(text)
+
+
+def test_random_header_soup_matches_the_legacy_regex():
+    rng = random.Random(12)
+    pieces = ['Study Discussion', 'study discussion:', 'Study Protocol', 'TEST NAME', 'Physician', 'Hearing Test Name',
+              'Audiogram', 'Study Protoco', 'İ', ':', ' ', '\n', 'text', 'Test']
+    for _ in range(500):
+        text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+        assert discussion(text) == legacy_discussion(text), text
@@ -0,0 +1,53 @@
+import gc
+import json
+import os
+import runpy
+import subprocess
+import sys
+
+from job_queue import JobQueue, JobStore
+from medical_extractor import SimpleMedicalExtractor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_the_app_leaves_heavy_packages_unloaded(tmp_path):
+    env = dict(os.environ, JOB_STORE_DIR=str(tmp_path / 'jobs'), PATIENT_DB=str(tmp_path / 'patients.sqlite3'),
+               PRELOAD_APP='1')
+    code = "import json, sys, app; print(json.dumps(sorted(m for m in ('pandas', 'numpy', 'cv2') if m in sys.modules)))"
+
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+    assert json.loads(output.stdout.splitlines()[-1]) == []
+
+
+def test_job_queue_starts_once_per_process(tmp_path, monkeypatch):
+    queue = JobQueue(SimpleMedicalExtractor(), JobStore(str(tmp_path)), max_workers=1, start=False)
+    assert queue.pool is None
+
+    queue.start()
+    pool = queue.pool
+    queue.start()
+    assert queue.pool is pool
+
+    # A forked worker inherits the master's queue object but none of its threads
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    queue.start()
+    assert queue.pool is not pool
+
+
+def test_gunicorn_config_preloads_and_freezes(monkeypatch):
+    monkeypatch.delenv('PRELOAD_APP', raising=False)
+    monkeypatch.delenv('SYNC_WORKER_TIMEOUT', raising=False)
+    monkeypatch.delenv('GUNICORN_THREADS', raising=False)
+
+    config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+
+    assert config['preload_app'] is True
+    assert os.environ['PRELOAD_APP'] == '1'
+    assert os.environ['SYNC_WORKER_TIMEOUT'] == str(config['timeout'])
+    try:
+        config['when_ready'](None)
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
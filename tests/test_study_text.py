@@ -0,0 +1,71 @@
+import pytest
+
+from medical_extractor import NORMAL_STUDY_TEXT, SimpleMedicalExtractor, _discussion_narrative, _findings_narrative
+
+CONCLUSION = ('These findings suggest increased risk of cognitive dysfunction and premorbid dementia. '
+              'Clinical correlation is suggested.')
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return SimpleMedicalExtractor()
+
+
+@pytest.mark.parametrize('interpretations, findings, discussion', [
+    ({'False Alarms': 'Normal'}, NORMAL_STUDY_TEXT, NORMAL_STUDY_TEXT),
+    ({'Button Press Accuracy': 'High Risk', 'P50 Amplitude': 'Borderline', 'Peak Alpha Frequency': 'High Risk'},
+     'This is an abnormal study due to high risk button press accuracy, and peak alpha frequency and borderline '
+     'p50 amplitude. These findings suggest significantly reduced cognitive processing and attentional resources, '
+     'and altered cortical arousal and attention networks. This pattern is consistent with significant cognitive '
+     'decline and warrants immediate clinical attention.',
+     'This is an abnormal study due to low button press accuracy and reduced peak alpha frequency. Collectively, '
+     'study findings suggest reduced stimulus processing (including evaluation and classification speed) as well as '
+     f'reduced attentional resources and executive function. {CONCLUSION}'),
+    ({'N100 Amplitude': 'High Risk', 'False Alarms': 'High Risk', 'Median Reaction Time': 'High Risk'},
+     'This is an abnormal study due to high risk n100 amplitude, false alarms, and median reaction time. These '
+     'findings suggest significantly reduced cognitive processing and attentional resources, and impaired sensory '
+     'processing and gating mechanisms, and compromised executive function and inhibitory control. This pattern is '
+     'consistent with significant cognitive decline and warrants immediate clinical attention.',
+     'This is an abnormal study due to elevated false alarms and delayed median reaction time. Collectively, study '
+     f'findings suggest reduced stimulus processing (including evaluation and classification speed). {CONCLUSION}'),
+    ({'P50 Amplitude': 'Borderline'},
+     'This is an abnormal study due to borderline p50 amplitude.', ''),
+])
+def test_metric_narratives(extractor, interpretations, findings, discussion):
+    assert extractor.generate_study_findings({}, interpretations) == findings
+    assert extractor.generate_study_discussion({}, interpretations) == discussion
+
+
+def test_audiogram_text_is_rendered_per_report(extractor):
+    interpretations = {'P3b Amplitude': 'Borderline'}
+    audiogram = {'left_ear': {250: 20, 500: 50, 1000: 75}, 'right_ear': {250: 30, 500: 30}}
+    asymmetry = {'overall_flag': 'ASYMMETRY', 'clinical_significance': 'Asymmetry.', 'concerning_frequencies': [1000],
+                 'max_asymmetry': 45}
+    max_htl = extractor.ranges.current().cognision_max_htl
+
+    findings = extractor.generate_study_findings({}, interpretations, audiogram,
+                                                 {'compatible': False, 'issues': ['left ear 75dB at 1000Hz']}, asymmetry)
+    discussion = extractor.generate_study_discussion({}, interpretations, audiogram, asymmetry)
+
+    assert findings == (
+        'This is an abnormal study due to borderline p3b amplitude.\n\nAudiogram Analysis: ⚠️ Hearing levels may affect '
+        f'COGNISION test reliability. Issues found: left ear 75dB at 1000Hz. COGNISION can compensate for up to {max_htl}dB '
+        'HTL. Hearing loss detected: left ear: moderate to severe hearing loss at [1000]Hz; right ear: mild hearing loss '
+        'at [250, 500]Hz. Asymmetry. Significant asymmetries noted at [1000]Hz.')
+    assert discussion == (
+        'This is an abnormal study due to borderline P3b amplitude. Collectively, study findings suggest reduced '
+        f'attentional resources and executive function. {CONCLUSION}  Audiogram reveals left ear moderate-severe '
+        'hearing loss. Significant ear-to-ear asymmetry noted (max 45dB).')
+
+
+def test_narratives_are_rendered_once_per_profile(extractor):
+    interpretations = {'False Alarms': 'High Risk', 'Peak Alpha Frequency': 'Borderline', 'P3a Amplitude': 'Normal'}
+    _findings_narrative.cache_clear()
+    _discussion_narrative.cache_clear()
+
+    texts = {(extractor.generate_study_findings({}, dict(interpretations)),
+              extractor.generate_study_discussion({}, dict(interpretations))) for _ in range(5)}
+
+    assert len(texts) == 1
+    assert (_findings_narrative.cache_info().misses, _findings_narrative.cache_info().hits) == (1, 4)
+    assert (_discussion_narrative.cache_info().misses, _discussion_narrative.cache_info().hits) == (1, 4)